@@ -0,0 +1,906 @@
+"""
+微信文件传输助手剪贴板监控工具 - 性能基准测试
+
+用法:
+    python benchmark.py            运行全部基准测试
+    python benchmark.py matcher    只运行指定的基准测试
+
+基准测试只使用内存中的假后端，不需要图形界面和微信
+"""
+
+import argparse
+import os
+import random
+import string
+import subprocess
+import sys
+import time
+
+from metrics import percentile
+
+
+def make_text(size, urls, seed=0):
+    """生成约size个字符的混合文本，其中随机穿插给定的URL"""
+    rng = random.Random(seed)
+    words = ["学习", "验证", "链接", "通知", "hello", "world", "data", "log", "report", "2024"]
+    filler_urls = [
+        "https://www.example.com/index.html",
+        "http://news.example.org/article?id=42",
+        "https://cdn.example.net/static/app.js",
+    ]
+    parts = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.01:
+            part = rng.choice(urls or filler_urls)
+        elif rng.random() < 0.02:
+            part = rng.choice(filler_urls)
+        else:
+            part = rng.choice(words)
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)[:size]
+
+
+def make_patterns(count, seed=0):
+    """生成count条链接规则（字面前缀为主，夹杂通配符和正则）"""
+    rng = random.Random(seed)
+    patterns = ["https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto"]
+    while len(patterns) < count:
+        host = "".join(rng.choice(string.ascii_lowercase) for _ in range(8))
+        kind = len(patterns) % 10
+        if kind == 8:
+            patterns.append(f"https://*.{host}.com/verify/*")
+        elif kind == 9:
+            patterns.append(f"re:{host}\\.cn/v\\d+/check")
+        else:
+            patterns.append(f"https://{host}.com/h5/verify")
+    return patterns
+
+
+def measure(func, repeat):
+    """运行repeat次，返回最快一次的耗时（秒）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_matcher(args):
+    """链接匹配器：1MB剪贴板文本在1/10/500条规则下的扫描吞吐量"""
+    from link_matcher import LinkMatcher
+
+    size = 1024 * 1024
+    print(f"== 链接匹配 (文本大小 {size // 1024} KB) ==")
+    for count in (1, 10, 500):
+        patterns = make_patterns(count)
+        compile_time = measure(lambda: LinkMatcher(patterns), 3)
+        matcher = LinkMatcher(patterns)
+        text = make_text(size, [
+            "https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto?id=123",
+            patterns[-1].replace("re:", "http://").replace("\\", "").replace("d+", "1")
+            .replace("*", "www"),
+        ])
+        hits = len(matcher.find_all(text))
+        elapsed = measure(lambda: matcher.find_all(text), args.repeat)
+        print(f"规则数 {count:4d}: 编译 {compile_time * 1000:7.2f} ms, "
+              f"扫描 {elapsed * 1000:7.2f} ms, "
+              f"吞吐量 {size / elapsed / 1024 / 1024:8.1f} MB/s, 命中 {hits}")
+
+
+def make_routes(count, targets=5, seed=0):
+    """生成count条路由规则（规则同make_patterns），依次指向targets个窗口"""
+    return [
+        {"pattern": pattern, "title": f"群聊{index % targets}"}
+        for index, pattern in enumerate(make_patterns(count, seed))
+    ]
+
+
+def route_url(route):
+    """生成命中该路由规则的链接"""
+    pattern = route["pattern"]
+    if pattern.startswith("re:"):
+        return "http://" + pattern[3:].replace("\\", "").replace("d+", "1")
+    return pattern.replace("*", "www") + "?id=1"
+
+
+def bench_routes(args):
+    """发送路由：几百条规则时每次剪贴板变化的路由耗时（合并成一个匹配器 vs 逐条规则匹配），
+    以及按目标成批发送时窗口的激活次数"""
+    from clipboard_watcher import FakeClipboard
+    from link_matcher import LinkMatcher
+    from monitor_core import Monitor
+    from router import LinkRouter
+    from window_backend import FakeWindowBackend
+
+    def quiet(message):
+        pass
+
+    print("== 发送路由 ==")
+    rng = random.Random(1)
+    for count in (10, 100, 500, 1000):
+        routes = make_routes(count)
+        compile_time = measure(lambda: LinkRouter([], routes), 3)
+        router = LinkRouter([], routes)
+        # 每次剪贴板变化：一段普通文字加1~3条命中随机规则的链接
+        texts = [
+            "学习验证 " + " ".join(route_url(rng.choice(routes)) for _ in range(rng.randint(1, 3)))
+            for _ in range(500)
+        ]
+
+        def combined():
+            for text in texts:
+                router.find_all(text)
+
+        # 对照：每条规则单独一个匹配器，按顺序逐条检查
+        per_rule = [(LinkMatcher([route["pattern"]]), route) for route in routes]
+
+        def sequential():
+            for text in texts:
+                for matcher, route in per_rule:
+                    if matcher.search(text):
+                        break
+
+        combined_us = measure(combined, args.repeat) / len(texts) * 1e6
+        sequential_us = measure(sequential, 1) / len(texts) * 1e6
+        print(f"规则数 {count:4d}: 编译 {compile_time * 1000:7.2f} ms, "
+              f"每次变化 {combined_us:7.1f} us（逐条规则匹配 {sequential_us:9.1f} us）")
+
+    # 按目标成批：多个目标的链接交替到达时，每次发送每个窗口只激活一次
+    targets, links = 5, 50
+    routes = make_routes(100, targets)
+    windows = [(index + 1, f"群聊{index}") for index in range(targets)]
+    backend = FakeWindowBackend(windows)
+    clipboard = FakeClipboard()
+    monitor = Monitor(config={"send_routes": routes, "send_batch_size": links},
+                      clipboard=clipboard, window_backend=backend, log=quiet)
+    arrivals = []
+    for index in range(links):
+        route = routes[index % len(routes)]
+        arrivals.append(route["title"])
+        clipboard.copy(f"{route_url(route)}&n={index}")
+        monitor.check_clipboard()
+    switches = sum(1 for index, title in enumerate(arrivals) if index == 0 or title != arrivals[index - 1])
+    start = time.perf_counter()
+    ok = monitor.send_pending()
+    elapsed = time.perf_counter() - start
+    print(f"{links}条链接交替发往{targets}个窗口: 按到达顺序需要切换{switches}次，"
+          f"按目标成批激活{len(backend.activations)}次，发送{'成功' if ok else '失败'} {elapsed * 1000:.1f} ms")
+
+
+def bench_large(args):
+    """超大剪贴板内容：100MB文本时check_clipboard的耗时和额外内存（限制检查长度 vs 不限制）"""
+    import tracemalloc
+
+    from clipboard_watcher import FakeClipboard
+    from monitor_core import Monitor
+    from window_backend import FakeWindowBackend
+
+    def quiet(message):
+        pass
+
+    target = "https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto?id=1"
+    block = make_text(1024 * 1024, [])
+    size = 100
+    cases = (
+        ("链接在开头", target + " " + block * size),
+        ("链接在末尾", block * size + " " + target),
+        ("没有链接", block * size),
+    )
+    print(f"== 超大剪贴板内容 ({size} MB文本) ==")
+    for label, text in cases:
+        for limit in (2 * 1024 * 1024, 0):
+            def check():
+                clipboard = FakeClipboard(text)
+                monitor = Monitor(config={"max_scan_chars": limit}, clipboard=clipboard,
+                                  window_backend=FakeWindowBackend(), log=quiet)
+                monitor.check_clipboard()
+                return monitor
+
+            elapsed = measure(check, args.repeat if limit else 1)
+            tracemalloc.start()
+            monitor = check()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            limit_text = f"前{limit // 1024 // 1024}M字符" if limit else "不限制"
+            print(f"{label:6s} 检查{limit_text:7s}: {elapsed * 1000:8.1f} ms, 额外内存峰值 {peak / 1024:8.0f} KB, "
+                  f"检测到 {len(monitor.send_queue)} 条")
+
+
+def bench_extract(args):
+    """链接提取：大段混合文本中提取目标链接并计算去重用的规范形式的耗时，以及发送内容的缩减"""
+    from clipboard_watcher import FakeClipboard
+    from dedup_cache import normalize_link
+    from link_extractor import LinkExtractor
+    from monitor_core import Monitor
+    from window_backend import FakeWindowBackend
+
+    def quiet(message):
+        pass
+
+    target = "https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto"
+    urls = [
+        f"{target}?id={i}&amp;utm_source=wechat&amp;from=timeline&amp;name=%e5%ad%a6%e4%b9%a0%7e{i}"
+        for i in range(50)
+    ]
+    extractor = LinkExtractor()
+    count = 20000
+    samples = [urls[i % len(urls)] for i in range(count)]
+    canonical_ns = measure(lambda: [extractor.canonical(url) for url in samples], args.repeat) / count * 1e9
+    normalize_ns = measure(lambda: [normalize_link(url) for url in samples], args.repeat) / count * 1e9
+    print("== 链接提取 ==")
+    print(f"规范化一条链接: {canonical_ns:6.0f} ns（去重用的normalize_link {normalize_ns:6.0f} ns）")
+    print(f"示例: {urls[7]}\n   去重键 → {extractor.canonical(urls[7])}")
+
+    for size in (10 * 1024, 1024 * 1024):
+        text = make_text(size, urls, seed=size)
+        monitor = Monitor(clipboard=FakeClipboard(), window_backend=FakeWindowBackend(), log=quiet)
+        router = monitor.get_link_router()
+        scan = measure(lambda: router.scan(text), args.repeat)
+        extract = measure(lambda: monitor.extract_links(text), args.repeat)
+        links = monitor.extract_links(text)
+        payload = len("\n".join(url for url, _, _ in links).encode("utf-8"))
+        print(f"文本 {size // 1024:5d} KB: 扫描 {scan * 1000:7.2f} ms, 扫描+提取 {extract * 1000:7.2f} ms, "
+              f"{len(links)}条链接, 发送内容 {len(text.encode('utf-8')) // 1024} KB → {payload / 1024:.1f} KB")
+
+
+def batch_recorder(batch_cost=0.0, item_cost=0.0):
+    """模拟Monitor.sender：每批固定耗时加每条链接的耗时，返回 (发送函数, 发送记录[(条目列表, 完成时间)])"""
+    sent = []
+
+    def send(text, items):
+        time.sleep(batch_cost + item_cost * len(items))
+        sent.append((list(items), time.perf_counter()))
+        return True
+
+    return send, sent
+
+
+def bench_send(args):
+    """发送队列：突发链接在不同批大小下的吞吐量和单条延迟（Monitor自动发送，假发送后端）"""
+    from clipboard_watcher import FakeClipboard
+    from monitor_core import Monitor
+    from window_backend import FakeWindowBackend
+
+    def quiet(message):
+        pass
+
+    links = 100
+    # 每批固定耗时按实际发送的1.7秒缩小100倍模拟
+    print(f"== 合并发送 ({links}条链接突发，每批固定耗时17ms) ==")
+    for batch_size in (1, 5, 10, 25):
+        sender, sent = batch_recorder(batch_cost=0.017, item_cost=0.0002)
+        monitor = Monitor(
+            config={"auto_send": True, "send_batch_size": batch_size, "send_max_wait": 0.005},
+            clipboard=FakeClipboard(), window_backend=FakeWindowBackend(), sender=sender, log=quiet,
+        )
+        queue = monitor.send_queue
+        enqueued = {}
+        monitor.start()
+        start = time.perf_counter()
+        for i in range(links):
+            item = f"https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto?id={i}"
+            enqueued[item] = time.perf_counter()
+            queue.put(item)
+            monitor._queue_updated()
+            time.sleep(0.001)
+        while queue.items_sent < links:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        monitor.stop()
+
+        latencies = sorted(
+            done - enqueued[item]
+            for items, done in sent
+            for item in items
+        )
+        print(f"批大小 {batch_size:3d}: {links / elapsed:7.1f} 条/秒, 共{len(sent)}批, "
+              f"单条延迟 p50 {percentile(latencies, 0.5) * 1000:6.1f} ms, "
+              f"p95 {percentile(latencies, 0.95) * 1000:6.1f} ms")
+
+
+def bench_inject(args):
+    """发送方式：剪贴板粘贴与直接输入文字的端到端延迟对比（假窗口后端和假剪贴板）"""
+    from clipboard_watcher import FakeClipboard
+    from readiness import wait_until
+    from window_backend import FakeWindowBackend
+
+    # 模拟耗时：每个组合键2ms，直接输入每个字符0.1ms，粘贴后窗口处理剪贴板内容约30ms
+    paste_settle = 0.03
+    backend = FakeWindowBackend([(1, "文件传输助手")], foreground=1, key_delay=0.002, char_delay=0.0001)
+    clipboard = FakeClipboard("用户原来的剪贴板内容")
+
+    def send_by_clipboard(text):
+        saved = clipboard.paste()
+        clipboard.copy(text)
+        wait_until(lambda: clipboard.paste() == text, timeout=1.0)
+        backend.hotkey("ctrl", "v")
+        time.sleep(paste_settle)
+        backend.hotkey("enter")
+        # 剪贴板方式会覆盖用户的剪贴板，需要再恢复一次
+        clipboard.copy(saved)
+
+    def send_by_inject(text):
+        backend.type_lines(text)
+        backend.hotkey("enter")
+
+    print("== 发送方式对比 (模拟耗时) ==")
+    for length in (50, 200, 1000):
+        text = ("https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto?id=1234567890" * (length // 50 + 1))[:length]
+        for name, func in (("剪贴板", send_by_clipboard), ("直接输入", send_by_inject)):
+            elapsed = measure(lambda: func(text), args.repeat)
+            print(f"{length:5d}字符 {name:4s}: {elapsed * 1000:7.2f} ms")
+
+
+def bench_monitor(args):
+    """监控核心：创建Monitor的开销，以及从复制链接到加入发送队列的端到端延迟（全部使用假后端）"""
+    from clipboard_watcher import FakeClipboard
+    from monitor_core import Monitor
+    from window_backend import FakeWindowBackend
+
+    def quiet(message):
+        pass
+
+    count = 1000
+    start = time.perf_counter()
+    monitors = [
+        Monitor(clipboard=FakeClipboard(), window_backend=FakeWindowBackend(), log=quiet)
+        for _ in range(count)
+    ]
+    elapsed = time.perf_counter() - start
+    print("== 监控核心 ==")
+    print(f"创建{count}个Monitor: {elapsed * 1000:.1f} ms（每个 {elapsed / count * 1e6:.1f} us）")
+    del monitors
+
+    links = 200
+    clipboard = FakeClipboard()
+    sender, sent = batch_recorder()
+    monitor = Monitor(clipboard=clipboard, window_backend=FakeWindowBackend(), sender=sender, log=quiet)
+    monitor.start()
+    latencies = []
+    for i in range(links):
+        before = len(monitor.send_queue)
+        start = time.perf_counter()
+        clipboard.copy(f"https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto?id={i}")
+        while len(monitor.send_queue) == before:
+            time.sleep(0.0001)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    monitor.send_pending()
+    monitor.stop()
+    print(f"检测延迟（{links}次复制）: p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.2f} ms, "
+          f"合并为 {len(sent)} 批共 {sum(len(items) for items, _ in sent)} 条发送")
+
+
+def replay_detections(monitor, clipboard, links, interval=0.002, timeout=0.5):
+    """把links逐条复制到假剪贴板（每条被检测到后再等interval秒复制下一条），
+    经过check_clipboard -> 发送队列 -> 发送方式，返回 (每条链接的端到端延迟, 总耗时, 未检测到的条数)"""
+    import threading
+
+    copied = {}
+    done = {}
+    detected = threading.Event()
+    send_text = monitor.send_text
+
+    def timed_send(text, items):
+        ok = send_text(text, items)
+        if ok:
+            now = time.perf_counter()
+            for item in items:
+                done.setdefault(item, now)
+        return ok
+
+    monitor.sender = timed_send
+    monitor.on_detect = lambda text, new_links: detected.set()
+    monitor.start()
+    missed = 0
+    start = time.perf_counter()
+    for link in links:
+        detected.clear()
+        copied[link] = time.perf_counter()
+        clipboard.copy(link)
+        if not detected.wait(timeout):
+            missed += 1
+        time.sleep(interval)
+    deadline = time.perf_counter() + 30
+    while len(done) < len(links) - missed and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    elapsed = max(done.values(), default=start) - start
+    monitor.stop()
+    latencies = sorted(done[link] - copied[link] for link in done)
+    return latencies, elapsed, missed
+
+
+def bench_senders(args):
+    """发送方式：复制链接 -> check_clipboard -> 发送队列 -> 发送方式 的端到端延迟和吞吐量（假后端）"""
+    from clipboard_watcher import FakeClipboard
+    from monitor_core import Monitor
+    from senders import RecordingSender, SelectedWindowSender, WeChatSearchSender
+    from window_backend import FakeWindowBackend
+
+    def quiet(message):
+        pass
+
+    def fake_desktop():
+        return FakeWindowBackend(
+            [(1, "浏览器"), (2, "微信"), (3, "文件传输助手")], foreground=1,
+            activation_delay=0.002, key_delay=0.001, char_delay=0.00002
+        )
+
+    def select_failing_window(monitor):
+        monitor.window_backend.failing.add(1)
+        monitor.select_window(1, "浏览器")
+
+    def select_ignored_window(monitor):
+        # 激活后等待1秒仍不在前台才失败，是固定顺序时最耗时的情况
+        monitor.window_backend.ignored.add(3)
+        monitor.select_window(3, "文件传输助手")
+
+    def fixed_order(prepare):
+        # 关闭按统计调整顺序，作为对照
+        def wrapper(monitor):
+            monitor.send_strategy.adaptive = False
+            prepare(monitor)
+        return wrapper
+
+    # 名称 -> (发送方式列表, 窗口后端, 发送前的准备)
+    # alt_tab和web需要真实的桌面（假窗口后端不模拟Alt+Tab，web会打开浏览器），这里不测
+    cases = {
+        "模拟-快": (lambda: [RecordingSender("fast", 0.002, 0.003)], fake_desktop, None),
+        "模拟-慢": (lambda: [RecordingSender("slow", 0.03, 0.02)], fake_desktop, None),
+        "模拟-30%失败+备用": (
+            lambda: [RecordingSender("flaky", 0.005, 0.005, failure_rate=0.3, seed=1),
+                     RecordingSender("fallback", 0.005, 0.005)],
+            fake_desktop, None
+        ),
+        "selected(假窗口)": (lambda: [SelectedWindowSender()], fake_desktop,
+                             lambda monitor: monitor.select_window(3, "文件传输助手")),
+        "search(假窗口)": (lambda: [WeChatSearchSender()], fake_desktop, None),
+        "selected失败→search": (lambda: [SelectedWindowSender(), WeChatSearchSender()], fake_desktop,
+                               select_failing_window),
+        "selected无响应→search": (lambda: [SelectedWindowSender(), WeChatSearchSender()], fake_desktop,
+                                select_ignored_window),
+        "同上(固定顺序)": (lambda: [SelectedWindowSender(), WeChatSearchSender()], fake_desktop,
+                       fixed_order(select_ignored_window)),
+    }
+
+    links = [f"https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto?id={i}" for i in range(200)]
+    config = {"auto_send": True, "send_max_wait": 0.02, "send_batch_size": 10, "send_mode": "inject"}
+    print(f"== 发送方式端到端延迟 ({len(links)}条链接，自动发送，每批最多10条) ==")
+    for name, (make_senders, make_backend, prepare) in cases.items():
+        clipboard = FakeClipboard()
+        monitor = Monitor(config=config, clipboard=clipboard, window_backend=make_backend(),
+                          senders=make_senders(), log=quiet)
+        if prepare:
+            prepare(monitor)
+        latencies, elapsed, missed = replay_detections(monitor, clipboard, links)
+        throughput = len(latencies) / elapsed if elapsed else 0.0
+        print(f"{name:18s} p50 {percentile(latencies, 0.5) * 1000:7.1f} ms, "
+              f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms, "
+              f"吞吐 {throughput:6.1f} 条/秒, 批次 {monitor.send_queue.batches_sent}"
+              + (f", 未检测到 {missed} 条" if missed else ""))
+        if len(monitor.senders) > 1:
+            print(f"{'':18s} 发送顺序: {monitor.send_order_summary()}")
+
+
+def bench_replay(args):
+    """trace回放：突发复制时事件通知和轮询两种监听方式的漏检、检测延迟和CPU占用（假后端，4倍速）"""
+    from trace_replay import format_report, synthesize_trace, replay_trace
+
+    # 每组3次复制，组内间隔分别为10ms（快速连续复制）和200ms
+    print("== trace回放（60次复制，每组3次，4倍速） ==")
+    for gap in (0.01, 0.2):
+        events = synthesize_trace(60, burst=3, gap=gap, idle=1.0, link_ratio=0.5)
+        print(f"-- 组内间隔 {gap * 1000:.0f} ms --")
+        for watcher in ("fake", "poll"):
+            report = replay_trace(events, speed=4, watcher=watcher)
+            print("\n".join(format_report(report)[:4]))
+
+
+def bench_metrics(args):
+    """指标开销：单次记录的耗时，以及check_clipboard在开启和关闭指标时的耗时对比"""
+    from clipboard_watcher import FakeClipboard
+    from metrics import MetricsRegistry, NullRegistry
+    from monitor_core import Monitor
+    from window_backend import FakeWindowBackend
+
+    def quiet(message):
+        pass
+
+    count = 100000
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "基准测试")
+    histogram = registry.histogram("bench_seconds", "基准测试")
+
+    def inc_loop():
+        for _ in range(count):
+            counter.inc()
+
+    def observe_loop():
+        for _ in range(count):
+            histogram.observe(0.003)
+
+    print("== 指标开销 ==")
+    print(f"计数器加一: {measure(inc_loop, args.repeat) / count * 1e9:6.0f} ns/次")
+    print(f"直方图记录: {measure(observe_loop, args.repeat) / count * 1e9:6.0f} ns/次")
+
+    texts = [f"普通文本 {i} https://www.example.com/page?id={i}" for i in range(2000)]
+    for label, metrics in (("关闭指标", NullRegistry()), ("开启指标", MetricsRegistry())):
+        clipboard = FakeClipboard()
+        monitor = Monitor(clipboard=clipboard, window_backend=FakeWindowBackend(), log=quiet, metrics=metrics)
+
+        def unchanged():
+            for _ in range(count):
+                monitor.check_clipboard()
+
+        def changed():
+            for text in texts:
+                clipboard.copy(text)
+                monitor.check_clipboard()
+
+        unchanged_ns = measure(unchanged, args.repeat) / count * 1e9
+        changed_us = measure(changed, args.repeat) / len(texts) * 1e6
+        print(f"check_clipboard {label}: 无变化 {unchanged_ns:6.0f} ns/次, 有变化(无匹配) {changed_us:6.2f} us/次")
+
+
+def bench_history(args):
+    """历史记录：记录一条的耗时（只放入队列）、后台写入吞吐量，以及几十万条记录时的查询耗时"""
+    import tempfile
+
+    from clipboard_watcher import FakeClipboard
+    from history import DETECT, HistoryStore
+    from monitor_core import Monitor
+    from window_backend import FakeWindowBackend
+
+    def quiet(message):
+        pass
+
+    rows = 300000
+    urls = [f"https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto?id={i}" for i in range(20000)]
+    print("== 历史记录 ==")
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, "history.db"))
+
+        def record_loop():
+            for i in range(rows):
+                store.record_detection(urls[i % len(urls)], "new", 0.003)
+
+        # 未启动写入线程：只测量调用方（监控线程）的开销
+        start = time.perf_counter()
+        record_loop()
+        record_ns = (time.perf_counter() - start) / rows * 1e9
+        print(f"记录一条: {record_ns:6.0f} ns/次（只放入队列）")
+
+        start = time.perf_counter()
+        store.start()
+        store.flush(timeout=600)
+        elapsed = time.perf_counter() - start
+        print(f"后台写入: {rows}条 {elapsed:.2f} s（{rows / elapsed:,.0f} 条/s，共{store.count()}条）")
+
+        queries = (
+            ("最近记录", {}),
+            ("链接前缀", {"query": urls[12345]}),
+            ("链接包含", {"query": "id=12345"}),
+            ("时间范围", {"since": time.time() - 60, "kind": DETECT}),
+        )
+        for label, kwargs in queries:
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                store.search(limit=100, **kwargs)
+                samples.append(time.perf_counter() - start)
+            print(f"查询{label}: 中位数 {percentile(sorted(samples), 0.5) * 1000:7.2f} ms")
+        store.stop()
+
+        # 检测到链接时check_clipboard的耗时：开启历史记录只多了放入队列
+        texts = [f"学习验证链接 {url}" for url in urls[:2000]]
+        for label, history in (("关闭历史记录", None), ("开启历史记录", HistoryStore(os.path.join(directory, "check.db")))):
+            if history:
+                history.start()
+            samples = []
+            for _ in range(args.repeat):
+                clipboard = FakeClipboard()
+                monitor = Monitor(clipboard=clipboard, window_backend=FakeWindowBackend(), log=quiet,
+                                  history=history)
+                start = time.perf_counter()
+                for text in texts:
+                    clipboard.copy(text)
+                    monitor.check_clipboard()
+                samples.append(time.perf_counter() - start)
+            print(f"check_clipboard {label}: 有新链接 {min(samples) / len(texts) * 1e6:6.2f} us/次")
+            if history:
+                history.stop()
+
+
+def current_rss_kb():
+    """返回当前进程的常驻内存（KB），无法获取时返回None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss // 1024
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def idle_probe(mode, seconds):
+    """在子进程中运行：用假后端启动无界面或图形界面前端，空闲seconds秒后输出内存和CPU占用"""
+    import threading
+
+    import wx_clipboard_monitor as app
+    from clipboard_watcher import FakeClipboard
+    from monitor_core import Monitor
+    from window_backend import FakeWindowBackend
+
+    settle = 1.0
+    result = {}
+
+    def begin():
+        result["cpu"] = time.process_time()
+        result["wall"] = time.perf_counter()
+
+    def finish():
+        cpu = time.process_time() - result["cpu"]
+        wall = time.perf_counter() - result["wall"]
+        print(f"IDLE rss_kb={current_rss_kb() or 0} cpu_percent={cpu / wall * 100:.3f}", flush=True)
+
+    if mode == "headless":
+        from headless import HeadlessRunner, StructuredLog
+
+        log = StructuredLog(stream=None)
+        app.monitor = Monitor(clipboard=FakeClipboard(), window_backend=FakeWindowBackend(),
+                              log=log.log, notify=log.notify)
+        runner = HeadlessRunner(app.monitor, log, hotkeys=False)
+        thread = threading.Thread(target=runner.run)
+        thread.start()
+        time.sleep(settle)
+        begin()
+        time.sleep(seconds)
+        finish()
+        runner.stop()
+        thread.join()
+    else:
+        app.monitor = Monitor(clipboard=FakeClipboard(), window_backend=FakeWindowBackend(),
+                              log=app.log_message, notify=app.show_notification)
+        app.log_sink.stream = None
+        gui = app.create_gui()
+        app.monitor.start()
+        gui.after(int(settle * 1000), begin)
+        gui.after(int((settle + seconds) * 1000), lambda: (finish(), gui.destroy()))
+        gui.mainloop()
+        app.monitor.stop()
+
+
+def bench_headless(args):
+    """无界面模式与图形界面模式空闲时的常驻内存和CPU占用对比（假后端，子进程中测量）"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    seconds = 5
+    print(f"== 无界面模式资源占用（空闲{seconds}秒） ==")
+    modes = ["headless"]
+    if sys.platform == "win32" or os.environ.get("DISPLAY"):
+        modes.append("gui")
+    else:
+        print("图形界面模式: 跳过（没有图形界面）")
+
+    for mode in modes:
+        result = subprocess.run(
+            [sys.executable, "-c", f"import benchmark; benchmark.idle_probe({mode!r}, {seconds})"],
+            cwd=here, capture_output=True, text=True, timeout=seconds + 30
+        )
+        lines = [line for line in result.stdout.splitlines() if line.startswith("IDLE ")]
+        if result.returncode != 0 or not lines:
+            print(f"{mode}: 运行失败\n{result.stderr.strip()}")
+            return 1
+        fields = dict(item.split("=", 1) for item in lines[-1].split()[1:])
+        rss = int(fields["rss_kb"])
+        rss_text = f"{rss / 1024:.1f} MB" if rss else "未知"
+        print(f"{mode:8s}: 常驻内存 {rss_text}, 空闲CPU {float(fields['cpu_percent']):.3f}%")
+
+
+def count_widgets(widget):
+    """递归统计控件数量"""
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def bench_notify(args):
+    """通知弹窗压力测试：多线程连续发送大量通知时控件数和内存保持不变（需要图形界面）"""
+    import threading
+    import tracemalloc
+    import tkinter as tk
+
+    from notifier import NotificationManager
+    from tk_bridge import TkBridge
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"== 通知压力测试 == 跳过：无法创建窗口 ({e})")
+        return
+    root.withdraw()
+
+    threads_count = 4
+    per_thread = 2500
+    total = threads_count * per_thread
+    bridge = TkBridge(root)
+    manager = NotificationManager(root, bridge)
+    root.update()
+    widgets_before = count_widgets(root)
+
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+
+    def producer(index):
+        for i in range(per_thread):
+            manager.post(f"检测到学习验证链接 {index}-{i}", "success", "立即发送", lambda: None)
+
+    def wait_done():
+        if manager.received < total:
+            root.after(1, wait_done)
+        else:
+            root.quit()
+
+    # 其他线程的after_idle要由主循环处理，生产者在主循环开始后再启动
+    threads = [threading.Thread(target=producer, args=(i,)) for i in range(threads_count)]
+    start = time.perf_counter()
+    root.after(0, lambda: [thread.start() for thread in threads])
+    root.after(1, wait_done)
+    root.mainloop()
+    elapsed = time.perf_counter() - start
+    bridge.close()
+    for thread in threads:
+        thread.join()
+    root.update()
+
+    widgets_after = count_widgets(root)
+    memory_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    root.destroy()
+
+    print(f"== 通知压力测试 ({total}条通知，{threads_count}个线程) ==")
+    print(f"耗时 {elapsed * 1000:.1f} ms, 弹窗更新 {manager.shown} 次, 界面线程处理队列 {bridge.drains} 次")
+    print(f"控件数 {widgets_before} -> {widgets_after}, "
+          f"内存变化 {(memory_after - memory_before) / 1024:.1f} KB")
+    if widgets_after != widgets_before:
+        print("回退：控件数发生了变化")
+        return 1
+
+
+# 导入主模块时不应加载的重量级模块（应在用到时才导入）
+HEAVY_MODULES = ["pyautogui", "keyboard", "tkinter", "pyperclip", "Xlib", "win32gui"]
+
+# 导入主模块的耗时上限，毫秒
+IMPORT_BUDGET_MS = 100
+
+
+def parse_importtime(output):
+    """解析 python -X importtime 的输出，返回 [(模块名, 自身耗时us, 累计耗时us, 缩进层级)]"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            entries.append((name.strip(), int(self_us), int(cumulative_us),
+                            (len(name) - len(name.lstrip()) - 1) // 2))
+        except ValueError:
+            continue
+    return entries
+
+
+def bench_startup(args):
+    """启动性能：用 -X importtime 检查导入主模块的耗时和不应提前导入的模块，并测量主窗口显示耗时"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    print("== 启动耗时 ==")
+
+    import_times = []
+    entries = []
+    for _ in range(args.repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import wx_clipboard_monitor"],
+            cwd=here, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"导入失败:\n{result.stderr.strip()}")
+            return 1
+        entries = parse_importtime(result.stderr)
+        for name, _, cumulative_us, _ in entries:
+            if name == "wx_clipboard_monitor":
+                import_times.append(cumulative_us / 1000)
+
+    import_ms = min(import_times)
+    print(f"导入主模块: {import_ms:.1f} ms（上限 {IMPORT_BUDGET_MS} ms）")
+    print("耗时最多的直接依赖:")
+    direct = [entry for entry in entries if entry[3] == 1]
+    for name, _, cumulative_us, _ in sorted(direct, key=lambda entry: -entry[2])[:5]:
+        print(f"  {name:24s} {cumulative_us / 1000:7.2f} ms")
+
+    failed = False
+    imported = {name.split(".")[0] for name, _, _, _ in entries}
+    heavy = [name for name in HEAVY_MODULES if name in imported]
+    if heavy:
+        print(f"回退：导入主模块时加载了 {', '.join(heavy)}")
+        failed = True
+    if import_ms > IMPORT_BUDGET_MS:
+        print(f"回退：导入耗时超过上限 {IMPORT_BUDGET_MS} ms")
+        failed = True
+
+    # 主窗口显示耗时（需要图形界面和已安装的依赖）
+    if sys.platform != "win32" and not os.environ.get("DISPLAY"):
+        print("主窗口显示耗时: 跳过（没有图形界面）")
+        return 1 if failed else None
+
+    import wx_clipboard_monitor
+    gui_times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "wx_clipboard_monitor.py", "--startup-time"],
+            cwd=here, capture_output=True, text=True, timeout=60
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        reported = [line for line in result.stdout.splitlines() if line.startswith("STARTUP_MS=")]
+        if result.returncode != 0 or not reported:
+            print(f"主窗口显示耗时: 启动失败\n{result.stderr.strip()}")
+            return 1
+        gui_times.append((float(reported[-1].split("=", 1)[1]), wall_ms))
+
+    shown_ms = percentile(sorted(shown for shown, _ in gui_times), 0.5)
+    wall_ms = percentile(sorted(wall for _, wall in gui_times), 0.5)
+    target = wx_clipboard_monitor.STARTUP_TARGET_MS
+    print(f"主窗口显示耗时: {shown_ms:.0f} ms（中位数，目标 {target} ms），"
+          f"含解释器启动和退出的进程总耗时 {wall_ms:.0f} ms")
+    if shown_ms > target:
+        print("回退：主窗口显示耗时超过目标")
+        failed = True
+    return 1 if failed else None
+
+
+BENCHMARKS = {
+    "matcher": bench_matcher,
+    "routes": bench_routes,
+    "large": bench_large,
+    "extract": bench_extract,
+    "send": bench_send,
+    "inject": bench_inject,
+    "senders": bench_senders,
+    "replay": bench_replay,
+    "monitor": bench_monitor,
+    "metrics": bench_metrics,
+    "history": bench_history,
+    "notify": bench_notify,
+    "headless": bench_headless,
+    "startup": bench_startup,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="剪贴板监控工具性能基准测试")
+    parser.add_argument("names", nargs="*",
+                        help=f"要运行的基准测试（{', '.join(BENCHMARKS)}），默认全部")
+    parser.add_argument("--repeat", type=int, default=5, help="每项测试重复次数")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的基准测试: {', '.join(unknown)}")
+
+    failed = False
+    for name in args.names or BENCHMARKS:
+        if BENCHMARKS[name](args):
+            failed = True
+        print()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+变化监听基类模块
+剪贴板监听器（clipboard_watcher）和配置文件监视器（config_store）共用的等待/唤醒逻辑：
+监听线程调用wait_for_change()阻塞等待，其他线程调用wake()让它立即返回；
+在文件描述符上等待事件的监听器用管道唤醒阻塞在select上的线程
+"""
+
+import os
+import select
+import threading
+import time
+
+
+class ChangeWatcher:
+    """变化监听器基类
+
+    子类实现 _wait(timeout)，在监听的对象可能发生变化时返回True，超时返回False。
+    调用 wake() 可以让正在等待的线程立即返回（例如暂停/恢复监控或退出程序时）
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._wake_event = threading.Event()
+
+    def wait_for_change(self, timeout):
+        """等待变化，最多等待timeout秒"""
+        if self._wake_event.is_set():
+            self._wake_event.clear()
+            return False
+        return self._wait(timeout)
+
+    def wake(self):
+        """唤醒正在等待的线程"""
+        self._wake_event.set()
+
+    def sleep(self, timeout):
+        """不关心变化地等待（例如监控暂停时），被wake()唤醒时返回True"""
+        woken = self._wake_event.wait(timeout)
+        self._wake_event.clear()
+        return woken
+
+    def close(self):
+        """释放监听器占用的资源"""
+        self.wake()
+
+    def _wait(self, timeout):
+        raise NotImplementedError
+
+
+class FdWatcher(ChangeWatcher):
+    """在文件描述符上用select等待事件的监听器基类，wake()通过管道唤醒阻塞在select上的线程
+
+    子类实现 fileno() 和 _drain_events()（读出所有已到达的事件，其中有相关变化时返回True）
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._wake_r, self._wake_w = os.pipe()
+
+    def wake(self):
+        super().wake()
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+
+    def close(self):
+        super().close()
+        for fd in (self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def fileno(self):
+        raise NotImplementedError
+
+    def _drain_events(self):
+        raise NotImplementedError
+
+    def _wait(self, timeout):
+        # 先处理已经读入缓冲区的事件，select看不到它们
+        if self._drain_events():
+            return True
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.fileno(), self._wake_r], [], [], remaining)
+            if self._wake_r in readable:
+                os.read(self._wake_r, 64)
+                self._wake_event.clear()
+                return False
+            if readable and self._drain_events():
+                return True
@@ -0,0 +1,296 @@
+"""
+剪贴板变化监听模块
+提供可插拔的剪贴板监听后端：Linux下使用X11 XFixes选择所有者事件，
+Windows下使用剪贴板序列号，测试时使用内存中的假剪贴板，轮询仅作为兜底方案
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from change_watcher import ChangeWatcher, FdWatcher
+
+# 计算内容摘要时，只取开头和结尾各这么多字符，避免对超大剪贴板内容做完整哈希
+DIGEST_EDGE_CHARS = 64 * 1024
+
+
+def content_digest(text):
+    """计算剪贴板内容的有界摘要（长度 + 头尾片段的哈希）"""
+    if text is None:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(text)).encode())
+    if len(text) <= DIGEST_EDGE_CHARS * 2:
+        h.update(text.encode("utf-8", "surrogatepass"))
+    else:
+        h.update(text[:DIGEST_EDGE_CHARS].encode("utf-8", "surrogatepass"))
+        h.update(text[-DIGEST_EDGE_CHARS:].encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+class ClipboardWatcher(ChangeWatcher):
+    """剪贴板监听器基类（等待和唤醒见change_watcher.ChangeWatcher）
+
+    子类实现 _wait(timeout)，在剪贴板可能发生变化时返回True，超时返回False
+    """
+
+    def change_token(self):
+        """返回代表当前剪贴板版本的廉价标记（无需读取内容），不支持时返回None"""
+        return None
+
+
+class PollingWatcher(ClipboardWatcher):
+    """轮询（兜底方案），每次等待结束都认为剪贴板可能已变化
+
+    提供scheduler（AdaptivePollScheduler）时按活动情况自适应调整间隔，否则使用固定间隔
+    """
+
+    name = "poll"
+
+    def __init__(self, interval=1.0, scheduler=None):
+        super().__init__()
+        self.interval = interval
+        self.scheduler = scheduler
+
+    def _wait(self, timeout):
+        interval = self.scheduler.next_interval() if self.scheduler else self.interval
+        woken = self._wake_event.wait(min(timeout, interval))
+        if woken:
+            self._wake_event.clear()
+            return False
+        return True
+
+
+class FakeClipboard:
+    """内存中的假剪贴板，供测试和基准测试使用，接口与pyperclip一致"""
+
+    def __init__(self, text=""):
+        self._text = text
+        self._lock = threading.Lock()
+        self._watchers = []
+        self.sequence = 0
+        self.paste_count = 0
+
+    def copy(self, text):
+        with self._lock:
+            self._text = text
+            self.sequence += 1
+            watchers = list(self._watchers)
+        for watcher in watchers:
+            watcher.notify()
+
+    def paste(self):
+        with self._lock:
+            self.paste_count += 1
+            return self._text
+
+    def watch(self):
+        """创建一个绑定到此假剪贴板的监听器"""
+        watcher = FakeWatcher(self)
+        with self._lock:
+            self._watchers.append(watcher)
+        return watcher
+
+
+class FakeWatcher(ClipboardWatcher):
+    """假剪贴板的监听器，FakeClipboard.copy() 时立即收到通知"""
+
+    name = "fake"
+
+    def __init__(self, clipboard=None):
+        super().__init__()
+        self._clipboard = clipboard
+        self._changed = threading.Condition()
+        self._pending = False
+
+    def change_token(self):
+        return self._clipboard.sequence if self._clipboard else None
+
+    def notify(self):
+        with self._changed:
+            self._pending = True
+            self._changed.notify_all()
+
+    def wake(self):
+        super().wake()
+        with self._changed:
+            self._changed.notify_all()
+
+    def _wait(self, timeout):
+        with self._changed:
+            if not self._pending:
+                self._changed.wait(timeout)
+            if self._wake_event.is_set():
+                self._wake_event.clear()
+                return False
+            changed = self._pending
+            self._pending = False
+            return changed
+
+
+class X11ClipboardWatcher(FdWatcher, ClipboardWatcher):
+    """通过X11 XFixes扩展监听CLIPBOARD选择所有者变化（需要python-xlib）"""
+
+    name = "x11"
+
+    def __init__(self, selection="CLIPBOARD"):
+        from Xlib import display as xdisplay
+        from Xlib.ext import xfixes
+
+        self._display = xdisplay.Display()
+        if not self._display.has_extension("XFIXES"):
+            self._display.close()
+            raise RuntimeError("X服务器不支持XFIXES扩展")
+        self._display.xfixes_query_version()
+
+        root = self._display.screen().root
+        atom = self._display.get_atom(selection)
+        root.xfixes_select_selection_input(atom, xfixes.XFixesSetSelectionOwnerNotifyMask)
+        self._display.flush()
+        self._notify_type = self._display.extension_event.SetSelectionOwnerNotify
+        self._owner_token = None
+        # 显示连接建立成功后再创建唤醒管道，失败时不会泄漏
+        super().__init__()
+
+    def close(self):
+        super().close()
+        try:
+            self._display.close()
+        except Exception:
+            pass
+
+    def fileno(self):
+        return self._display.fileno()
+
+    def change_token(self):
+        # 选择所有者窗口和获得所有权的时间戳唯一标识一次剪贴板写入
+        return self._owner_token
+
+    def _drain_events(self):
+        changed = False
+        while self._display.pending_events():
+            event = self._display.next_event()
+            if event.type == self._notify_type:
+                self._owner_token = (event.owner, event.selection_timestamp)
+                changed = True
+        return changed
+
+
+class WindowsSequenceWatcher(ClipboardWatcher):
+    """通过GetClipboardSequenceNumber检测剪贴板变化，无需读取剪贴板内容"""
+
+    name = "win32"
+
+    def __init__(self, probe_interval=0.05):
+        super().__init__()
+        import ctypes
+        self._get_sequence = ctypes.windll.user32.GetClipboardSequenceNumber
+        self._get_sequence.restype = ctypes.c_uint32
+        self._last_sequence = self._get_sequence()
+        self.probe_interval = probe_interval
+
+    def change_token(self):
+        return self._get_sequence()
+
+    def _wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            sequence = self._get_sequence()
+            if sequence != self._last_sequence:
+                self._last_sequence = sequence
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._wake_event.wait(min(self.probe_interval, remaining)):
+                self._wake_event.clear()
+                return False
+
+
+class ClipboardChangeTracker:
+    """判断剪贴板是否真正变化，并忽略本程序自己写入剪贴板引起的变化
+
+    先比较监听器提供的廉价标记（序列号、所有者/时间戳），标记不变时无需读取内容；
+    只有标记变化或平台不支持标记时才读取内容，并用有界摘要代替保存完整文本
+    """
+
+    def __init__(self, watcher=None, own_write_history=8):
+        self.watcher = watcher
+        self.last_token = None
+        self.last_digest = None
+        # 本程序最近写入剪贴板的 (标记, 摘要)
+        self._own_writes = deque(maxlen=own_write_history)
+        self._lock = threading.Lock()
+
+    def token_changed(self):
+        """根据廉价标记判断是否需要读取剪贴板内容"""
+        token = self.watcher.change_token() if self.watcher else None
+        if token is None:
+            return True
+        with self._lock:
+            if token == self.last_token:
+                return False
+            self.last_token = token
+            for entry in self._own_writes:
+                if entry[0] == token:
+                    self._own_writes.remove(entry)
+                    self.last_digest = entry[1]
+                    return False
+        return True
+
+    def content_changed(self, text):
+        """根据内容摘要判断剪贴板内容是否变化（不是本程序写入的）"""
+        digest = content_digest(text)
+        with self._lock:
+            if digest == self.last_digest:
+                return False
+            self.last_digest = digest
+            for entry in self._own_writes:
+                if entry[1] == digest:
+                    self._own_writes.remove(entry)
+                    return False
+        return True
+
+    def mark_own_write(self, text):
+        """在本程序写入剪贴板后立即调用，监听器收到对应变化时将其忽略"""
+        digest = content_digest(text)
+        token = self.watcher.change_token() if self.watcher else None
+        with self._lock:
+            self._own_writes.append((token, digest))
+
+
+def create_clipboard_watcher(backend="auto", interval=1.0, log=None, scheduler=None):
+    """根据配置和平台创建剪贴板监听器，失败时退回到轮询"""
+    if backend == "auto":
+        if sys.platform.startswith("win"):
+            candidates = ["win32"]
+        elif os.environ.get("DISPLAY"):
+            candidates = ["x11"]
+        else:
+            candidates = []
+    elif backend == "poll":
+        candidates = []
+    else:
+        candidates = [backend]
+
+    factories = {
+        "x11": X11ClipboardWatcher,
+        "win32": WindowsSequenceWatcher,
+    }
+
+    for name in candidates:
+        factory = factories.get(name)
+        if factory is None:
+            if log:
+                log(f"未知的剪贴板监听方式: {name}")
+            continue
+        try:
+            return factory()
+        except Exception as e:
+            if log:
+                log(f"无法使用{name}剪贴板监听，将使用轮询: {e}")
+
+    return PollingWatcher(interval, scheduler)
@@ -0,0 +1,445 @@
+"""
+配置存储模块
+config.json 中的配置经过校验后成为只读的Settings对象，由ConfigStore统一加载、保存和监视：
+保存时先写临时文件再替换，短时间内的多次修改合并成一次写入；配置文件被外部修改时
+（Linux使用inotify，其他平台检查修改时间）重新加载并通知订阅者，无需重启程序
+"""
+
+import copy
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from collections.abc import Mapping
+
+from change_watcher import ChangeWatcher, FdWatcher
+from monitor_core import DEFAULT_CONFIG
+from link_matcher import LinkMatcher
+from router import SEND_MODES, LinkRouter
+from senders import SENDERS
+
+# 除监控配置（见monitor_core.DEFAULT_CONFIG）之外，界面保存的配置项
+EXTRA_DEFAULTS = {
+    "saved_windows": [],  # 保存的窗口标题列表（最近使用的在前）
+}
+
+DEFAULTS = dict(DEFAULT_CONFIG, **EXTRA_DEFAULTS)
+
+# 配置文件被修改后等待多久再读取，秒（编辑器保存时可能连续触发多个事件）
+RELOAD_SETTLE = 0.1
+
+
+def _positive(value):
+    return value > 0
+
+
+def _non_negative(value):
+    return value >= 0
+
+
+def _choice(*choices):
+    return lambda value: value in choices
+
+
+def _valid_patterns(patterns):
+    # 编译一次，正则写错等问题在保存前就能发现，而不是每次检查剪贴板时出错
+    try:
+        LinkMatcher(patterns)
+    except (ValueError, TypeError, AttributeError, re.error):
+        return False
+    return True
+
+
+def _valid_routes(routes):
+    try:
+        LinkRouter((), routes)
+    except (ValueError, TypeError, AttributeError, re.error):
+        return False
+    return True
+
+# 配置项 -> (类型, 列表元素或字典值的类型, 取值检查)；float类型的配置项也接受整数
+FIELDS = {
+    "target_url": (str, None, bool),
+    "link_patterns": (list, str, _valid_patterns),
+    "check_interval": (float, None, _positive),
+    "poll_fast_interval": (float, None, _positive),
+    "poll_fast_window": (float, None, _non_negative),
+    "poll_backoff": (float, None, lambda value: value >= 1),
+    "toggle_hotkey": (str, None, bool),
+    "send_hotkey": (str, None, bool),
+    "clipboard_backend": (str, None, _choice("auto", "x11", "win32", "poll")),
+    "window_backend": (str, None, _choice("auto", "win32", "pywin32", "x11", "none")),
+    "send_methods": (list, str, lambda value: all(name in SENDERS for name in value)),
+    "adaptive_send": (bool, None, None),
+    "send_mode": (str, None, _choice(*SEND_MODES)),
+    "target_send_modes": (dict, str, lambda value: all(mode in SEND_MODES for mode in value.values())),
+    "send_routes": (list, dict, _valid_routes),
+    "inject_chunk_size": (int, None, _positive),
+    "inject_newline_keys": (list, str, bool),
+    "max_scan_chars": (int, None, _non_negative),
+    "send_batch_size": (int, None, _positive),
+    "send_max_wait": (float, None, _non_negative),
+    "auto_send": (bool, None, None),
+    "send_timeout": (float, None, _non_negative),
+    "dedup_ttl": (float, None, _non_negative),
+    "dedup_max_size": (int, None, _positive),
+    "dedup_persist": (bool, None, None),
+    "tracking_params": (list, str, None),
+    "log_max_lines": (int, None, _positive),
+    "metrics_port": (int, None, lambda value: 0 <= value <= 65535),
+    "metrics_json": (bool, None, None),
+    "metrics_flush_interval": (float, None, _positive),
+    "history_enabled": (bool, None, None),
+    "saved_windows": (list, str, None),
+}
+
+# 以后新增的配置项没有写在上面时，按默认值的类型检查
+for _key, _default in DEFAULTS.items():
+    FIELDS.setdefault(_key, (type(_default), None, None))
+
+TYPE_NAMES = {str: "字符串", int: "整数", float: "数字", bool: "true/false", list: "列表", dict: "对象"}
+
+
+def _type_ok(value, kind, item_kind):
+    if kind is float:
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+    elif kind is int:
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        ok = isinstance(value, kind)
+    if ok and item_kind is not None:
+        if isinstance(value, dict):
+            ok = all(isinstance(k, str) and isinstance(v, item_kind) for k, v in value.items())
+        else:
+            ok = all(isinstance(item, item_kind) for item in value)
+    return ok
+
+
+def validate(data, base=None):
+    """校验配置字典，返回 (values, errors)
+
+    values是完整的配置：从base（默认为默认配置）开始，用data中有效的项覆盖，
+    无效的项保留base中的值；errors是每个无效项的说明
+    """
+    values = copy.deepcopy(dict(base if base is not None else DEFAULTS))
+    errors = []
+    for key, value in data.items():
+        field = FIELDS.get(key)
+        if field is None:
+            errors.append(f"未知的配置项: {key}")
+            continue
+        kind, item_kind, check = field
+        if not _type_ok(value, kind, item_kind):
+            type_name = TYPE_NAMES.get(kind, kind.__name__)
+            if item_kind is not None:
+                type_name += f"（元素为{TYPE_NAMES.get(item_kind, item_kind.__name__)}）"
+            errors.append(f"配置项{key}应为{type_name}: {value!r}")
+            continue
+        if check is not None and not check(value):
+            errors.append(f"配置项{key}的值无效: {value!r}")
+            continue
+        values[key] = copy.deepcopy(value)
+    return values, errors
+
+
+class Settings(Mapping):
+    """经过校验的只读配置，可以用属性或下标读取：settings.check_interval、settings["check_interval"]
+
+    修改配置请使用ConfigStore.update()，它会校验、保存并通知订阅者
+    """
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values=None):
+        object.__setattr__(self, "_values", values if values is not None else copy.deepcopy(DEFAULTS))
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("配置是只读的，请使用ConfigStore.update()修改")
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"Settings({self._values!r})"
+
+    def to_dict(self):
+        return copy.deepcopy(self._values)
+
+
+class PollingFileWatcher(ChangeWatcher):
+    """每隔interval秒检查文件的修改时间和大小"""
+
+    name = "poll"
+
+    def __init__(self, path, interval=1.0):
+        super().__init__()
+        self.path = path
+        self.interval = interval
+        self._signature = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except OSError:
+            return None
+
+    def _wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._wake_event.wait(min(remaining, self.interval)):
+                self._wake_event.clear()
+                return False
+            signature = self._stat()
+            if signature != self._signature:
+                self._signature = signature
+                return True
+
+
+class InotifyFileWatcher(FdWatcher):
+    """通过Linux inotify监视文件所在目录（保存时文件会被替换，直接监视文件会失效）"""
+
+    name = "inotify"
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, path):
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1失败")
+        directory = os.path.dirname(os.path.abspath(path))
+        wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), self.IN_CLOSE_WRITE | self.IN_MOVED_TO)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"无法监视目录: {directory}")
+        self.path = path
+        self._name = os.fsencode(os.path.basename(path))
+        super().__init__()
+
+    def close(self):
+        super().close()
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+    def fileno(self):
+        return self._fd
+
+    def _drain_events(self):
+        """读出所有事件，其中有目标文件的事件时返回True"""
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset + self.EVENT_HEADER.size <= len(data):
+                _, _, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name == self._name:
+                    changed = True
+
+
+def create_file_watcher(path, interval=1.0, log=None):
+    """Linux上使用inotify，其他平台或inotify不可用时检查修改时间"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyFileWatcher(path)
+        except Exception as e:
+            if log:
+                log(f"无法使用inotify监视配置文件，将定期检查: {e}")
+    return PollingFileWatcher(path, interval)
+
+
+class ConfigStore:
+    """配置存储：加载、校验、保存并监视配置文件
+
+    subscribe(callback) 注册回调 callback(settings, changed)，配置变化后调用（changed是变化的配置项名称集合）；
+    回调可能在调用update()的线程或监视线程中执行
+    """
+
+    def __init__(self, path, log=print, save_delay=0.5):
+        self.path = path
+        self.log = log
+        self.save_delay = save_delay  # 修改后多久写入文件，期间的多次修改合并成一次写入
+        self.settings = Settings()
+        self.saves = 0  # 实际写入文件的次数
+        self._subscribers = []
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._save_timer = None
+        self._written = None  # 最后一次写入的内容，用于忽略本程序自己的写入引起的文件变化
+        self._watcher = None
+        self._thread = None
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def _read(self):
+        """读取配置文件，返回 (文本, 字典)；文件不存在或无法解析时返回None"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.log(f"读取配置文件失败: {e}")
+            return None
+        try:
+            data = json.loads(text)
+            if not isinstance(data, dict):
+                raise ValueError("配置文件的内容应为JSON对象")
+        except ValueError as e:
+            self.log(f"配置文件格式错误，保留当前配置: {e}")
+            return None
+        return text, data
+
+    def _apply(self, values):
+        """替换当前配置并通知订阅者，返回变化的配置项"""
+        with self._lock:
+            old = self.settings
+            self.settings = Settings(values)
+            changed = {key for key in values if values[key] != old[key]}
+        if changed:
+            for callback in list(self._subscribers):
+                try:
+                    callback(self.settings, changed)
+                except Exception as e:
+                    self.log(f"应用配置出错: {e}")
+        return changed
+
+    def load(self):
+        """从配置文件加载（文件不存在时使用默认配置），返回Settings"""
+        result = self._read()
+        if result is None:
+            return self.settings
+        text, data = result
+        values, errors = validate(data)
+        for error in errors:
+            self.log(error)
+        self._apply(values)
+        self._written = text
+        self.log(f"已加载用户配置: {self.path}")
+        return self.settings
+
+    def reload(self):
+        """重新读取配置文件，有变化时立即生效并通知订阅者，返回变化的配置项"""
+        result = self._read()
+        if result is None:
+            return set()
+        text, data = result
+        if text == self._written:
+            # 本程序自己写入的，或内容没有变化
+            return set()
+        with self._lock:
+            # 无效的项保留当前值，文件中删除的项恢复默认值
+            values, errors = validate(data, self.settings)
+            for key, default in DEFAULTS.items():
+                if key not in data:
+                    values[key] = copy.deepcopy(default)
+            self._written = text
+        for error in errors:
+            self.log(error)
+        changed = self._apply(values)
+        if changed:
+            self.log(f"配置文件已修改，已生效: {', '.join(sorted(changed))}")
+        return changed
+
+    def update(self, **changes):
+        """修改配置项：校验后立即生效，稍后写入文件；返回无效项的说明列表（无效的项不会修改）"""
+        with self._lock:
+            values, errors = validate(changes, self.settings)
+        for error in errors:
+            self.log(error)
+        if self._apply(values):
+            self.save()
+        return errors
+
+    def save(self):
+        """请求保存：save_delay秒后写入当前配置，期间的多次保存只写一次文件"""
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """立即写入尚未保存的修改（退出程序前调用）"""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+            if timer is not None:
+                timer.cancel()
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._write(json.dumps(self.settings.to_dict(), ensure_ascii=False, indent=2))
+
+    def _write(self, text):
+        """写入文件（先写临时文件再替换，避免写到一半时损坏）"""
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self._written = text
+            self.saves += 1
+        except Exception as e:
+            self.log(f"保存配置文件失败: {e}")
+
+    def watch(self, interval=1.0):
+        """开始监视配置文件，被外部修改时重新加载"""
+        if self._thread is not None:
+            return
+        self._watcher = create_file_watcher(self.path, interval, log=self.log)
+        self._thread = threading.Thread(target=self._watch_loop, args=(self._watcher,), daemon=True)
+        self._thread.start()
+
+    def _watch_loop(self, watcher):
+        while self._watcher is watcher:
+            if not watcher.wait_for_change(60):
+                continue
+            time.sleep(RELOAD_SETTLE)
+            if self._watcher is watcher:
+                self.reload()
+
+    def stop(self):
+        """停止监视并写入尚未保存的修改"""
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.wake()
+            self._thread.join(timeout=1)
+            self._thread = None
+            watcher.close()
+        self.flush()
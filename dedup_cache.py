@@ -0,0 +1,206 @@
+"""
+已处理链接去重缓存模块
+按规范化后的链接去重，支持过期时间（TTL）和最大条数（LRU淘汰），可选持久化到文件
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 默认去除的跟踪参数；以 "*" 结尾表示前缀匹配
+DEFAULT_TRACKING_PARAMS = [
+    "utm_*", "spm", "from", "isappinstalled", "scene", "share_token",
+    "fbclid", "gclid", "_t", "timestamp",
+]
+
+# 默认端口，规范化时去掉
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def is_tracking_param(name, tracking_params):
+    """判断查询参数是否为跟踪参数"""
+    name = name.lower()
+    for pattern in tracking_params:
+        if pattern.endswith("*"):
+            if name.startswith(pattern[:-1].lower()):
+                return True
+        elif name == pattern.lower():
+            return True
+    return False
+
+
+def normalize_netloc(parts, scheme):
+    """返回urlsplit()结果中域名转小写、去掉默认端口后的网络位置"""
+    netloc = parts.netloc
+    if parts.hostname:
+        host = parts.hostname.lower()
+        if ":" in host:  # IPv6地址需要加回方括号
+            host = f"[{host}]"
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        userinfo = netloc.rpartition("@")[0]
+        netloc = f"{userinfo}@{host}" if userinfo else host
+        if port is not None and DEFAULT_PORTS.get(scheme) != port:
+            netloc = f"{netloc}:{port}"
+    return netloc
+
+
+def normalize_link(url, tracking_params=DEFAULT_TRACKING_PARAMS):
+    """规范化链接：协议和域名转小写、去掉默认端口和跟踪参数、查询参数排序"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+
+    scheme = parts.scheme.lower()
+    netloc = normalize_netloc(parts, scheme)
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(key, tracking_params)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), parts.fragment))
+
+
+class DedupCache:
+    """已处理链接缓存
+
+    以规范化链接为键，查找和插入均为O(1)；超过ttl秒的记录视为过期，
+    超过max_size条时淘汰最久未使用的记录；指定path时在变化后save_delay秒由后台定时器写入文件
+    （期间的多次变化只写一次，seen()不会等待磁盘），退出前调用flush()写入尚未保存的变化；
+    写入失败（磁盘已满、没有权限等）时通过log报告
+    """
+
+    def __init__(self, ttl=3600, max_size=1000, path=None, tracking_params=DEFAULT_TRACKING_PARAMS,
+                 save_delay=1.0, log=print):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.path = path
+        self.tracking_params = list(tracking_params)
+        self.save_delay = save_delay
+        self.log = log
+        self.hits = 0
+        self.misses = 0
+        self.saves = 0  # 实际写入文件的次数
+        self._entries = OrderedDict()  # 规范化链接 -> 记录时间
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # 保证同一时间只有一个线程写入文件
+        self._dirty = False
+        self._save_timer = None
+        if path:
+            self.load()
+
+    def key(self, url):
+        return normalize_link(url, self.tracking_params)
+
+    def _expired(self, timestamp, now):
+        return self.ttl is not None and self.ttl > 0 and now - timestamp > self.ttl
+
+    def contains(self, url):
+        """只查询链接是否处理过，不记录"""
+        key = self.key(url)
+        now = time.time()
+        with self._lock:
+            timestamp = self._entries.get(key)
+            return timestamp is not None and not self._expired(timestamp, now)
+
+    def seen(self, url):
+        """查询并记录链接：处理过且未过期时返回True（命中），否则记录下来并返回False"""
+        key = self.key(url)
+        now = time.time()
+        with self._lock:
+            timestamp = self._entries.get(key)
+            if timestamp is not None and not self._expired(timestamp, now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+
+            self.misses += 1
+            self._entries[key] = now
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        if self.path:
+            self.save()
+        return False
+
+    def forget(self, url):
+        """删除一条记录（例如发送失败后允许再次处理）"""
+        with self._lock:
+            removed = self._entries.pop(self.key(url), None) is not None
+        if removed and self.path:
+            self.save()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            self.save()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """返回命中/未命中计数"""
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def load(self):
+        """从文件加载未过期的记录"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except Exception:
+            return
+        now = time.time()
+        with self._lock:
+            for key, timestamp in sorted(saved.items(), key=lambda item: item[1]):
+                if not self._expired(timestamp, now):
+                    self._entries[key] = timestamp
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        """请求保存：save_delay秒后在定时器线程中写入文件，期间的多次保存只写一次"""
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """立即写入尚未保存的变化（退出程序前调用）"""
+        with self._save_lock:
+            with self._lock:
+                timer, self._save_timer = self._save_timer, None
+                if timer is not None:
+                    timer.cancel()
+                if not self._dirty or not self.path:
+                    return
+                self._dirty = False
+                data = dict(self._entries)
+            self._write(data)
+
+    def _write(self, data):
+        """写入文件（先写临时文件再替换，避免写到一半时损坏）"""
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            self.saves += 1
+        except Exception as e:
+            self.log(f"保存已处理链接失败: {e}")
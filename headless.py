@@ -0,0 +1,143 @@
+"""
+无界面运行模块
+不导入tkinter：剪贴板监听、热键和发送照常工作，日志和事件以JSON行的形式写到标准输出或文件，
+检测到链接时通过回调（或外部命令）通知，不会弹出任何窗口
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+from datetime import datetime
+
+
+class StructuredLog:
+    """把日志和事件写成JSON行（每行一个对象），可同时输出到标准输出和文件"""
+
+    def __init__(self, stream=sys.stdout, path=None):
+        self.stream = stream
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._lock = threading.Lock()
+
+    def write(self, event, **fields):
+        record = {"time": datetime.now().isoformat(timespec="milliseconds"), "event": event}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            if self.stream:
+                print(line, file=self.stream, flush=True)
+            if self._file:
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def log(self, message):
+        """Monitor的log回调"""
+        self.write("log", message=message)
+
+    def notify(self, message, type="info"):
+        """Monitor的notify回调：只记录，不弹窗"""
+        self.write("notify", level=type, message=message)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def command_hook(command, log=None):
+    """返回on_detect回调：检测到链接时在后台运行外部命令
+
+    链接通过环境变量WX_LINKS传递（每行一条），剪贴板中的完整文本从标准输入传入
+    （文本可能有几MB，超过环境变量的长度限制）
+    """
+    def feed(process, data):
+        # 在后台线程中写入，命令不读取标准输入或读得很慢时不会阻塞监控
+        try:
+            process.stdin.write(data)
+            process.stdin.close()
+        except OSError:
+            pass
+        process.wait()
+
+    def on_detect(text, links):
+        env = dict(os.environ, WX_LINKS="\n".join(links))
+        try:
+            process = subprocess.Popen(command, shell=True, env=env, stdin=subprocess.PIPE)
+        except Exception as e:
+            if log:
+                log.log(f"运行检测命令失败: {e}")
+            return
+        data = text.encode("utf-8", "surrogatepass")
+        threading.Thread(target=feed, args=(process, data), daemon=True).start()
+    return on_detect
+
+
+class HeadlessRunner:
+    """无界面前端：注册热键、启动Monitor，直到收到停止信号"""
+
+    def __init__(self, monitor, log, hotkeys=True, saved_windows=()):
+        self.monitor = monitor
+        self.log = log
+        self.hotkeys = hotkeys
+        self.saved_windows = list(saved_windows)
+        self.stop_event = threading.Event()
+        self._hotkey_handles = []
+
+    def register_hotkeys(self):
+        """注册全局热键，热键配置修改后再次调用会重新绑定"""
+        config = self.monitor.config
+        try:
+            import keyboard
+            while self._hotkey_handles:
+                keyboard.remove_hotkey(self._hotkey_handles.pop())
+            self._hotkey_handles.append(keyboard.add_hotkey(config["toggle_hotkey"], self.monitor.toggle))
+            self._hotkey_handles.append(keyboard.add_hotkey(config["send_hotkey"], lambda: self.monitor.request_send("hotkey")))
+        except Exception as e:
+            self.log.write("error", message=f"注册热键失败: {e}")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def run(self):
+        """运行直到stop()被调用、收到SIGTERM或按下Ctrl+C，返回退出码"""
+        monitor = self.monitor
+        if threading.current_thread() is threading.main_thread() and hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, self.stop)
+
+        if self.hotkeys:
+            self.register_hotkeys()
+        if monitor.restore_window(self.saved_windows):
+            self.log.write("window", title=monitor.selected_window_title)
+        monitor.start()
+        self.log.write(
+            "start",
+            patterns=monitor.get_link_patterns(),
+            toggle_hotkey=monitor.config["toggle_hotkey"],
+            send_hotkey=monitor.config["send_hotkey"],
+            auto_send=monitor.config["auto_send"],
+            send_order=monitor.send_order_summary(),
+        )
+
+        try:
+            if sys.platform.startswith("win"):
+                # Windows上无超时的等待不能被Ctrl+C打断
+                while not self.stop_event.wait(1.0):
+                    pass
+            else:
+                self.stop_event.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            monitor.stop()
+            self.log.write(
+                "stop",
+                batches_sent=monitor.send_queue.batches_sent,
+                items_sent=monitor.send_queue.items_sent,
+                pending=len(monitor.send_queue),
+                stats=monitor.poll_scheduler.summary(),
+            )
+            self.log.close()
+        return 0
@@ -0,0 +1,275 @@
+"""
+历史记录模块
+每次检测到链接和每次发送尝试都追加到配置目录下的SQLite数据库（只插入，不修改）。
+记录时只放入内存队列，由后台线程攒批后在一个事务中写入（WAL模式），检测剪贴板时不会等待磁盘；
+表按URL和时间建立索引，几十万条记录时查询仍然很快（见 python benchmark.py history）
+"""
+
+import queue
+import threading
+import time
+
+# 记录类型
+DETECT = "detect"
+SEND = "send"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,      -- 时间戳（time.time()）
+    kind TEXT NOT NULL,      -- detect/send
+    url TEXT NOT NULL,       -- 规范化后的链接
+    source TEXT NOT NULL,    -- 来源：检测为clipboard，发送为触发方式（button/hotkey/auto等）
+    method TEXT NOT NULL,    -- 发送方法（检测记录为空）
+    outcome TEXT NOT NULL,   -- 检测: new/duplicate；发送: sent/failed/cancelled
+    latency REAL             -- 检测延迟或本次发送尝试的耗时，秒
+);
+CREATE INDEX IF NOT EXISTS events_url_time ON events (url, time);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+"""
+
+COLUMNS = ("time", "kind", "url", "source", "method", "outcome", "latency")
+
+_STOP = object()
+
+
+def _connect(path):
+    import sqlite3
+
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class HistoryStore:
+    """检测和发送的历史记录
+
+    record_*() 只把记录放入队列（可在任意线程调用，不访问磁盘），start()启动的后台线程
+    每攒够batch_size条或等待flush_interval秒后在一个事务中写入。
+    normalize: 写入前对链接做规范化的函数，在后台线程中调用
+    """
+
+    def __init__(self, path, normalize=None, batch_size=500, flush_interval=0.2):
+        self.path = path
+        self.normalize = normalize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0   # 已写入的记录数
+        self.errors = 0    # 写入失败的批次数
+        self.error = None  # 后台线程无法打开数据库时的错误（此后不再记录）
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._local = threading.local()
+
+    # ---- 记录 ----
+
+    def record(self, kind, url, source="", method="", outcome="", latency=None, timestamp=None):
+        """加入写入队列"""
+        if self.error is not None:
+            return
+        self._queue.put((timestamp or time.time(), kind, url, source, method, outcome, latency))
+
+    def record_detection(self, url, outcome, latency=None, source="clipboard"):
+        self.record(DETECT, url, source, "", outcome, latency)
+
+    def record_send(self, url, method, outcome, latency, source=""):
+        self.record(SEND, url, source, method, outcome, latency)
+
+    # ---- 后台写入 ----
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """写入队列中剩余的记录后停止"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    def flush(self, timeout=5.0):
+        """等待此前加入的记录全部写入，返回是否在timeout秒内完成"""
+        if self._thread is None:
+            return False
+        done = threading.Event()
+        self._queue.put(lambda error: done.set())
+        return done.wait(timeout) and self.error is None
+
+    def query(self, callback, query="", **kwargs):
+        """不等待地查询：后台线程写入此前加入的记录后执行search()，把结果交给callback(records, error)
+
+        callback在后台线程中调用（界面需要自己转交给界面线程）；后台线程没有运行时直接在当前线程查询，
+        后台线程无法打开数据库时立即以该错误调用callback
+        """
+        def run(error=None):
+            if error is None:
+                try:
+                    records = self.search(query, **kwargs)
+                except Exception as e:
+                    records, error = [], e
+            callback([] if error is not None else records, error)
+
+        if self._thread is None:
+            run(self.error)
+        else:
+            self._queue.put(run)
+
+    def _run(self):
+        try:
+            conn = _connect(self.path)
+            conn.executescript(SCHEMA)
+        except Exception as e:
+            print(f"无法打开历史记录数据库: {e}")
+            self._fail(e)
+            return
+
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            rows, waiters = [], []
+            # 攒批：flush_interval秒内到达的记录一起写入
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif callable(item):
+                    # flush()和query()：写入之前的记录后调用waiter(None)
+                    waiters.append(item)
+                else:
+                    rows.append(item)
+                if stopping or waiters or len(rows) >= self.batch_size:
+                    # 停止或有人在等待时不再等待新记录，但把队列中已有的记录一起写入
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if len(rows) >= self.batch_size:
+                        self._write(conn, rows)
+                        rows = []
+                    continue
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._write(conn, rows)
+            for waiter in waiters:
+                self._answer(waiter, None)
+        conn.close()
+        # query()在本线程中打开的只读连接
+        reader = getattr(self._local, "conn", None)
+        if reader is not None:
+            reader.close()
+
+    def _answer(self, waiter, error):
+        try:
+            waiter(error)
+        except Exception as e:
+            print(f"历史记录回调出错: {e}")
+
+    def _fail(self, error):
+        """后台线程无法工作：不再接受记录，丢弃已排队的记录，以error回复等待中的flush()和query()"""
+        self.error = error
+        self._thread = None
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if callable(item):
+                self._answer(item, error)
+
+    def _write(self, conn, rows):
+        if not rows:
+            return
+        if self.normalize:
+            rows = [row[:2] + (self._normalize(row[2]),) + row[3:] for row in rows]
+        try:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO events (time, kind, url, source, method, outcome, latency) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("COMMIT")
+            self.written += len(rows)
+        except Exception as e:
+            self.errors += 1
+            print(f"写入历史记录失败: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+
+    def _normalize(self, url):
+        try:
+            return self.normalize(url)
+        except Exception:
+            return url
+
+    # ---- 查询 ----
+
+    def _reader(self):
+        """每个线程使用自己的只读连接（WAL模式下读取不会被写入阻塞）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def search(self, query="", kind=None, since=None, until=None, limit=100):
+        """查询历史记录，最新的在前，返回字典列表
+
+        query以http://或https://开头时按URL前缀查询（使用索引），否则查询URL中包含query的记录
+        """
+        where, params = [], []
+        if query:
+            if query.startswith(("http://", "https://")):
+                where.append("url >= ? AND url < ?")
+                params += [query, query + "\U0010ffff"]
+            else:
+                escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                where.append("url LIKE ? ESCAPE '\\'")
+                params.append(f"%{escaped}%")
+        if kind:
+            where.append("kind = ?")
+            params.append(kind)
+        if since is not None:
+            where.append("time >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("time < ?")
+            params.append(until)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY time DESC LIMIT ?"
+        params.append(limit)
+        try:
+            rows = self._reader().execute(sql, params).fetchall()
+        except Exception as e:
+            if "no such table" in str(e):
+                return []
+            raise
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def count(self):
+        """记录总数"""
+        try:
+            return self._reader().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        except Exception:
+            return 0
+
+
+def format_record(record):
+    """把一条记录格式化成一行文字"""
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["time"]))
+    latency = f"{record['latency'] * 1000:.0f}ms" if record["latency"] is not None else "-"
+    kind = "检测" if record["kind"] == DETECT else "发送"
+    detail = record["outcome"] + (f"/{record['method']}" if record["method"] else "")
+    return f"{stamp}  {kind}  {detail:18s} {record['source']:12s} {latency:>7s}  {record['url']}"
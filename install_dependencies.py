@@ -31,7 +31,8 @@ required_packages = {
 
 # 可选但推荐的依赖包
 optional_packages = {
-    'pywin32': 'Windows API接口库，用于更精确地控制窗口'
+    'pywin32': 'Windows API接口库，用于更精确地控制窗口',
+    'python-xlib': 'X11接口库，用于在Linux下即时监听剪贴板变化'
 }
 
 # 检查和安装函数
@@ -39,6 +40,8 @@ def check_and_install_package(package_name, description):
     module_name = package_name
     if package_name == 'pywin32':
         module_name = 'win32gui'
+    elif package_name == 'python-xlib':
+        module_name = 'Xlib'
     
     if importlib.util.find_spec(module_name) is None:
         print(f"- 正在安装 {package_name}({description})...")
@@ -0,0 +1,262 @@
+"""
+链接匹配模块
+把配置中的多条链接规则（字面前缀、通配符、正则表达式）一次性编译成匹配器：
+字面规则使用Aho-Corasick自动机，可以合并的正则先用一个合并后的正则整体筛选，
+扫描文本时一遍找出所有命中的URL；很大的文本可以用scan()分块扫描
+"""
+
+import fnmatch
+import re
+from collections import namedtuple
+
+# 文本中的候选URL；遇到空白、引号、尖括号和中文标点即认为URL结束
+URL_CHARS = r"[^\s<>\"'`，。；！？、（）【】《》「」]"
+URL_PATTERN = re.compile(r"https?://" + URL_CHARS + "+", re.IGNORECASE)
+URL_REST = re.compile(URL_CHARS + "*")
+
+# URL末尾常见的误带标点
+URL_TRAILING_PUNCTUATION = ".,;:!?)]}"
+
+# 分块扫描时每块的字符数，以及块之间的重叠（跨块的URL最长能识别这么多字符）
+SCAN_CHUNK_SIZE = 256 * 1024
+URL_MAX_LENGTH = 8 * 1024
+
+# 一次匹配结果：URL在原文中的起止位置、URL本身、命中的规则（按配置顺序）及其编号
+LinkMatch = namedtuple("LinkMatch", ["start", "end", "url", "patterns", "rules"])
+
+
+class AhoCorasick:
+    """纯Python实现的Aho-Corasick多模式字符串匹配自动机"""
+
+    def __init__(self, words=()):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._built = False
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        """添加一个模式串，返回其编号"""
+        if not word:
+            raise ValueError("模式串不能为空")
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = nxt
+        self._output[state] = self._output[state] + (word,)
+        self._built = False
+        return state
+
+    def build(self):
+        """按广度优先计算失败指针"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+        self._built = True
+
+    def iter_matches(self, text):
+        """依次产生 (起始位置, 模式串)"""
+        if not self._built:
+            self.build()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for word in output[state]:
+                    yield pos - len(word) + 1, word
+
+
+def parse_pattern(spec):
+    """把配置项解析成 (类型, 模式)
+
+    字符串以 "re:" 开头视为正则，含有 * 或 ? 视为通配符，其余视为URL前缀；
+    也可以直接写成 {"type": "prefix"/"contains"/"glob"/"regex", "pattern": "..."}
+    """
+    if isinstance(spec, dict):
+        kind = spec.get("type", "prefix")
+        pattern = spec.get("pattern", "")
+    elif spec.startswith("re:"):
+        kind, pattern = "regex", spec[3:]
+    elif "*" in spec or "?" in spec:
+        kind, pattern = "glob", spec
+    else:
+        kind, pattern = "prefix", spec
+
+    if kind not in ("prefix", "contains", "glob", "regex"):
+        raise ValueError(f"未知的链接规则类型: {kind}")
+    if not pattern:
+        raise ValueError("链接规则不能为空")
+    return kind, pattern
+
+
+def glob_hint(pattern):
+    """取通配符中最长的一段字面内容，作为自动机的预筛选条件"""
+    pieces = re.split(r"[*?\[\]]", pattern)
+    return max(pieces, key=len).lower()
+
+
+def combinable(regex):
+    """正则能否原样放进合并的筛选正则
+
+    内联的全局标志（如(?i)）只能出现在整个正则的开头，分组在合并后会重新编号（\\1等反向引用
+    会指向别的分组），这两种正则需要单独检查
+    """
+    return regex.flags == re.UNICODE and not regex.groups
+
+
+class LinkMatcher:
+    """编译好的多规则链接匹配器"""
+
+    def __init__(self, patterns):
+        self.patterns = [parse_pattern(spec) for spec in patterns]
+        self._literals = AhoCorasick()
+        # 小写的字面串 -> [(规则编号, 用途, 原始模式串)]
+        # 用途: prefix 要求出现在URL开头, contains 出现在任意位置, hint 通配符的预筛选片段
+        self._literal_rules = {}
+        # 规则编号 -> 编译好的通配符
+        self._globs = {}
+        # 没有字面片段、每个URL都要检查的通配符
+        self._unhinted_globs = []
+        # (规则编号, 编译好的正则)
+        self._regexes = []
+
+        for index, (kind, pattern) in enumerate(self.patterns):
+            if kind == "glob":
+                self._globs[index] = re.compile(fnmatch.translate(pattern))
+                hint = glob_hint(pattern)
+                if hint:
+                    self._add_literal(hint, index, "hint", pattern)
+                else:
+                    self._unhinted_globs.append(index)
+            elif kind == "regex":
+                self._regexes.append((index, re.compile(pattern)))
+            else:
+                self._add_literal(pattern.lower(), index, kind, pattern)
+
+        self._literals.build()
+        # 可以合并的正则合并成一个，先整体判断是否可能命中，命中后再逐条确认；
+        # 其余的正则（及只有一条可合并时）每个URL逐条检查
+        self._regex_filter = None
+        self._filtered_regexes = [(index, regex) for index, regex in self._regexes if combinable(regex)]
+        if len(self._filtered_regexes) > 1:
+            try:
+                self._regex_filter = re.compile(
+                    "|".join(f"(?:{regex.pattern})" for _, regex in self._filtered_regexes))
+            except re.error:
+                self._regex_filter = None
+        if self._regex_filter is None:
+            self._filtered_regexes = []
+        self._plain_regexes = [entry for entry in self._regexes if entry not in self._filtered_regexes]
+
+    def _add_literal(self, key, index, mode, pattern):
+        # 自动机统一按小写匹配（协议和域名不区分大小写）
+        if key not in self._literal_rules:
+            self._literals.add(key)
+            self._literal_rules[key] = []
+        self._literal_rules[key].append((index, mode, pattern))
+
+    def _match_url(self, url):
+        """返回命中此URL的规则编号集合"""
+        hits = set()
+        candidates = set(self._unhinted_globs)
+        if self._literal_rules:
+            for start, word in self._literals.iter_matches(url.lower()):
+                for index, mode, pattern in self._literal_rules[word]:
+                    if mode == "hint":
+                        candidates.add(index)
+                    elif mode == "prefix":
+                        if start == 0:
+                            hits.add(index)
+                    # contains规则区分大小写，用原文再确认一次
+                    elif url[start:start + len(pattern)] == pattern:
+                        hits.add(index)
+        for index in candidates:
+            if self._globs[index].match(url):
+                hits.add(index)
+        for index, regex in self._plain_regexes:
+            if regex.search(url):
+                hits.add(index)
+        if self._regex_filter is not None and self._regex_filter.search(url):
+            for index, regex in self._filtered_regexes:
+                if regex.search(url):
+                    hits.add(index)
+        return hits
+
+    def _result(self, start, url, hits):
+        rules = tuple(sorted(hits))
+        return LinkMatch(start, start + len(url), url, tuple(self.patterns[i] for i in rules), rules)
+
+    def find_all(self, text):
+        """一遍扫描文本，返回所有命中规则的URL"""
+        results = []
+        for candidate in URL_PATTERN.finditer(text):
+            url = candidate.group().rstrip(URL_TRAILING_PUNCTUATION)
+            hits = self._match_url(url)
+            if hits:
+                results.append(self._result(candidate.start(), url, hits))
+        return results
+
+    def scan(self, text, limit=0, chunk_size=SCAN_CHUNK_SIZE, overlap=URL_MAX_LENGTH):
+        """分块扫描text的前limit个字符（0表示不限制），返回命中规则的URL
+
+        直接在原文上按位置扫描，不复制文本；每块多扫描overlap个字符，跨块的URL也能找到。
+        所有规则都已命中时不再扫描后面的块（同一块中的链接仍会全部找到）
+        """
+        end = min(len(text), limit) if limit else len(text)
+        results = []
+        found = set()
+        total = len(self.patterns)
+        pos = consumed = 0
+        while pos < end:
+            chunk_end = min(pos + chunk_size, end)
+            scan_end = min(chunk_end + overlap, end)
+            # 从上一块最后一个URL的末尾开始，避免把URL中间的"http://"当成新的URL
+            for candidate in URL_PATTERN.finditer(text, max(pos, consumed), scan_end):
+                start = candidate.start()
+                if start >= chunk_end:
+                    # 从重叠部分开始的URL留给下一块
+                    break
+                consumed = candidate.end()
+                if consumed == scan_end < end:
+                    # 超过overlap的URL只识别前面一段，跳过剩下的部分
+                    consumed = URL_REST.match(text, consumed, end).end()
+                url = candidate.group().rstrip(URL_TRAILING_PUNCTUATION)
+                hits = self._match_url(url)
+                if hits:
+                    results.append(self._result(start, url, hits))
+                    found.update(hits)
+            pos = chunk_end
+            if len(found) == total:
+                break
+        return results
+
+    def search(self, text):
+        """返回第一个命中的URL，没有时返回None"""
+        for candidate in URL_PATTERN.finditer(text):
+            url = candidate.group().rstrip(URL_TRAILING_PUNCTUATION)
+            hits = self._match_url(url)
+            if hits:
+                return self._result(candidate.start(), url, hits)
+        return None
@@ -0,0 +1,115 @@
+"""
+日志输出模块
+任何线程都可以调用emit()写日志：只放入队列，不直接操作Tk控件；
+有新日志时通过TkBridge安排界面线程批量取出写入日志控件，并把控件限制在固定行数以内，
+同时在内存中保留最近的日志（固定大小的环形缓冲区），绑定控件时用它补上界面创建之前的日志
+"""
+
+import queue
+import sys
+from collections import deque
+
+
+class LogSink:
+    """线程安全的批量日志输出"""
+
+    def __init__(self, capacity=2000, max_lines=1000, batch_size=200, stream=sys.stdout):
+        self.max_lines = max_lines
+        self.batch_size = batch_size  # 每轮最多写入的行数，其余的安排到下一轮，避免界面卡顿
+        self.stream = stream
+        self.ring = deque(maxlen=capacity)  # 最近的日志
+        self._queue = queue.SimpleQueue()
+        self._widget = None
+        self._wake = None
+
+    def emit(self, line):
+        """写一行日志（可在任意线程调用）"""
+        self.ring.append(line)
+        if self._widget is None:
+            # 界面还没有创建时直接输出
+            if self.stream:
+                print(line, file=self.stream)
+            return
+        self._queue.put(line)
+        wake = self._wake
+        if wake is not None:
+            wake()
+
+    def snapshot(self):
+        """返回最近的日志（可在任意线程调用）"""
+        return list(self.ring)
+
+    def attach(self, bridge, widget):
+        """绑定日志控件（必须在界面线程调用）：先写入界面创建之前的日志，之后有新日志时由bridge安排界面线程写入"""
+        # 这些日志已经直接输出过，只写入控件
+        earlier = self.snapshot()[-self.max_lines:]
+        if earlier:
+            self._insert(widget, earlier)
+        self._wake = bridge.call_latest(self._drain_pending)
+        self._widget = widget
+        self._wake()
+
+    def detach(self):
+        """解除绑定，并把尚未写入控件的日志直接输出"""
+        self._widget = None
+        self._wake = None
+        for line in self._take(None):
+            if self.stream:
+                print(line, file=self.stream)
+
+    def _take(self, limit):
+        lines = []
+        while limit is None or len(lines) < limit:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return lines
+
+    def drain(self):
+        """把队列中的日志批量写入控件（必须在界面线程调用），返回写入的行数"""
+        widget = self._widget
+        lines = self._take(self.batch_size)
+        if not lines or widget is None:
+            return 0
+
+        if self.stream:
+            print("\n".join(lines), file=self.stream)
+        self._insert(widget, lines)
+        return len(lines)
+
+    def _insert(self, widget, lines):
+        widget.config(state="normal")
+        widget.insert("end", "\n".join(lines) + "\n")
+        # 超过最大行数时删除最早的日志
+        line_count = int(widget.index("end-1c").split(".")[0]) - 1
+        if line_count > self.max_lines:
+            widget.delete("1.0", f"{line_count - self.max_lines + 1}.0")
+        widget.see("end")
+        widget.config(state="disabled")
+
+    def _drain_pending(self):
+        """写入一批日志，还有剩余时安排到下一轮（由TkBridge在界面线程调用）
+
+        只把TclError当作控件已经销毁；其他错误交给TkBridge报告
+        """
+        import tkinter
+
+        if self._widget is None:
+            return
+        try:
+            self.drain()
+        except tkinter.TclError:
+            # 日志控件已经销毁
+            self.detach()
+            return
+        wake = self._wake
+        if wake is not None and not self._queue.empty():
+            wake()
+
+    def clear(self):
+        """清空日志控件（必须在界面线程调用）"""
+        if self._widget is not None:
+            self._widget.config(state="normal")
+            self._widget.delete("1.0", "end")
+            self._widget.config(state="disabled")
@@ -0,0 +1,289 @@
+"""
+运行指标模块
+计数器和延迟直方图集中登记在MetricsRegistry中，可以通过只监听本机的HTTP端口以Prometheus文本格式导出，
+也可以定期写入JSON文件。计数器加一不加锁（字典的读写由GIL保证不会损坏，极少数并发更新时可能少计一次），
+直方图记录时加锁，对check_clipboard的开销都可以忽略（见 python benchmark.py metrics）
+"""
+
+import json
+import os
+import threading
+import time
+
+from poll_scheduler import LATENCY_BUCKETS_MS, LatencyHistogram
+
+# 窗口查找等快速操作使用的分桶上界（毫秒）
+FAST_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100]
+
+
+def percentile(values, q, default=0.0):
+    """返回已排序列表的分位数（精确值，基准测试和trace回放使用），列表为空时返回default"""
+    if not values:
+        return default
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(pairs):
+    pairs = [(name, value) for name, value in pairs if name]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """计数器，可以带一个标签（例如按发送方法分别计数）
+
+    计数时不加锁：每次检查剪贴板都会计数，而各计数器基本只在一个线程中更新（监控线程或发送线程），
+    省去加锁可以让开销降到几十纳秒；极少数并发更新时丢失一次计数对统计没有影响
+    """
+
+    type = "counter"
+
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}  # 标签值 -> 计数
+
+    def inc(self, amount=1, label=""):
+        values = self.values
+        values[label] = values.get(label, 0) + amount
+
+    def get(self, label=""):
+        return self.values.get(label, 0)
+
+    def render(self):
+        values = dict(self.values)
+        if not values and not self.label:
+            values = {"": 0}
+        return [f"{self.name}{_labels([(self.label, label)])} {value}" for label, value in values.items()]
+
+    def snapshot(self):
+        return dict(self.values)
+
+
+class Gauge(Counter):
+    """可以设置为任意值的指标（例如发送方式当前的排序位置），可以带一个标签"""
+
+    type = "gauge"
+
+    def set(self, value, label=""):
+        self.values[label] = value
+
+
+class Histogram:
+    """延迟直方图（分桶上界单位为毫秒，导出时换算成秒），可以带一个标签（例如发送阶段）"""
+
+    type = "histogram"
+
+    def __init__(self, name, help, label=None, buckets=LATENCY_BUCKETS_MS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = list(buckets)
+        self.histograms = {}  # 标签值 -> LatencyHistogram
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, label=""):
+        histogram = self.histograms.get(label)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(label, LatencyHistogram(self.buckets))
+        histogram.observe(seconds)
+
+    def render(self):
+        with self._lock:
+            histograms = dict(self.histograms)
+        lines = []
+        for label, histogram in histograms.items():
+            counts, count, total = histogram.state()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels([(self.label, label), ('le', bound / 1000)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels([(self.label, label), ('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels([(self.label, label)])} {total}")
+            lines.append(f"{self.name}_count{_labels([(self.label, label)])} {count}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            histograms = dict(self.histograms)
+        result = {}
+        for label, histogram in histograms.items():
+            _, count, total = histogram.state()
+            result[label] = {
+                "count": count,
+                "sum": total,
+                "p50_ms": histogram.percentile(0.5),
+                "p95_ms": histogram.percentile(0.95),
+                "buckets": histogram.snapshot(),
+            }
+        return result
+
+
+class MetricsRegistry:
+    """指标登记表：同名指标只创建一次；log用于报告写入JSON文件失败"""
+
+    def __init__(self, log=print):
+        self.log = log
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, factory, name, help, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory(name, help, **kwargs)
+            return metric
+
+    def counter(self, name, help, label=None):
+        return self._get(Counter, name, help, label=label)
+
+    def gauge(self, name, help, label=None):
+        return self._get(Gauge, name, help, label=label)
+
+    def histogram(self, name, help, label=None, buckets=LATENCY_BUCKETS_MS):
+        return self._get(Histogram, name, help, label=label, buckets=buckets)
+
+    def render_prometheus(self):
+        """返回Prometheus文本格式的全部指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "time": time.time(),
+            "counters": {m.name: m.snapshot() for m in metrics if m.type == "counter"},
+            "gauges": {m.name: m.snapshot() for m in metrics if m.type == "gauge"},
+            "histograms": {m.name: m.snapshot() for m in metrics if m.type == "histogram"},
+        }
+
+    def write_json(self, path):
+        """写入JSON文件（先写临时文件再替换，避免写到一半时损坏）"""
+        data = self.snapshot()
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, path)
+        except Exception as e:
+            self.log(f"写入指标文件失败: {e}")
+
+
+class _NullMetric:
+    def inc(self, amount=1, label=""):
+        pass
+
+    def set(self, value, label=""):
+        pass
+
+    def observe(self, seconds, label=""):
+        pass
+
+
+class NullRegistry:
+    """不记录任何指标的登记表（关闭指标，或在基准测试中作为对照）"""
+
+    _metric = _NullMetric()
+
+    def counter(self, name, help, label=None):
+        return self._metric
+
+    def gauge(self, name, help, label=None):
+        return self._metric
+
+    def histogram(self, name, help, label=None, buckets=LATENCY_BUCKETS_MS):
+        return self._metric
+
+    def render_prometheus(self):
+        return ""
+
+    def snapshot(self):
+        return {"time": time.time(), "counters": {}, "gauges": {}, "histograms": {}}
+
+    def write_json(self, path):
+        pass
+
+
+class MetricsServer:
+    """只监听127.0.0.1的HTTP服务，GET /metrics 返回Prometheus文本格式的指标"""
+
+    def __init__(self, registry, port=9464, host="127.0.0.1"):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+
+class JsonFlusher:
+    """每隔interval秒把指标写入JSON文件，停止时再写一次"""
+
+    def __init__(self, registry, path, interval=60.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.registry.write_json(self.path)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self.registry.write_json(self.path)
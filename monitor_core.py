@@ -0,0 +1,965 @@
+"""
+监控核心模块
+把剪贴板监控、链接检测、去重和发送封装成Monitor对象。导入本模块没有任何副作用
+（不安装依赖、不写文件、不导入pyperclip等第三方库），剪贴板、窗口和发送后端都可以替换，
+测试和基准测试中可以用假后端创建任意多个Monitor；图形界面和热键只是调用它的前端
+"""
+
+import copy
+import re
+import threading
+import time
+
+from clipboard_watcher import ClipboardChangeTracker, content_digest, create_clipboard_watcher
+from dedup_cache import DEFAULT_TRACKING_PARAMS, DedupCache
+from link_extractor import LinkExtractor
+from metrics import FAST_BUCKETS_MS, MetricsRegistry
+from poll_scheduler import AdaptivePollScheduler
+from readiness import StageTimer
+from router import LinkRouter, describe_route
+from send_queue import SendQueue
+from send_strategy import SendStrategy
+from senders import DEFAULT_SEND_METHODS, RouteSender, SendAborted, SendCancelled, create_senders
+from window_backend import WindowIndex, create_window_backend
+
+# 默认配置
+DEFAULT_CONFIG = {
+    "target_url": "https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto",  # 要监测的URL
+    "link_patterns": [],              # 更多链接规则: URL前缀、通配符(含*或?)、"re:"开头的正则；为空时只监测target_url
+    "check_interval": 1.0,  # 检测间隔上限，秒（仅在需要轮询时使用）
+    "poll_fast_interval": 0.05,  # 有活动后的快速轮询间隔，秒
+    "poll_fast_window": 5.0,     # 有活动后保持快速轮询的时间，秒
+    "poll_backoff": 1.5,         # 空闲时轮询间隔每次放大的倍数
+    "toggle_hotkey": "ctrl+shift+m",  # 切换监控状态的热键
+    "send_hotkey": "ctrl+alt+s",      # 发送到微信的热键 (按此键自动粘贴发送)
+    "clipboard_backend": "auto",      # 剪贴板监听方式: auto/x11/win32/poll
+    "window_backend": "auto",         # 窗口操作方式: auto/win32/pywin32/x11/none
+    "send_methods": DEFAULT_SEND_METHODS,  # 依次尝试的发送方法: selected(选择的窗口)/search(查找微信窗口)/alt_tab/web(网页版)
+    "adaptive_send": True,            # 是否按本机各发送方法的成功率和耗时调整尝试顺序、暂时跳过总是失败的方法
+    "send_mode": "clipboard",         # 发送方式: clipboard(复制粘贴) / inject(直接输入文字，不占用剪贴板)
+    "target_send_modes": {},          # 按窗口指定发送方式: {"窗口标题关键字": "inject"}
+    "send_routes": [],                # 按链接规则发送到不同窗口: [{"pattern": 链接规则, "title": 窗口标题关键字, "pid": 进程号, "send_mode": 发送方式}]
+    "inject_chunk_size": 200,         # 直接输入时每批输入的字符数
+    "inject_newline_keys": ["shift", "enter"],  # 直接输入时用于换行的组合键
+    "max_scan_chars": 2 * 1024 * 1024,  # 剪贴板内容最多检查的字符数，超出部分不检查（0表示不限制）
+    "send_batch_size": 10,            # 一条消息最多合并的链接数
+    "send_max_wait": 2.0,             # 自动发送时第一条链接最多等待多久再发送，秒
+    "auto_send": False,               # 是否不等热键、攒批后自动发送
+    "send_timeout": 30.0,             # 每批发送的超时时间，秒；超时后在下一个步骤之前中止（0表示不限制）
+    "dedup_ttl": 3600,                # 已处理链接的记忆时间，秒（0表示永久）
+    "dedup_max_size": 1000,           # 最多记住的已处理链接数
+    "dedup_persist": True,            # 是否把已处理链接保存到文件，重启后仍然有效
+    "tracking_params": DEFAULT_TRACKING_PARAMS,  # 去重和发送时去掉的跟踪参数，"*"结尾表示前缀
+    "log_max_lines": 1000,            # 日志区域最多保留的行数
+    "metrics_port": 0,                # 在127.0.0.1的该端口导出Prometheus格式的指标（/metrics），0表示不导出
+    "metrics_json": False,            # 是否定期把指标写入配置目录下的metrics.json
+    "metrics_flush_interval": 60,     # 写入metrics.json的间隔，秒
+    "history_enabled": True,          # 是否把检测和发送记录写入配置目录下的history.db
+}
+
+
+class Monitor:
+    """剪贴板监控引擎
+
+    clipboard: 提供copy(text)/paste()的剪贴板后端，默认使用pyperclip
+    clipboard_watcher: 剪贴板监听器，默认在监控线程中按配置创建；clipboard有watch()时使用它的监听器
+    window_backend: 窗口操作后端，默认按配置创建
+    senders: 依次尝试的发送方式（senders.Sender），默认按send_methods配置创建
+    sender: send(text, items) 发送一批内容，成功返回True，默认使用send_text()
+    log: log(message) 输出日志
+    notify: notify(message, type) 显示通知，未提供时只写日志
+    on_detect: on_detect(text, links) 检测到新链接并加入发送队列后调用
+    on_state_change: on_state_change() 监控状态或待发送状态变化后调用（可能在事件循环线程中调用）
+    dedup_path: 已处理链接的保存文件，None表示不保存
+    send_stats_path: 各发送方法成功率和耗时统计的保存文件，None表示不保存
+    metrics: 指标登记表（metrics.MetricsRegistry），默认每个Monitor单独创建；传入NullRegistry()关闭指标
+    history: 检测和发送的历史记录（history.HistoryStore），None表示不记录
+    """
+
+    def __init__(self, config=None, clipboard=None, clipboard_watcher=None, window_backend=None,
+                 senders=None, sender=None, log=None, notify=None, on_detect=None, dedup_path=None,
+                 metrics=None, on_state_change=None, send_stats_path=None, history=None):
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        if config:
+            self.config.update(config)
+        self.log = log or print
+        self.notify = notify
+        self.on_detect = on_detect
+        self.on_state_change = on_state_change
+
+        # 运行指标
+        self.metrics = metrics if metrics is not None else MetricsRegistry(log=self.log)
+        self._polls = self.metrics.counter("wx_clipboard_polls_total", "剪贴板检查次数")
+        self._changes = self.metrics.counter("wx_clipboard_changes_total", "剪贴板内容变化次数")
+        self._matches = self.metrics.counter("wx_link_matches_total", "匹配到的目标链接数")
+        self._dedup_hits = self.metrics.counter("wx_dedup_hits_total", "最近已处理过而跳过的链接数")
+        self._sends = self.metrics.counter("wx_sends_total", "成功发送的批次数", label="method")
+        self._send_failures = self.metrics.counter("wx_send_failures_total", "发送失败次数", label="method")
+        self._detection_latency = self.metrics.histogram(
+            "wx_detection_latency_seconds", "剪贴板变化到检测完成的延迟")
+        stage_histogram = self.metrics.histogram(
+            "wx_send_stage_seconds", "发送各阶段的等待时间", label="stage")
+        lookup_histogram = self.metrics.histogram(
+            "wx_window_lookup_seconds", "窗口查找耗时", label="kind", buckets=FAST_BUCKETS_MS)
+        self._method_latency = self.metrics.histogram(
+            "wx_send_method_seconds", "每种发送方法每次尝试的耗时", label="method")
+        self._method_rank = self.metrics.gauge(
+            "wx_send_method_rank", "发送方法当前的尝试顺序（0最先，-1表示暂时跳过）", label="method")
+        self._method_success = self.metrics.gauge(
+            "wx_send_method_success_ratio", "发送方法的近期成功率", label="method")
+
+        if clipboard is None:
+            import pyperclip
+            clipboard = pyperclip
+        self.clipboard = clipboard
+        if clipboard_watcher is None and hasattr(clipboard, "watch"):
+            clipboard_watcher = clipboard.watch()
+        self.clipboard_watcher = clipboard_watcher  # 剪贴板变化监听器
+        self._owns_watcher = clipboard_watcher is None
+
+        if window_backend is None:
+            window_backend = create_window_backend(self.config["window_backend"], log=self.log)
+        self.window_backend = window_backend  # 窗口操作后端
+        self.window_index = WindowIndex(window_backend, histogram=lookup_histogram)  # 窗口索引（一次枚举，缓存句柄）
+        if senders is None:
+            senders = create_senders(self.config["send_methods"], log=self.log)
+        self.senders = list(senders)
+        self.sender = sender or self.send_text
+        self.send_strategy = SendStrategy(   # 按本机统计调整发送方法的尝试顺序
+            path=send_stats_path, adaptive=self.config["adaptive_send"], log=self.log)
+
+        # 监控状态
+        self.last_processed_digest = None  # 最近一次处理的内容的摘要（不保存完整文本）
+        self.is_monitoring = True
+        self.processed_url_ready = False  # 标记是否有处理好的链接等待发送
+        self.selected_wechat_window = None  # 用户选择的微信窗口
+        self.selected_window_title = ""     # 选中窗口的标题
+
+        self.clipboard_tracker = ClipboardChangeTracker(clipboard_watcher)  # 剪贴板变化判断（只保存摘要，忽略本程序的写入）
+        self.poll_scheduler = AdaptivePollScheduler(   # 轮询间隔调度及检测延迟统计
+            fast_interval=self.config["poll_fast_interval"],
+            max_interval=self.config["check_interval"],
+            fast_window=self.config["poll_fast_window"],
+            backoff=self.config["poll_backoff"],
+        )
+        self.processed_links = DedupCache(     # 已处理链接（按规范化链接去重）
+            ttl=self.config["dedup_ttl"],
+            max_size=self.config["dedup_max_size"],
+            path=dedup_path,
+            tracking_params=self.config["tracking_params"],
+            log=self.log,
+        )
+        # 编译好的链接规则和发送路由、链接规范化（每个Monitor各自保存，第一次使用时编译，相关配置变化时重新编译）
+        self._link_router = None
+        self._link_extractor = None
+        self.history = history  # 历史记录（只放入队列，由后台线程写入）
+        if history is not None and history.normalize is None:
+            # 历史记录中的链接与去重使用相同的规范化
+            history.normalize = self.processed_links.key
+        self.stage_timer = StageTimer(stage_histogram)  # 发送各阶段的实际等待时间
+        self.send_queue = SendQueue(           # 待发送链接队列（多条合并成一条消息发送）
+            max_batch=self.config["send_batch_size"],
+            max_wait=self.config["send_max_wait"],
+        )
+
+        # 监控引擎（事件循环）
+        self._loop = None
+        self._thread = None
+        self._stopping = None        # asyncio.Event，置位后事件循环退出
+        self._send_lock = None       # asyncio.Lock，保证同一时间只有一批在发送
+        self._queue_changed = None   # asyncio.Event，发送队列有新内容
+        self._send_task = None       # 正在发送的任务
+        self._cancel_send = threading.Event()  # 通知发送线程在下一个步骤之前停止
+        self._send_source = "manual"  # 当前发送的触发方式，写入历史记录
+        self._send_route = None       # 当前这一批的发送目标（send_routes中的Route，None表示默认目标）
+
+    # ---- 启动和停止 ----
+    #
+    # 监控引擎是在单独线程中运行的asyncio事件循环：剪贴板变化、发送请求（热键、界面按钮）和定时器
+    # 都是事件循环中的事件，阻塞的等待和发送放到线程池中执行。发送的顺序和超时统一由_send_batches()控制，
+    # asyncio只在用到时导入（导入它需要几十毫秒），图形界面导入本模块时不加载；
+    # last_processed_digest、processed_url_ready只在事件循环线程中修改，其他线程通过request_send()、
+    # toggle()等方法把请求交给事件循环
+
+    def start(self):
+        """启动监控引擎"""
+        import asyncio
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self, timeout=2.0):
+        """停止监控引擎，中止正在进行的发送，关闭自行创建的剪贴板监听器，写入尚未保存的已处理链接"""
+        self.processed_links.flush()
+        if self._thread is None:
+            return
+        self._cancel_send.set()
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        if self.clipboard_watcher:
+            self.clipboard_watcher.wake()
+        self._thread.join(timeout)
+        self._thread = None
+        self._loop = None
+        if self.clipboard_watcher:
+            # 线程池中可能还有刚开始的等待
+            self.clipboard_watcher.wake()
+        if self._owns_watcher and self.clipboard_watcher:
+            self.clipboard_watcher.close()
+            self.clipboard_watcher = None
+            self.clipboard_tracker.watcher = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _run_loop(self, ready):
+        """事件循环线程"""
+        import asyncio
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._main(ready))
+        finally:
+            # 不等待线程池中的阻塞调用（剪贴板等待会被wake()唤醒，发送会在下一个步骤之前停止）
+            loop.close()
+
+    async def _main(self, ready):
+        import asyncio
+        self._stopping = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._queue_changed = asyncio.Event()
+        ready.set()
+
+        tasks = [
+            asyncio.create_task(self._watch_clipboard()),
+            asyncio.create_task(self._report_stats()),
+            asyncio.create_task(self._auto_send()),
+        ]
+        await self._stopping.wait()
+
+        # 取消所有任务，包括request_send()提交的发送
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _watch_clipboard(self):
+        """事件源：剪贴板变化"""
+        # 优先使用事件通知的监听方式，不可用时退回到自适应间隔轮询
+        import asyncio
+        if self.clipboard_watcher is None:
+            self.clipboard_watcher = await asyncio.to_thread(
+                create_clipboard_watcher, self.config["clipboard_backend"], self.config["check_interval"],
+                log=self.log, scheduler=self.poll_scheduler
+            )
+            self.clipboard_tracker.watcher = self.clipboard_watcher
+        watcher = self.clipboard_watcher
+        self.log(f"剪贴板监听方式: {watcher.name}")
+
+        # 启动时先检查一次当前剪贴板内容
+        await self._check_clipboard_async()
+
+        last_poll = time.monotonic()
+        while True:
+            try:
+                if not self.is_monitoring:
+                    # 暂停期间等待toggle()唤醒
+                    await asyncio.to_thread(watcher.sleep, 60)
+                    continue
+
+                # 事件通知方式下没有变化就一直等待，轮询方式由调度器决定间隔；
+                # 等待在线程池中进行，发送进行中也照常检测
+                changed = await asyncio.to_thread(watcher.wait_for_change, 60)
+                woke_at = time.monotonic()
+                self.poll_scheduler.record_wakeup()
+                if not changed:
+                    continue
+
+                # 轮询时只知道变化发生在两次轮询之间，按上界记录延迟
+                since = last_poll if watcher.name == "poll" else woke_at
+                if await self._check_clipboard_async(since):
+                    latency = time.monotonic() - since
+                    self.poll_scheduler.record_detection(latency)
+                    self._detection_latency.observe(latency)
+                last_poll = woke_at
+            except Exception as e:
+                self.log(f"监控出错: {e}")
+                await asyncio.sleep(self.config["check_interval"])
+
+    async def _report_stats(self):
+        """定时器：每5分钟输出一次监控统计"""
+        import asyncio
+        while True:
+            await asyncio.sleep(300)
+            self.log(f"监控统计: {self.poll_scheduler.summary()}")
+
+    async def _auto_send(self):
+        """自动发送（auto_send开启时）：攒满send_batch_size条或第一条等待超过send_max_wait秒后发送"""
+        import asyncio
+        queue = self.send_queue
+        while True:
+            await self._queue_changed.wait()
+            self._queue_changed.clear()
+            if not self.config["auto_send"]:
+                continue
+
+            # 攒批：直到攒满或者第一条等待超时
+            while len(queue) < queue.max_batch:
+                first = queue.first_enqueued()
+                if first is None:
+                    break
+                remaining = first + queue.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._queue_changed.wait(), remaining)
+                    self._queue_changed.clear()
+                except asyncio.TimeoutError:
+                    break
+
+            if not len(queue):
+                continue
+            if not await self._send_batches("auto"):
+                # 发送失败时等待一段时间再重试，避免忙等
+                await asyncio.sleep(queue.max_wait)
+            if len(queue):
+                self._queue_changed.set()
+
+    def _queue_updated(self):
+        """发送队列有新内容：唤醒自动发送（可在任意线程调用）"""
+        loop = self._loop
+        if loop is not None and self._queue_changed is not None:
+            try:
+                loop.call_soon_threadsafe(self._queue_changed.set)
+            except RuntimeError:
+                # 事件循环已经关闭
+                pass
+
+    def _state_changed(self):
+        if self.on_state_change:
+            try:
+                self.on_state_change()
+            except Exception as e:
+                self.log(f"更新状态出错: {e}")
+
+    def apply_config(self, config):
+        """应用修改后的配置（可在任意线程调用），返回变化的配置项
+
+        轮询间隔、发送批次、去重、发送方式、链接规则、发送路由和自动发送立即生效；
+        剪贴板监听方式、窗口后端、去重文件和历史记录开关需要重启。
+        链接规则或发送路由无法编译时抛出ValueError，这次修改的配置项都不生效
+        """
+        changed = {key for key in DEFAULT_CONFIG if key in config and config[key] != self.config.get(key)}
+        if not changed:
+            return changed
+        updates = {key: copy.deepcopy(config[key]) for key in changed}
+        router = None
+        if changed & {"target_url", "link_patterns", "send_routes"}:
+            # 先编译新的规则，失败时不修改配置，配置和正在使用的规则保持一致
+            router = self._compile_router(dict(self.config, **updates))
+        self.config.update(updates)
+        config = self.config
+
+        if changed & {"check_interval", "poll_fast_interval", "poll_fast_window", "poll_backoff"}:
+            self.poll_scheduler.configure(
+                fast_interval=config["poll_fast_interval"],
+                max_interval=config["check_interval"],
+                fast_window=config["poll_fast_window"],
+                backoff=config["poll_backoff"],
+            )
+        if changed & {"send_batch_size", "send_max_wait"}:
+            self.send_queue.max_batch = config["send_batch_size"]
+            self.send_queue.max_wait = config["send_max_wait"]
+        if changed & {"dedup_ttl", "dedup_max_size", "tracking_params"}:
+            self.processed_links.ttl = config["dedup_ttl"]
+            self.processed_links.max_size = config["dedup_max_size"]
+            self.processed_links.tracking_params = list(config["tracking_params"])
+            self._link_extractor = LinkExtractor(config["tracking_params"])
+        if "send_methods" in changed:
+            self.senders = create_senders(config["send_methods"], log=self.log)
+        if "adaptive_send" in changed:
+            self.send_strategy.adaptive = config["adaptive_send"]
+        if router is not None:
+            # 之后的检测直接使用新的规则
+            self._link_router = router
+        if changed & {"auto_send", "send_batch_size", "send_max_wait"}:
+            # 让自动发送按新的配置重新攒批
+            self._queue_updated()
+
+        restart = changed & {"clipboard_backend", "window_backend", "dedup_persist", "history_enabled"}
+        if restart:
+            self.log(f"以下配置需要重启后生效: {', '.join(sorted(restart))}")
+        if changed - restart:
+            self.log(f"配置已更新: {', '.join(sorted(changed - restart))}")
+
+        # 唤醒剪贴板等待，让新的轮询间隔立即生效
+        self.poll_scheduler.notify_activity()
+        if self.clipboard_watcher:
+            self.clipboard_watcher.wake()
+        return changed
+
+    def _notify(self, message, type="info"):
+        if self.notify:
+            self.notify(message, type)
+        else:
+            self.log(message)
+
+    # ---- 检测 ----
+
+    def get_link_patterns(self, config=None):
+        """返回当前生效的链接规则列表"""
+        config = config or self.config
+        return config["link_patterns"] or [config["target_url"]]
+
+    def _compile_router(self, config=None):
+        """编译链接规则和发送路由，规则无效时抛出ValueError"""
+        config = config or self.config
+        try:
+            return LinkRouter(self.get_link_patterns(config), config["send_routes"])
+        except re.error as e:
+            raise ValueError(f"链接规则中的正则表达式无效: {e}") from None
+
+    def get_link_router(self):
+        """返回当前链接规则和发送路由编译成的路由器（配置变化时由apply_config()重新编译）"""
+        router = self._link_router
+        if router is None:
+            router = self._link_router = self._compile_router()
+        return router
+
+    def get_link_extractor(self):
+        """返回与当前跟踪参数配置对应的链接规范化"""
+        extractor = self._link_extractor
+        if extractor is None:
+            extractor = self._link_extractor = LinkExtractor(self.config["tracking_params"])
+        return extractor
+
+    def copy_to_clipboard(self, text):
+        """写入剪贴板，并标记为本程序的写入，避免监控线程再次读取和处理"""
+        self.clipboard.copy(text)
+        self.clipboard_tracker.mark_own_write(text)
+
+    def extract_links(self, text):
+        """取出文本中命中规则的链接，返回 [(原链接, 去重用的规范形式, 发送目标)]，规范形式相同的只保留第一次出现
+
+        发送的是原链接（去掉末尾误带的标点），签名或有时效的参数保持不变；规范形式（还原HTML转义、
+        统一百分号编码、去掉跟踪参数）只用于去重和历史记录。
+        很大的内容（整篇文档、日志文件）分块检查，最多检查max_scan_chars个字符
+        """
+        limit = self.config["max_scan_chars"]
+        if limit and len(text) > limit:
+            self.log(f"剪贴板内容有{len(text)}个字符，只检查前{limit}个字符")
+        canonical = self.get_link_extractor().canonical
+        links = {}
+        for match, route in self.get_link_router().scan(text, limit):
+            key = canonical(match.url)
+            if key not in links:
+                links[key] = (match.url, key, route)
+        return list(links.values())
+
+    def check_clipboard(self):
+        """检查剪贴板内容，剪贴板有新内容时返回True（在调用线程中完成读取和处理）"""
+        if not self.is_monitoring:
+            return False
+
+        try:
+            text = self._read_clipboard()
+            if text is None:
+                return False
+            self._handle_text(text)
+            return True
+        except Exception as e:
+            self.log(f"检查剪贴板时出错: {e}")
+            return False
+
+    async def _check_clipboard_async(self, since=None):
+        """事件循环中的check_clipboard()：在线程池中读取剪贴板，在事件循环线程中处理
+
+        since: 剪贴板变化的时间（time.monotonic()），用于在历史记录中记录检测延迟
+        """
+        import asyncio
+        if not self.is_monitoring:
+            return False
+
+        try:
+            text = await asyncio.to_thread(self._read_clipboard)
+            if text is None:
+                return False
+            self._handle_text(text, since)
+            return True
+        except Exception as e:
+            self.log(f"检查剪贴板时出错: {e}")
+            return False
+
+    def _read_clipboard(self):
+        """读取剪贴板，内容有变化时返回文本，否则返回None（可能阻塞）"""
+        self._polls.inc()
+
+        # 先用序列号等廉价标记判断，未变化或是本程序自己的写入时无需读取内容
+        if not self.clipboard_tracker.token_changed():
+            return None
+
+        # 读取剪贴板内容
+        text = self.clipboard.paste()
+
+        # 如果内容为空或与上次相同（按摘要比较），不处理
+        if not text or not self.clipboard_tracker.content_changed(text):
+            return None
+        self._changes.inc()
+        return text
+
+    def _handle_text(self, text, since=None):
+        """提取链接、去重并加入发送队列"""
+        # 提取命中规则的链接，同时确定发送目标（规则只在配置变化时重新编译）
+        links = self.extract_links(text)
+        if not links:
+            return
+        self.log(f"检测到目标URL! 共{len(links)}个")
+        self._matches.inc(len(links))
+
+        # 只发送最近没有处理过的链接（按规范形式去重）
+        new_links = [url for url, key, _ in links if not self.processed_links.seen(key)]
+        new = set(new_links)
+        if self.history is not None:
+            latency = time.monotonic() - since if since is not None else None
+            for url, key, _ in links:
+                self.history.record_detection(key, "new" if url in new else "duplicate", latency)
+        if len(new_links) < len(links):
+            self._dedup_hits.inc(len(links) - len(new_links))
+        if not new_links:
+            self.log("该链接已处理过，跳过")
+            return
+
+        # 记录这次处理的内容，把新链接逐条加入发送队列（只发送链接本身，不发送整段文字），
+        # 由SendQueue按发送目标和send_batch_size合并成批
+        self.last_processed_digest = content_digest(text)
+        for url, _, route in links:
+            if url in new:
+                self.send_queue.put(url, route)
+        self.processed_url_ready = True
+        self._queue_updated()
+        self._state_changed()
+
+        # 显示通知（自动发送时无需用户操作）
+        pending = len(self.send_queue)
+        send_hotkey = self.config["send_hotkey"]
+        if self.config["auto_send"]:
+            self._notify(f"检测到学习验证链接！将自动发送（待发送{pending}条）", "success")
+        elif pending > 1:
+            self._notify(
+                f"检测到学习验证链接！共{pending}条待发送\n请切换到微信文件传输助手，然后按 {send_hotkey} 一次发送",
+                "success"
+            )
+        else:
+            self._notify(
+                f"检测到学习验证链接！\n请切换到微信文件传输助手，然后按 {send_hotkey} 发送",
+                "success"
+            )
+        if self.on_detect:
+            self.on_detect(text, new_links)
+
+    def toggle(self):
+        """切换监控状态，返回切换后的状态（可在任意线程调用，例如热键）"""
+        self.set_monitoring(not self.is_monitoring)
+        return self.is_monitoring
+
+    def set_monitoring(self, enabled):
+        """开启或暂停监控"""
+        self.is_monitoring = enabled
+
+        # 唤醒剪贴板等待，让状态变化立即生效
+        self.poll_scheduler.notify_activity()
+        if self.clipboard_watcher:
+            self.clipboard_watcher.wake()
+        self._state_changed()
+
+        self._notify(
+            "剪贴板监控已启动" if enabled else "剪贴板监控已暂停",
+            "success" if enabled else "warning"
+        )
+        self.log("监测已启动" if enabled else "监测已暂停")
+
+    # ---- 发送 ----
+
+    def request_send(self, source="manual"):
+        """请求发送队列中所有待发送的链接，不阻塞调用线程（热键、界面按钮）
+
+        source: 触发方式（hotkey/button/notification等），写入历史记录。
+        返回concurrent.futures.Future，结果为是否发送成功；调用它的cancel()可以取消发送。
+        引擎未启动时直接发送，返回已完成的Future
+        """
+        import asyncio
+        import concurrent.futures
+        loop = self._loop
+        if loop is None:
+            future = concurrent.futures.Future()
+            future.set_result(self.send_pending(source))
+            return future
+        return asyncio.run_coroutine_threadsafe(self._send_pending(source), loop)
+
+    def send_pending(self, source="manual"):
+        """发送队列中所有待发送的链接，多条链接合并成一条消息发送，成功返回True（等待发送结束）"""
+        import asyncio
+        import concurrent.futures
+        if self._loop is None:
+            # 引擎未启动时（例如作为库直接调用）临时运行一个事件循环
+            return asyncio.run(self._send_pending(source))
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("不能在事件循环线程中等待发送，请使用request_send()")
+        try:
+            return self.request_send(source).result()
+        except concurrent.futures.CancelledError:
+            return False
+
+    def cancel_send(self):
+        """取消正在进行的发送（可在任意线程调用）：发送线程在下一个步骤之前停止，未发送的链接留在队列中"""
+        self._cancel_send.set()
+        loop, task = self._loop, self._send_task
+        if loop is not None and task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+    def check_cancelled(self):
+        """发送步骤之间的检查点：发送已被取消或超时时抛出SendCancelled"""
+        if self._cancel_send.is_set():
+            raise SendCancelled("发送已取消")
+
+    async def _send_pending(self, source="manual"):
+        # 发送后用户很可能继续复制链接，先切换到快速轮询
+        self.poll_scheduler.notify_activity()
+
+        count = len(self.send_queue)
+        if not count:
+            self.log("没有待发送的链接")
+            self._notify("没有待发送的链接", "warning")
+            return False
+
+        if await self._send_batches(source):
+            self.log("消息已成功发送")
+            self._notify(
+                "链接已成功发送到微信" if count == 1 else f"{count}条链接已合并发送到微信", "success"
+            )
+            return True
+        else:
+            self.log("所有发送方法都失败，请手动发送")
+            self._notify("自动发送失败，请手动将剪贴板内容发送到微信", "error")
+            return False
+
+    async def _send_batches(self, source="manual"):
+        """逐批发送队列中的全部内容，失败的批次放回队列，全部成功时返回True
+
+        热键、界面按钮和自动发送都经过这里：锁保证同一时间只有一批在发送、各批按入队顺序发送。
+        每批只发往一个目标（SendQueue按目标成批），某个目标失败时不影响其他目标，
+        本次不再尝试这个目标的其余批次
+        """
+        import asyncio
+        queue = self.send_queue
+        failed = []           # 本次失败的批次，结束时放回队列
+        failed_targets = set()
+        async with self._send_lock or asyncio.Lock():
+            self._send_task = asyncio.current_task()
+            self._send_source = source
+            try:
+                while True:
+                    batch = queue.take_batch()
+                    if not batch:
+                        return not failed
+                    items = [item for item, _, _ in batch]
+                    target = batch[0][2]
+                    if target in failed_targets:
+                        failed.append(batch)
+                        continue
+                    self._send_route = target
+                    self._cancel_send.clear()
+                    future = asyncio.get_running_loop().run_in_executor(
+                        None, self.sender, queue.separator.join(items), items)
+                    try:
+                        ok = await self._wait_send(future)
+                    except asyncio.CancelledError:
+                        # 等发送线程在下一个步骤之前停下；这一批已经发送完成时不再放回队列，避免重复发送
+                        self._cancel_send.set()
+                        if await self._send_result(future):
+                            queue.record_sent(items)
+                        else:
+                            failed.append(batch)
+                            self.log("发送已取消，未发送的链接保留在队列中")
+                        raise
+                    if not ok:
+                        failed.append(batch)
+                        failed_targets.add(target)
+                        if target is not None:
+                            self.log(f"发送到{describe_route(target)}失败，链接保留在队列中")
+                        continue
+                    queue.record_sent(items)
+            finally:
+                # 失败的批次按原来的顺序放回队列最前面
+                for batch in reversed(failed):
+                    queue.requeue(batch)
+                self._send_task = None
+                self._send_route = None
+                self.processed_url_ready = len(queue) > 0
+                self._state_changed()
+
+    async def _wait_send(self, future):
+        """等待发送线程的结果，超过send_timeout秒时通知发送线程在下一个步骤之前停止"""
+        import asyncio
+        timeout = self.config["send_timeout"] or None
+        try:
+            return bool(await asyncio.wait_for(asyncio.shield(future), timeout))
+        except asyncio.TimeoutError:
+            self._send_failures.inc(label="timeout")
+            self.log(f"发送超过{timeout}秒，正在中止")
+            self._cancel_send.set()
+            # 超时前最后一步已经完成时仍算成功，避免重复发送
+            return await self._send_result(future)
+        except Exception as e:
+            self.log(f"发送消息出错: {e}")
+            return False
+
+    async def _send_result(self, future):
+        """等发送线程结束，返回是否发送成功"""
+        try:
+            return bool(await future)
+        except Exception as e:
+            self.log(f"发送消息出错: {e}")
+            return False
+
+    def get_foreground_window(self):
+        """返回当前前台窗口句柄，当前平台不支持时返回None"""
+        try:
+            return self.window_backend.get_foreground()
+        except Exception:
+            return None
+
+    def get_window_title(self, hwnd):
+        """返回窗口标题，获取失败时返回None"""
+        try:
+            return self.window_backend.get_title(hwnd)
+        except Exception:
+            return None
+
+    def window_is_idle(self, hwnd):
+        """窗口已处理完之前的输入时返回True，不支持时返回None"""
+        try:
+            return self.window_backend.is_idle(hwnd)
+        except Exception:
+            return None
+
+    # 以下方法返回就绪条件，当前平台无法检查时返回None（StageTimer会退回固定等待）
+    def foreground_is(self, hwnd):
+        """条件：前台窗口就是hwnd"""
+        if self.get_foreground_window() is None:
+            return None
+        return lambda: self.get_foreground_window() == hwnd
+
+    def foreground_changed_from(self, hwnd):
+        """条件：前台窗口已不是hwnd（例如Alt+Tab或打开浏览器之后）"""
+        if hwnd is None:
+            return None
+        return lambda: self.get_foreground_window() not in (hwnd, None)
+
+    def clipboard_equals(self, text):
+        """条件：剪贴板内容就是text"""
+        return lambda: self.clipboard.paste() == text
+
+    def input_idle(self, hwnd, settle=0.03):
+        """条件：注入的按键已送达并被窗口处理完（至少等待settle秒让按键进入窗口的消息队列）"""
+        if not hwnd or self.window_is_idle(hwnd) is None:
+            return None
+        start = time.perf_counter()
+        return lambda: time.perf_counter() - start >= settle and self.window_is_idle(hwnd)
+
+    def get_send_mode(self, hwnd):
+        """返回向该窗口发送时使用的方式（按窗口标题匹配target_send_modes）"""
+        if hwnd and self.config["target_send_modes"]:
+            title = self.get_window_title(hwnd) or ""
+            for keyword, mode in self.config["target_send_modes"].items():
+                if keyword in title:
+                    return mode
+        return self.config["send_mode"]
+
+    def ensure_clipboard(self, text):
+        """确保剪贴板中是待发送的内容，确认写入成功时返回True"""
+        if self.clipboard.paste() != text:
+            self.copy_to_clipboard(text)
+            return self.stage_timer.wait("复制", self.clipboard_equals(text), timeout=1.0, fallback_delay=0.3)
+        return True
+
+    def still_foreground(self, hwnd):
+        """目标窗口仍在前台时返回True；无法判断（没有窗口句柄或当前平台不支持）时也返回True"""
+        if not hwnd:
+            return True
+        foreground = self.get_foreground_window()
+        return foreground is None or foreground == hwnd
+
+    def paste_and_send(self, hwnd, text, send_mode=None):
+        """在前台窗口中输入或粘贴text并回车发送，每一步都等到窗口处理完输入
+
+        send_mode: 发送方式，默认按get_send_mode(hwnd)。
+        确认已发送返回True；剪贴板没有更新或回车前目标窗口已不在前台时不按回车，返回False；
+        直接输入中途出错时抛出SendAborted，本次发送不再尝试其他方法
+        """
+        backend = self.window_backend
+        typed = False
+        self.check_cancelled()
+        if (send_mode or self.get_send_mode(hwnd)) == "inject":
+            if not backend.can_type:
+                self.log("当前窗口后端不支持直接输入，改用剪贴板粘贴")
+            else:
+                self.log("执行直接输入操作")
+                try:
+                    backend.type_lines(text, self.config["inject_newline_keys"], self.config["inject_chunk_size"])
+                except Exception as e:
+                    # 输入框中可能已有部分文字，再粘贴或改用其他方法会发出重复、错乱的消息
+                    raise SendAborted(f"直接输入中途出错: {e}") from e
+                self.stage_timer.wait("输入", self.input_idle(hwnd), timeout=5.0, fallback_delay=0.3)
+                typed = True
+
+        if not typed:
+            if not self.ensure_clipboard(text):
+                self.log("剪贴板内容未能更新，放弃粘贴")
+                return False
+            self.log("执行粘贴操作")
+            backend.hotkey('ctrl', 'v')
+            self.stage_timer.wait("粘贴", self.input_idle(hwnd), timeout=2.0, fallback_delay=0.7)
+
+        self.check_cancelled()
+        # 回车前确认目标窗口仍在前台，避免把消息发到别的窗口
+        if not self.still_foreground(hwnd):
+            self.log("目标窗口已不在前台，放弃发送")
+            return False
+        self.log("执行发送操作")
+        backend.hotkey('enter')
+        self.stage_timer.wait("回车", self.input_idle(hwnd), timeout=2.0, fallback_delay=0.5)
+        return True
+
+    def send_text(self, text, items=None):
+        """把一条（可以是多行的）消息发送到微信，依次尝试各发送方式，成功返回True"""
+        try:
+            self.log(f"准备发送文本: {text[:50]}..." if len(text) > 50 else f"准备发送文本: {text}")
+            self.stage_timer.reset_last()
+
+            # 按本机统计的成功率和耗时依次尝试各发送方法（adaptive_send关闭时按配置的顺序）；
+            # 路由到指定窗口的内容只发送到该窗口，找不到时失败，不会改发到其他窗口
+            route = self._send_route
+            if route is not None:
+                senders = [RouteSender(route)]
+            else:
+                senders = self.send_strategy.order(self.senders)
+            try:
+                for index, sender in enumerate(senders):
+                    self.check_cancelled()
+                    if not sender.available(self):
+                        continue
+                    self.log(f"方法{index}: {sender.description}")
+                    start = time.perf_counter()
+                    try:
+                        ok = sender.send(self, text)
+                        error = ""
+                    except SendAborted:
+                        elapsed = time.perf_counter() - start
+                        self._record_send(text, sender.name, "failed", elapsed)
+                        if route is None:
+                            self.send_strategy.record(sender.name, False, elapsed)
+                        self._send_failures.inc(label=sender.name)
+                        raise
+                    except SendCancelled:
+                        self._record_send(text, sender.name, "cancelled", time.perf_counter() - start)
+                        raise
+                    except Exception as e:
+                        ok, error = False, f": {e}"
+                    elapsed = time.perf_counter() - start
+                    self._record_send(text, sender.name, "sent" if ok else "failed", elapsed)
+                    if route is None:
+                        self.send_strategy.record(sender.name, ok, elapsed)
+                    self._method_latency.observe(elapsed, sender.name)
+                    if ok:
+                        self._sends.inc(label=sender.name)
+                        self.log(f"方法{index}成功：{sender.description}（{self.window_backend.name}）")
+                        self.log(f"已发送{len(items) if items else 1}条链接，各阶段等待: {self.stage_timer.summary()}")
+                        return True
+                    self._send_failures.inc(label=sender.name)
+                    self.log(f"方法{index}失败{error}")
+                return False
+            finally:
+                self._update_send_order()
+
+        except SendAborted as e:
+            self.log(f"{e}，输入框中可能留有部分文字，本次发送失败")
+            return False
+        except SendCancelled:
+            self.log("发送已中止")
+            return False
+        except Exception as e:
+            self.log(f"发送消息出错: {e}")
+            return False
+
+    def _record_send(self, text, method, outcome, elapsed):
+        """把一次发送尝试按消息中的每个链接写入历史记录"""
+        if self.history is None:
+            return
+        for match in self.get_link_router().matcher.find_all(text):
+            self.history.record_send(match.url, method, outcome, elapsed, self._send_source)
+
+    def send_order_summary(self):
+        """返回发送方法当前的尝试顺序及各方法的成功率和耗时"""
+        return self.send_strategy.describe(self.senders)
+
+    def _update_send_order(self):
+        """保存发送方法的统计，并更新顺序和成功率指标"""
+        self.send_strategy.save()
+        ordered = self.send_strategy.order(self.senders)
+        for sender in self.senders:
+            stats = self.send_strategy.get(sender.name)
+            self._method_rank.set(ordered.index(sender) if sender in ordered else -1, sender.name)
+            if stats is not None:
+                self._method_success.set(round(stats.success_rate(), 4), sender.name)
+
+    # ---- 窗口选择 ----
+
+    def select_window(self, hwnd, title=""):
+        """选择发送目标窗口"""
+        self.selected_wechat_window = hwnd
+        self.selected_window_title = title or ""
+
+    def find_window_by_title(self, title):
+        """通过窗口标题查找窗口句柄"""
+        if not title:
+            return None
+
+        # 使用窗口索引查找，缓存的句柄仍然有效时无需重新枚举
+        try:
+            return self.window_index.find_by_title(title)
+        except Exception:
+            return None
+
+    def find_route_window(self, route):
+        """查找路由目标窗口：指定了进程号时查找该进程的窗口（标题还要包含title），否则按标题查找"""
+        try:
+            if route.pid:
+                return self.window_index.find_by_pid(route.pid, route.title)
+            return self.window_index.find_by_title(route.title)
+        except Exception:
+            return None
+
+    def restore_window(self, titles):
+        """按顺序查找保存的窗口标题，选中第一个存在的窗口，成功返回True"""
+        if not titles:
+            return False
+
+        # 一次枚举同时查找所有保存的窗口标题，按保存顺序取第一个存在的窗口
+        try:
+            window_title, hwnd = self.window_index.find_first(titles)
+        except Exception as e:
+            self.log(f"查找保存的窗口失败: {e}")
+            return False
+
+        if hwnd:
+            self.select_window(hwnd, window_title)
+            self.log(f"已恢复上次选择的窗口: {window_title}")
+            return True
+
+        return False
@@ -0,0 +1,139 @@
+"""
+通知弹窗模块
+只预先创建一个通知弹窗并反复使用：任何线程都可以发送通知（放入队列），
+通过TkBridge安排界面线程取出显示；短时间内连续到达的通知合并到同一个弹窗中并显示条数
+"""
+
+import queue
+import time
+import tkinter as tk
+
+# 通知类型对应的背景颜色
+NOTIFICATION_COLORS = {
+    "success": "#4CAF50",
+    "error": "#F44336",
+    "warning": "#FF9800",
+    "info": "#2196F3",
+}
+
+
+class NotificationManager:
+    """复用单个弹窗的通知管理器"""
+
+    def __init__(self, root, bridge, coalesce_window=1.5, display_time=5000):
+        self.root = root
+        self.coalesce_window = coalesce_window  # 多少秒内到达的通知合并显示
+        self.display_time = display_time        # 弹窗显示时间，毫秒
+        self.shown = 0       # 实际显示（或更新）弹窗的次数
+        self.received = 0    # 收到的通知总数
+        self._queue = queue.SimpleQueue()
+        self._count = 0
+        self._last_time = 0.0
+        self._hide_id = None
+        self._action = None
+        self._build()
+        self._wake = bridge.call_latest(self._drain)  # 安排界面线程处理新通知
+
+    def _build(self):
+        """创建弹窗和其中的控件（只创建一次）"""
+        self.popup = tk.Toplevel(self.root)
+        self.popup.withdraw()
+        self.popup.overrideredirect(True)
+        self.popup.attributes('-topmost', True)
+
+        self.message_label = tk.Label(
+            self.popup,
+            fg="white",
+            font=("Arial", 12, "bold"),
+            wraplength=280,
+            padx=10,
+            pady=10
+        )
+        self.message_label.pack(fill=tk.BOTH, expand=True)
+
+        self.action_button = tk.Button(
+            self.popup,
+            bg="#FFFFFF",
+            relief=tk.FLAT,
+            padx=10,
+            pady=5,
+            font=("Arial", 10, "bold"),
+            command=self._on_action
+        )
+
+    def post(self, message, type="info", action_text=None, action=None):
+        """发送一条通知（可在任意线程调用）"""
+        self._queue.put((message, type, action_text, action))
+        self._wake()
+
+    def _drain(self):
+        latest = None
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self.received += 1
+            now = time.monotonic()
+            if self._count and now - self._last_time <= self.coalesce_window:
+                self._count += 1
+            else:
+                self._count = 1
+            self._last_time = now
+            latest = item
+        if latest is not None:
+            try:
+                self._show(*latest)
+            except tk.TclError:
+                # 主窗口已经销毁
+                pass
+
+    def _show(self, message, type, action_text, action):
+        bg_color = NOTIFICATION_COLORS.get(type, NOTIFICATION_COLORS["info"])
+        if self._count > 1:
+            message = f"{message}\n（{self._count}条新通知）"
+
+        self.popup.configure(bg=bg_color)
+        self.message_label.configure(text=message, bg=bg_color)
+
+        # 需要操作按钮时才显示按钮
+        self._action = action
+        if action is not None:
+            self.action_button.configure(text=action_text or "确定", fg=bg_color)
+            self.action_button.pack(pady=(0, 10))
+        else:
+            self.action_button.pack_forget()
+
+        # 设置通知位置（屏幕右下角）
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
+        self.popup.geometry(f"300x100+{screen_width-320}+{screen_height-120}")
+        self.popup.deiconify()
+        self.popup.lift()
+        self.shown += 1
+
+        # 重新计时，display_time后隐藏
+        if self._hide_id is not None:
+            self.root.after_cancel(self._hide_id)
+        self._hide_id = self.root.after(self.display_time, self.hide)
+
+    def _on_action(self):
+        action = self._action
+        self.hide()
+        if action is not None:
+            action()
+
+    def hide(self):
+        """隐藏弹窗（必须在界面线程调用）"""
+        if self._hide_id is not None:
+            try:
+                self.root.after_cancel(self._hide_id)
+            except tk.TclError:
+                pass
+            self._hide_id = None
+        self._count = 0
+        self._action = None
+        try:
+            self.popup.withdraw()
+        except tk.TclError:
+            pass
@@ -0,0 +1,127 @@
+"""
+自适应轮询调度模块
+在有用户活动（检测到链接、按下热键等）后的短时间内快速轮询，
+空闲时按几何级数逐渐放慢到配置的上限，并统计检测延迟分布和每分钟唤醒次数
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+
+# 检测延迟直方图的分桶上界（毫秒），最后一个桶收集超过上界的样本
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def percentile(self, q):
+        """按分桶上界估算分位数（毫秒），没有样本时返回None"""
+        with self._lock:
+            if not self.count:
+                return None
+            target = q * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= target:
+                    return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def state(self):
+        """返回 (各桶计数, 样本数, 总和秒数) 的一致快照"""
+        with self._lock:
+            return list(self.counts), self.count, self.total
+
+    def snapshot(self):
+        with self._lock:
+            labels = [f"<={b}ms" for b in self.buckets] + [f">{self.buckets[-1]}ms"]
+            return dict(zip(labels, self.counts))
+
+
+class AdaptivePollScheduler:
+    """根据活动情况决定下一次轮询间隔"""
+
+    def __init__(self, fast_interval=0.05, max_interval=1.0, fast_window=5.0, backoff=1.5):
+        self.fast_interval = fast_interval
+        self.max_interval = max_interval
+        self.fast_window = fast_window
+        self.backoff = backoff
+        self.latency = LatencyHistogram()
+        self._interval = fast_interval
+        self._last_activity = time.monotonic()
+        self._wakeups = deque()
+        self._lock = threading.Lock()
+
+    def configure(self, fast_interval=None, max_interval=None, fast_window=None, backoff=None):
+        """更新调度参数"""
+        with self._lock:
+            if fast_interval is not None:
+                self.fast_interval = fast_interval
+            if max_interval is not None:
+                self.max_interval = max_interval
+            if fast_window is not None:
+                self.fast_window = fast_window
+            if backoff is not None:
+                self.backoff = backoff
+            self._interval = min(max(self._interval, self.fast_interval), self.max_interval)
+
+    def notify_activity(self):
+        """有用户活动时调用，之后的一段时间内快速轮询"""
+        with self._lock:
+            self._last_activity = time.monotonic()
+            self._interval = self.fast_interval
+
+    def next_interval(self):
+        """返回下一次轮询前应等待的秒数"""
+        with self._lock:
+            if time.monotonic() - self._last_activity < self.fast_window:
+                self._interval = self.fast_interval
+            else:
+                self._interval = min(self._interval * self.backoff, self.max_interval)
+            return max(self._interval, self.fast_interval)
+
+    def record_wakeup(self):
+        now = time.monotonic()
+        with self._lock:
+            self._wakeups.append(now)
+            while self._wakeups and now - self._wakeups[0] > 60:
+                self._wakeups.popleft()
+
+    def record_detection(self, latency):
+        """记录一次检测延迟（秒），检测到变化也算作用户活动"""
+        self.latency.observe(latency)
+        self.notify_activity()
+
+    def wakeups_per_minute(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._wakeups and now - self._wakeups[0] > 60:
+                self._wakeups.popleft()
+            return len(self._wakeups)
+
+    def summary(self):
+        """返回一行统计摘要，用于日志"""
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        if p50 is None:
+            latency_text = "暂无检测"
+        else:
+            latency_text = f"检测延迟 p50≤{p50}ms p95≤{p95}ms (共{self.latency.count}次)"
+        return (f"轮询间隔 {self._interval * 1000:.0f}ms, "
+                f"每分钟唤醒 {self.wakeups_per_minute()}次, {latency_text}")
@@ -0,0 +1,68 @@
+"""
+就绪等待模块
+用"等到条件满足"代替固定的time.sleep：条件满足立即继续，慢的机器最多等到超时，
+并记录每个阶段实际等待的时间
+"""
+
+import threading
+import time
+
+
+def wait_until(condition, timeout=1.0, interval=0.01):
+    """反复检查condition直到返回真值或超时，返回 (是否满足, 实际等待秒数)"""
+    start = time.perf_counter()
+    deadline = start + timeout
+    while True:
+        try:
+            if condition():
+                return True, time.perf_counter() - start
+        except Exception:
+            pass
+        now = time.perf_counter()
+        if now >= deadline:
+            return False, now - start
+        time.sleep(min(interval, deadline - now))
+
+
+class StageTimer:
+    """记录发送过程中各阶段（激活窗口、复制、粘贴、回车）的实际等待时间"""
+
+    def __init__(self, histogram=None):
+        self.histogram = histogram  # 可选的指标直方图（按阶段记录，见metrics.Histogram）
+        self.last = {}       # 阶段 -> 最近一次等待秒数
+        self.totals = {}     # 阶段 -> 累计等待秒数
+        self.counts = {}     # 阶段 -> 等待次数
+        self.timeouts = {}   # 阶段 -> 超时次数
+        self._lock = threading.Lock()
+
+    def wait(self, stage, condition, timeout, fallback_delay=0.5, interval=0.01):
+        """等待某个阶段就绪
+
+        condition为None表示当前平台无法检查该条件，此时退回到固定等待fallback_delay秒
+        """
+        if condition is None:
+            time.sleep(fallback_delay)
+            ok, elapsed = True, fallback_delay
+        else:
+            ok, elapsed = wait_until(condition, timeout, interval)
+        self.record(stage, elapsed, ok)
+        return ok
+
+    def record(self, stage, elapsed, ok=True):
+        with self._lock:
+            self.last[stage] = elapsed
+            self.totals[stage] = self.totals.get(stage, 0.0) + elapsed
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+            if not ok:
+                self.timeouts[stage] = self.timeouts.get(stage, 0) + 1
+        if self.histogram is not None:
+            self.histogram.observe(elapsed, stage)
+
+    def reset_last(self):
+        with self._lock:
+            self.last.clear()
+
+    def summary(self):
+        """返回最近一次发送各阶段等待时间的摘要"""
+        with self._lock:
+            return ", ".join(f"{stage} {elapsed * 1000:.0f}ms" for stage, elapsed in self.last.items())
@@ -0,0 +1,90 @@
+"""
+发送路由模块
+send_routes配置把不同的链接发送到不同的窗口：每条规则把一个链接规则映射到目标窗口（标题关键字和/或进程号）
+和发送方式。所有路由规则和link_patterns一起编译成一个匹配器，每次剪贴板变化只扫描一遍文本，
+同时完成检测和路由；规则编号到目标的对应关系是一张分派表（见 python benchmark.py routes）
+"""
+
+from collections import namedtuple
+
+from link_matcher import LinkMatcher, parse_pattern
+
+SEND_MODES = ("clipboard", "inject")
+
+# 发送目标：窗口标题关键字、进程号、发送方式（None表示按send_mode/target_send_modes），可以作为字典的键
+Route = namedtuple("Route", ["title", "pid", "send_mode"])
+
+
+def describe_route(route):
+    """返回目标的说明，例如 "团队群(pid 1234, inject)"，route为None表示默认目标"""
+    if route is None:
+        return "默认窗口"
+    text = route.title or ""
+    extras = [f"pid {route.pid}"] if route.pid else []
+    if route.send_mode:
+        extras.append(route.send_mode)
+    if extras:
+        text += f"({', '.join(extras)})"
+    return text
+
+
+def parse_route(spec):
+    """把一条路由配置解析成 (链接规则, Route)
+
+    {"pattern": 链接规则（与link_patterns相同的写法）, "title": 窗口标题关键字, "pid": 进程号,
+     "send_mode": "clipboard"/"inject"}，title和pid至少指定一个
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("路由规则应为字典")
+    pattern = spec.get("pattern")
+    if not isinstance(pattern, (str, dict)):
+        raise ValueError("路由规则缺少pattern")
+    parse_pattern(pattern)
+    title = spec.get("title") or None
+    pid = spec.get("pid") or None
+    if title is not None and not isinstance(title, str):
+        raise ValueError("路由规则的title应为字符串")
+    if pid is not None and (not isinstance(pid, int) or isinstance(pid, bool) or pid < 0):
+        raise ValueError("路由规则的pid应为正整数")
+    if title is None and pid is None:
+        raise ValueError("路由规则需要指定title或pid")
+    send_mode = spec.get("send_mode") or None
+    if send_mode is not None and send_mode not in SEND_MODES:
+        raise ValueError(f"未知的发送方式: {send_mode}")
+    return pattern, Route(title, pid, send_mode)
+
+
+class LinkRouter:
+    """检测和路由共用的匹配器
+
+    link_patterns之后依次加入各路由规则的链接规则；命中多条路由规则时按配置顺序取第一条，
+    只命中link_patterns的链接发送到默认目标（None）
+    """
+
+    def __init__(self, link_patterns, routes=()):
+        patterns = list(link_patterns)
+        self.dispatch = {}  # 规则编号 -> Route
+        for spec in routes:
+            pattern, route = parse_route(spec)
+            self.dispatch[len(patterns)] = route
+            patterns.append(pattern)
+        self.routes = list(self.dispatch.values())
+        self.matcher = LinkMatcher(patterns)
+
+    def route(self, match):
+        """返回匹配结果的发送目标（LinkMatch.rules已按编号排序）"""
+        dispatch = self.dispatch
+        if dispatch:
+            for index in match.rules:
+                route = dispatch.get(index)
+                if route is not None:
+                    return route
+        return None
+
+    def find_all(self, text):
+        """一遍扫描文本，返回 [(LinkMatch, Route或None)]"""
+        return [(match, self.route(match)) for match in self.matcher.find_all(text)]
+
+    def scan(self, text, limit=0):
+        """分块扫描文本的前limit个字符（见LinkMatcher.scan），返回 [(LinkMatch, Route或None)]"""
+        return [(match, self.route(match)) for match in self.matcher.scan(text, limit)]
@@ -0,0 +1,83 @@
+"""
+发送队列模块
+检测到的链接先进入发送队列，发送时把多条链接合并成一条多行消息，
+这样激活窗口和粘贴在每批链接中只需要做一次；发往不同窗口（路由目标）的内容分别成批，
+每次发送时每个窗口只激活一次
+"""
+
+import threading
+import time
+
+
+class SendQueue:
+    """合并发送的链接队列
+
+    队列只负责排队和成批：发送方（Monitor._send_batches）用take_batch()取出发往同一目标的一批，
+    发送失败时requeue()放回，成功时record_sent()计数；target是put()时指定的发送目标。
+    max_wait是自动发送时第一条内容最多等待的时间，由发送方读取
+    """
+
+    def __init__(self, max_batch=10, max_wait=2.0, separator="\n"):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.separator = separator
+        self.batches_sent = 0
+        self.items_sent = 0
+        self._items = []  # [(内容, 入队时间, 发送目标)]
+        self._cond = threading.Condition()
+
+    def put(self, item, target=None):
+        """加入一条待发送内容，已在队列中（发往同一目标）的内容不重复加入"""
+        with self._cond:
+            if any(existing == item and existing_target == target for existing, _, existing_target in self._items):
+                return False
+            self._items.append((item, time.monotonic(), target))
+            self._cond.notify_all()
+        return True
+
+    def pending(self):
+        """返回待发送内容的副本"""
+        with self._cond:
+            return [item for item, _, _ in self._items]
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def first_enqueued(self):
+        """返回队列中第一条内容的入队时间（time.monotonic），队列为空时返回None"""
+        with self._cond:
+            return self._items[0][1] if self._items else None
+
+    def take_batch(self):
+        """取出与第一条内容发送目标相同的最多max_batch条内容，返回 [(内容, 入队时间, 发送目标)]
+
+        发往其他目标的内容保持原来的顺序留在队列中
+        """
+        with self._cond:
+            if not self._items:
+                return []
+            target = self._items[0][2]
+            batch, rest = [], []
+            for entry in self._items:
+                if entry[2] == target and len(batch) < self.max_batch:
+                    batch.append(entry)
+                else:
+                    rest.append(entry)
+            self._items[:] = rest
+            return batch
+
+    def requeue(self, batch):
+        """发送失败时把take_batch()取出的内容按原顺序放回队列最前面"""
+        with self._cond:
+            self._items[:0] = batch
+
+    def record_sent(self, items):
+        """记录一批内容已发送成功"""
+        with self._cond:
+            self.batches_sent += 1
+            self.items_sent += len(items)
@@ -0,0 +1,175 @@
+"""
+发送方式选择模块
+记录每种发送方式在本机上的成功率和耗时（保存在配置目录中），发送时按期望耗时（平均耗时/成功率）
+排序：又快又可靠的方式排在最前面，还没有足够统计的方式保持配置的顺序，连续失败的方式暂时跳过，
+过一段时间后再作为最后的选择重新尝试
+"""
+
+import json
+import os
+import platform
+import threading
+import time
+
+
+class MethodStats:
+    """一种发送方式的统计（成功率按指数衰减计数，耗时按指数移动平均，都更看重最近的发送）"""
+
+    def __init__(self, attempts=0.0, successes=0.0, latency=None, total=0, consecutive_failures=0,
+                 last_failure=0.0):
+        self.attempts = attempts    # 衰减后的尝试次数
+        self.successes = successes  # 衰减后的成功次数
+        self.latency = latency      # 每次尝试（无论成败）的平均耗时，秒
+        self.total = total          # 实际尝试次数
+        self.consecutive_failures = consecutive_failures
+        self.last_failure = last_failure  # 最近一次失败的时间（time.time()）
+
+    def record(self, ok, seconds, decay, alpha):
+        self.attempts = self.attempts * decay + 1
+        self.successes = self.successes * decay + (1 if ok else 0)
+        self.latency = seconds if self.latency is None else self.latency + alpha * (seconds - self.latency)
+        self.total += 1
+        if ok:
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+            self.last_failure = time.time()
+
+    def success_rate(self):
+        # 加一平滑：统计很少时不会得到0%或100%
+        return (self.successes + 1) / (self.attempts + 2)
+
+    def expected_cost(self):
+        """按此方式发送成功平均需要的时间，用于排序"""
+        return (self.latency or 0.0) / self.success_rate()
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for key, value in data.items():
+            if key in stats.__dict__:
+                setattr(stats, key, value)
+        return stats
+
+
+class SendStrategy:
+    """根据本机的历史统计决定发送方式的尝试顺序
+
+    path: 统计的保存文件，None表示不保存
+    adaptive: False时保持配置的顺序，只记录统计
+    min_attempts: 尝试次数达到多少次后才按统计排序
+    skip_after: 连续失败多少次后暂时跳过
+    retry_interval: 跳过的方式多少秒后重新尝试
+    log: 保存统计失败时的日志函数
+    """
+
+    def __init__(self, path=None, adaptive=True, min_attempts=3, skip_after=3, retry_interval=600.0,
+                 reliable_rate=0.5, decay=0.9, alpha=0.3, log=print):
+        self.path = path
+        self.log = log
+        self.adaptive = adaptive
+        self.min_attempts = min_attempts
+        self.skip_after = skip_after
+        self.retry_interval = retry_interval
+        self.reliable_rate = reliable_rate
+        self.decay = decay
+        self.alpha = alpha
+        self.machine = platform.node()
+        self.stats = {}  # 发送方式名称 -> MethodStats
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def get(self, name):
+        with self._lock:
+            return self.stats.get(name)
+
+    def skipped(self, stats, now=None):
+        """是否暂时跳过：连续失败skip_after次，且距离最近一次失败还不到retry_interval秒"""
+        if stats is None or stats.consecutive_failures < self.skip_after:
+            return False
+        return (now or time.time()) - stats.last_failure < self.retry_interval
+
+    def order(self, senders):
+        """返回本次发送时依次尝试的发送方式"""
+        if not self.adaptive:
+            return list(senders)
+        now = time.time()
+        reliable, unknown, unreliable, retry, skipped = [], [], [], [], []
+        with self._lock:
+            for sender in senders:
+                stats = self.stats.get(sender.name)
+                if stats is None or stats.total < self.min_attempts:
+                    unknown.append(sender)
+                elif self.skipped(stats, now):
+                    skipped.append((stats.expected_cost(), sender))
+                elif stats.consecutive_failures >= self.skip_after:
+                    # 跳过的时间已到，作为最后的选择重新尝试一次
+                    retry.append(sender)
+                elif stats.success_rate() >= self.reliable_rate:
+                    reliable.append((stats.expected_cost(), sender))
+                else:
+                    unreliable.append((stats.expected_cost(), sender))
+
+        def by_cost(items):
+            return [sender for _, sender in sorted(items, key=lambda item: item[0])]
+
+        ordered = by_cost(reliable) + unknown + by_cost(unreliable) + retry
+        # 所有方式都被跳过时仍然要尝试
+        return ordered or by_cost(skipped)
+
+    def record(self, name, ok, seconds):
+        """记录一次尝试：ok表示确认发送成功"""
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = MethodStats()
+            stats.record(ok, seconds, self.decay, self.alpha)
+
+    def describe(self, senders):
+        """返回当前尝试顺序的说明，例如 "selected(98%, 120ms) → search(80%, 300ms)，跳过: alt_tab" """
+        ordered = self.order(senders)
+        parts = []
+        for sender in ordered:
+            stats = self.get(sender.name)
+            if stats is None or not stats.total:
+                parts.append(sender.name)
+            else:
+                parts.append(f"{sender.name}({stats.success_rate():.0%}, {stats.latency * 1000:.0f}ms)")
+        text = " → ".join(parts)
+        skipped = [sender.name for sender in senders if sender not in ordered]
+        if skipped:
+            text += f"，跳过: {', '.join(skipped)}"
+        return text
+
+    def load(self):
+        """从文件加载统计（其他电脑上记录的统计不适用，忽略）"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("machine") != self.machine:
+                return
+            with self._lock:
+                self.stats = {name: MethodStats.from_dict(item) for name, item in data.get("methods", {}).items()}
+        except Exception:
+            pass
+
+    def save(self):
+        """写入文件（先写临时文件再替换，避免写到一半时损坏）"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "machine": self.machine,
+                "methods": {name: stats.to_dict() for name, stats in self.stats.items()},
+            }
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            self.log(f"保存发送统计失败: {e}")
@@ -0,0 +1,236 @@
+"""
+发送方式模块
+把消息发送到微信的每一种方法都是一个Sender：用户选择的窗口、查找微信窗口、Alt+Tab切换、
+网页版文件传输助手。Monitor按配置的顺序依次尝试，直到某个方法成功；
+按send_routes路由到指定窗口的内容由RouteSender发送；
+RecordingSender是模拟耗时和失败率的假发送方式，供测试和基准测试使用
+"""
+
+import random
+import threading
+import time
+
+from router import describe_route
+from window_backend import is_wechat_title
+
+
+class SendCancelled(Exception):
+    """发送已被取消或超时（由Monitor.check_cancelled()在发送步骤之间抛出）"""
+
+
+class SendAborted(SendCancelled):
+    """发送中途出错且不能再用其他方法或窗口重试（例如输入框中已经输入了一部分文字），本次发送算作失败"""
+
+
+class Sender:
+    """发送方式的基类
+
+    send(monitor, text) 把text发送出去，确认发送成功才返回True（例如消息确实进入了微信窗口，
+    而不只是没有出错）；失败时返回False或抛出异常。
+    monitor提供窗口后端、剪贴板、阶段计时等（见monitor_core.Monitor），
+    各方法的成功率和耗时由monitor.send_strategy统计，用于调整尝试顺序
+    """
+
+    name = ""
+    description = ""
+
+    def available(self, monitor):
+        """当前是否可以使用此方法（例如没有选择窗口时跳过"选择的窗口"）"""
+        return True
+
+    def send(self, monitor, text):
+        raise NotImplementedError
+
+
+class SelectedWindowSender(Sender):
+    """发送到用户选择的窗口"""
+
+    name = "selected"
+    description = "使用用户选择的窗口"
+
+    def available(self, monitor):
+        return bool(monitor.selected_wechat_window)
+
+    def send(self, monitor, text):
+        hwnd = monitor.selected_wechat_window
+        monitor.log(f"窗口句柄: {hwnd}")
+
+        # 尝试获取窗口标题
+        window_title = monitor.get_window_title(hwnd)
+        if window_title is not None:
+            monitor.log(f"已找到选择的窗口: {window_title}")
+        else:
+            monitor.log("无法获取窗口标题，但将继续尝试激活窗口")
+
+        # 激活窗口
+        monitor.window_backend.activate(hwnd)
+        if not monitor.stage_timer.wait("激活", monitor.foreground_is(hwnd), timeout=1.0):
+            raise RuntimeError("窗口未能切换到前台")
+
+        # 粘贴并发送
+        return monitor.paste_and_send(hwnd, text)
+
+
+class WeChatSearchSender(Sender):
+    """查找并激活微信窗口（使用窗口索引中缓存的结果）"""
+
+    name = "search"
+    description = "查找并激活微信窗口"
+
+    def send(self, monitor, text):
+        wechat_windows = monitor.window_index.wechat_windows()
+        if not wechat_windows:
+            monitor.log("未找到微信窗口")
+            return False
+
+        for window in wechat_windows:
+            monitor.check_cancelled()
+            try:
+                monitor.log(f"尝试激活窗口: {window.title}")
+                monitor.window_backend.activate(window.hwnd)
+                if not monitor.stage_timer.wait("激活", monitor.foreground_is(window.hwnd), timeout=1.0):
+                    raise RuntimeError("窗口未能切换到前台")
+
+                # 粘贴并发送
+                if monitor.paste_and_send(window.hwnd, text):
+                    return True
+            except SendCancelled:
+                raise
+            except Exception as e:
+                monitor.log(f"激活窗口失败: {e}")
+        return False
+
+
+class AltTabSender(Sender):
+    """模拟Alt+Tab切换到之前的窗口，希望是微信"""
+
+    name = "alt_tab"
+    description = "使用Alt+Tab切换窗口"
+
+    def send(self, monitor, text):
+        previous_window = monitor.get_foreground_window()
+        monitor.window_backend.hotkey('alt', 'tab')
+        monitor.stage_timer.wait("激活", monitor.foreground_changed_from(previous_window), timeout=1.0)
+
+        # 确认切换到的是微信窗口（能获取标题时），否则不粘贴
+        hwnd = monitor.get_foreground_window()
+        if hwnd is not None:
+            title = monitor.get_window_title(hwnd)
+            if hwnd != monitor.selected_wechat_window and title is not None and not is_wechat_title(title):
+                monitor.log(f"Alt+Tab切换到的不是微信窗口: {title}")
+                return False
+
+        # 粘贴并发送
+        return monitor.paste_and_send(hwnd, text)
+
+
+class WebFileHelperSender(Sender):
+    """打开微信文件传输助手网页版发送"""
+
+    name = "web"
+    description = "打开微信文件传输助手网页版"
+    url = "https://filehelper.weixin.qq.com/"
+
+    def send(self, monitor, text):
+        import webbrowser
+
+        previous_window = monitor.get_foreground_window()
+        webbrowser.open(self.url)
+
+        # 等待浏览器切换到前台，再等待页面标题出现（网页加载完成）
+        timer = monitor.stage_timer
+        timer.wait("打开网页", monitor.foreground_changed_from(previous_window), timeout=5.0, fallback_delay=3)
+        browser_window = monitor.get_foreground_window()
+        if browser_window:
+            loaded = timer.wait(
+                "网页加载",
+                lambda: "文件传输" in (monitor.get_window_title(monitor.get_foreground_window()) or ""),
+                timeout=5.0
+            )
+            if not loaded:
+                monitor.log("网页版文件传输助手没有打开（可能需要扫码登录）")
+                return False
+
+        # 尝试定位输入框并粘贴发送
+        # 由于网页版界面可能会变化，这里使用Enter键尝试发送
+        return monitor.paste_and_send(browser_window, text)
+
+
+class RouteSender(Sender):
+    """发送到路由规则指定的窗口（send_routes），找不到窗口时失败，不会改发到其他窗口"""
+
+    name = "route"
+
+    def __init__(self, route):
+        self.route = route
+        self.description = f"发送到{describe_route(route)}"
+
+    def send(self, monitor, text):
+        hwnd = monitor.find_route_window(self.route)
+        if not hwnd:
+            monitor.log(f"未找到目标窗口: {describe_route(self.route)}")
+            return False
+
+        # 激活窗口
+        monitor.window_backend.activate(hwnd)
+        if not monitor.stage_timer.wait("激活", monitor.foreground_is(hwnd), timeout=1.0):
+            raise RuntimeError("窗口未能切换到前台")
+
+        # 粘贴并发送（路由规则指定了发送方式时使用该方式）
+        return monitor.paste_and_send(hwnd, text, self.route.send_mode)
+
+
+class RecordingSender(Sender):
+    """假发送方式：模拟激活窗口和粘贴的耗时，按failure_rate的概率在激活后失败，并记录每次成功的发送"""
+
+    def __init__(self, name="fake", activation_delay=0.0, paste_delay=0.0, failure_rate=0.0, seed=None):
+        self.name = name
+        self.description = f"模拟发送({name})"
+        self.activation_delay = activation_delay
+        self.paste_delay = paste_delay
+        self.failure_rate = failure_rate
+        self.attempts = 0
+        self.failures = 0
+        self.sent = []  # [(文本, 完成时间)]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, monitor, text):
+        with self._lock:
+            self.attempts += 1
+            failed = self._random.random() < self.failure_rate
+        if self.activation_delay:
+            time.sleep(self.activation_delay)
+        if failed:
+            with self._lock:
+                self.failures += 1
+            raise RuntimeError("模拟发送失败")
+        if self.paste_delay:
+            time.sleep(self.paste_delay)
+        with self._lock:
+            self.sent.append((text, time.perf_counter()))
+        return True
+
+
+# 发送方式名称 -> 类，send_methods配置中按顺序列出要尝试的方法
+SENDERS = {
+    "selected": SelectedWindowSender,
+    "search": WeChatSearchSender,
+    "alt_tab": AltTabSender,
+    "web": WebFileHelperSender,
+}
+
+DEFAULT_SEND_METHODS = ["selected", "search", "alt_tab", "web"]
+
+
+def create_senders(names=DEFAULT_SEND_METHODS, log=None):
+    """按名称列表创建发送方式，忽略未知的名称"""
+    senders = []
+    for name in names:
+        factory = SENDERS.get(name)
+        if factory is None:
+            if log:
+                log(f"未知的发送方式: {name}")
+            continue
+        senders.append(factory())
+    return senders
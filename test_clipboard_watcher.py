@@ -0,0 +1,106 @@
+"""clipboard_watcher模块的测试（只使用内存中的假剪贴板，不需要图形界面）"""
+
+import threading
+import time
+
+from clipboard_watcher import ClipboardChangeTracker, FakeClipboard, PollingWatcher, content_digest
+
+
+def test_fake_watcher_wakes_on_copy():
+    clipboard = FakeClipboard()
+    watcher = clipboard.watch()
+    timer = threading.Timer(0.05, clipboard.copy, args=("https://example.com/a",))
+    timer.start()
+    start = time.monotonic()
+    assert watcher.wait_for_change(2.0)
+    assert time.monotonic() - start < 1.0
+    timer.join()
+    assert clipboard.paste() == "https://example.com/a"
+
+
+def test_fake_watcher_times_out_without_change():
+    watcher = FakeClipboard().watch()
+    start = time.monotonic()
+    assert not watcher.wait_for_change(0.05)
+    assert time.monotonic() - start >= 0.04
+
+
+def test_fake_watcher_reports_copy_before_wait():
+    clipboard = FakeClipboard()
+    watcher = clipboard.watch()
+    clipboard.copy("a")
+    clipboard.copy("b")
+    # 等待之前的多次变化合并成一次通知
+    assert watcher.wait_for_change(0.01)
+    assert not watcher.wait_for_change(0.01)
+
+
+def test_wake_interrupts_wait():
+    watcher = FakeClipboard().watch()
+    timer = threading.Timer(0.05, watcher.wake)
+    timer.start()
+    start = time.monotonic()
+    assert not watcher.wait_for_change(5.0)
+    assert time.monotonic() - start < 1.0
+    timer.join()
+
+
+def test_wake_before_wait_returns_immediately():
+    watcher = PollingWatcher(interval=5.0)
+    watcher.wake()
+    start = time.monotonic()
+    assert not watcher.wait_for_change(5.0)
+    assert time.monotonic() - start < 1.0
+
+
+def test_change_token_follows_sequence():
+    clipboard = FakeClipboard()
+    watcher = clipboard.watch()
+    first = watcher.change_token()
+    clipboard.copy("a")
+    assert watcher.change_token() != first
+    assert PollingWatcher().change_token() is None
+
+
+def test_tracker_skips_unchanged_token_without_reading():
+    clipboard = FakeClipboard()
+    tracker = ClipboardChangeTracker(clipboard.watch())
+    clipboard.copy("a")
+    assert tracker.token_changed()
+    assert not tracker.token_changed()
+
+
+def test_tracker_ignores_own_write_by_token():
+    clipboard = FakeClipboard()
+    tracker = ClipboardChangeTracker(clipboard.watch())
+    clipboard.copy("mine")
+    tracker.mark_own_write("mine")
+    assert not tracker.token_changed()
+    # 本程序写入的内容已作为最近一次的内容，之后用户复制相同内容也不算变化
+    assert not tracker.content_changed("mine")
+
+    clipboard.copy("user")
+    assert tracker.token_changed()
+    assert tracker.content_changed(clipboard.paste())
+
+
+def test_tracker_ignores_own_write_by_content():
+    # 没有廉价标记（轮询）时只能按内容摘要判断
+    tracker = ClipboardChangeTracker(PollingWatcher())
+    assert tracker.token_changed()
+    assert tracker.content_changed("user")
+    assert not tracker.content_changed("user")
+
+    tracker.mark_own_write("mine")
+    assert tracker.token_changed()
+    assert not tracker.content_changed("mine")
+    # 本程序的写入只忽略一次
+    assert tracker.content_changed("user")
+    assert tracker.content_changed("mine")
+
+
+def test_content_digest_is_bounded_for_large_text():
+    big = "x" * (1024 * 1024)
+    assert content_digest(big) == content_digest("x" * (1024 * 1024))
+    assert content_digest(big) != content_digest(big + "y")
+    assert content_digest(None) is None
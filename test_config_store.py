@@ -0,0 +1,66 @@
+"""配置文件监视器的测试（inotify与修改时间检查使用change_watcher中的等待/唤醒基类）"""
+
+import sys
+import threading
+import time
+
+import pytest
+
+from config_store import DEFAULTS, InotifyFileWatcher, PollingFileWatcher, validate
+
+WATCHERS = [lambda path: PollingFileWatcher(path, interval=0.01)]
+if sys.platform.startswith("linux"):
+    WATCHERS.append(InotifyFileWatcher)
+
+
+def replace_file(path, text):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+
+
+@pytest.mark.parametrize("make_watcher", WATCHERS)
+def test_file_watcher_sees_replaced_file(tmp_path, make_watcher):
+    path = tmp_path / "config.json"
+    path.write_text("{}", encoding="utf-8")
+    watcher = make_watcher(path)
+    try:
+        # 修改时间的精度有限，改变文件大小保证能被检查到
+        timer = threading.Timer(0.05, replace_file, args=(path, '{"a": 1}'))
+        timer.start()
+        assert watcher.wait_for_change(2.0)
+        timer.join()
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize("make_watcher", WATCHERS)
+def test_file_watcher_ignores_other_files_and_wakes(tmp_path, make_watcher):
+    path = tmp_path / "config.json"
+    path.write_text("{}", encoding="utf-8")
+    watcher = make_watcher(path)
+    try:
+        (tmp_path / "other.json").write_text("{}", encoding="utf-8")
+        timer = threading.Timer(0.05, watcher.wake)
+        timer.start()
+        start = time.monotonic()
+        assert not watcher.wait_for_change(5.0)
+        assert time.monotonic() - start < 1.0
+        timer.join()
+    finally:
+        watcher.close()
+
+
+def test_validate_rejects_rules_that_do_not_compile():
+    values, errors = validate({
+        "link_patterns": ["re:("],
+        "send_routes": [{"pattern": {"type": "regex", "pattern": "[a-"}, "title": "团队群"}],
+        "send_batch_size": 3,
+    })
+    assert values["link_patterns"] == DEFAULTS["link_patterns"]
+    assert values["send_routes"] == DEFAULTS["send_routes"]
+    assert values["send_batch_size"] == 3
+    assert [error.split("的值无效")[0] for error in errors] == ["配置项link_patterns", "配置项send_routes"]
+
+    values, errors = validate({"link_patterns": [r"re:(?i)example\.com", "https://a.com/"]})
+    assert not errors
@@ -0,0 +1,46 @@
+"""dedup_cache模块的测试"""
+
+import json
+import time
+
+from dedup_cache import DedupCache, normalize_link
+
+
+def test_normalize_link_drops_tracking_and_sorts_query():
+    assert normalize_link("HTTPS://A.com:443/p?b=2&utm_source=x&a=1") == "https://a.com/p?a=1&b=2"
+
+
+def test_seen_does_not_write_synchronously(tmp_path):
+    path = tmp_path / "links.json"
+    cache = DedupCache(path=str(path), save_delay=60)
+    assert not cache.seen("https://a.com/1")
+    assert cache.seen("https://a.com/1")
+    assert not path.exists()
+    cache.flush()
+    assert list(json.loads(path.read_text(encoding="utf-8"))) == ["https://a.com/1"]
+    assert cache.saves == 1
+    # 没有新的变化时不再写入
+    cache.flush()
+    assert cache.saves == 1
+
+
+def test_debounced_save_coalesces_writes(tmp_path):
+    path = tmp_path / "links.json"
+    cache = DedupCache(path=str(path), save_delay=0.05)
+    for i in range(20):
+        cache.seen(f"https://a.com/{i}")
+    deadline = time.monotonic() + 2
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert cache.saves == 1
+    assert len(DedupCache(path=str(path))) == 20
+
+
+def test_failed_write_is_logged(tmp_path):
+    messages = []
+    cache = DedupCache(path=str(tmp_path / "missing" / "links.json"), save_delay=60, log=messages.append)
+    cache.seen("https://a.com/1")
+    cache.flush()
+    assert cache.saves == 0
+    assert len(messages) == 1 and messages[0].startswith("保存已处理链接失败")
@@ -0,0 +1,22 @@
+"""headless模块的测试"""
+
+import sys
+import time
+
+from headless import command_hook
+
+
+def test_command_hook_passes_large_text_on_stdin(tmp_path):
+    out = tmp_path / "out.txt"
+    script = tmp_path / "hook.py"
+    script.write_text(
+        "import os, sys\n"
+        f"open({str(out)!r}, 'w', encoding='utf-8').write(os.environ['WX_LINKS'] + '|' + str(len(sys.stdin.read())))\n",
+        encoding="utf-8",
+    )
+    text = "https://a.com/1 " + "中" * (200 * 1024)
+    command_hook(f'"{sys.executable}" "{script}"')(text, ["https://a.com/1"])
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and not (out.exists() and out.read_text(encoding="utf-8")):
+        time.sleep(0.05)
+    assert out.read_text(encoding="utf-8") == f"https://a.com/1|{len(text)}"
@@ -0,0 +1,71 @@
+"""历史记录的测试（临时目录中的SQLite数据库）"""
+
+import threading
+import time
+
+from history import DETECT, HistoryStore
+
+
+def test_query_sees_records_added_before_it(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"), flush_interval=5.0)
+    store.start()
+    try:
+        store.record_detection("https://example.com/a", "new", 0.01)
+        done = threading.Event()
+        results = []
+
+        def callback(records, error):
+            results.append((records, error, threading.current_thread()))
+            done.set()
+
+        # 不需要先flush()，也不用等满flush_interval
+        store.query(callback, "example.com", limit=10)
+        assert done.wait(2.0)
+        records, error, thread = results[0]
+        assert error is None
+        assert [(record["kind"], record["url"]) for record in records] == [(DETECT, "https://example.com/a")]
+        assert thread is not threading.current_thread()
+    finally:
+        store.stop()
+
+
+def test_failing_callback_does_not_stop_writer(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.start()
+    try:
+        def failing(records, error):
+            raise RuntimeError("回调出错")
+
+        store.query(failing)
+        store.record_send("https://example.com/b", "search", "sent", 0.5)
+        assert store.flush(timeout=2.0)
+        assert store.written == 1
+    finally:
+        store.stop()
+
+
+def test_query_without_writer_runs_inline(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    results = []
+    store.query(lambda records, error: results.append((records, error)))
+    assert results == [([], None)]
+
+
+def test_unopenable_database_answers_waiters_with_the_error(tmp_path):
+    store = HistoryStore(str(tmp_path / "missing" / "history.db"))
+    results = []
+    store.start()
+    store.query(lambda records, error: results.append((records, error)))
+    deadline = time.monotonic() + 2.0
+    while store._thread is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.error is not None
+    assert not store.flush(timeout=0.1)
+
+    store.query(lambda records, error: results.append((records, error)))
+    assert [(records, error is not None) for records, error in results] == [([], True), ([], True)]
+
+    # 不再把记录堆积在队列中
+    store.record_detection("https://example.com/a", "new")
+    assert store._queue.empty()
+    store.stop()
@@ -0,0 +1,35 @@
+"""link_extractor模块和Monitor链接提取的测试"""
+
+from clipboard_watcher import FakeClipboard
+from link_extractor import LinkExtractor
+from monitor_core import Monitor
+from window_backend import FakeWindowBackend
+
+TARGET = "https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto"
+
+
+def make_monitor():
+    return Monitor(clipboard=FakeClipboard(), window_backend=FakeWindowBackend(), log=lambda message: None)
+
+
+def test_canonical_form():
+    extractor = LinkExtractor()
+    assert extractor.canonical("HTTPS://GD.AQSCWLXY.COM:443/h5/pages/pc/pcPhoto?id=1&amp;utm_source=wx&amp;b=%7e%2f&copy=1") \
+        == f"{TARGET}?id=1&b=~%2F&copy=1"
+
+
+def test_original_link_is_sent():
+    monitor = make_monitor()
+    url = f"{TARGET}?id=1&timestamp=123&from=x&sign=abc"
+    monitor.clipboard.copy(f"请打开 {url}。")
+    assert monitor.check_clipboard()
+    assert monitor.send_queue.pending() == [url]
+
+
+def test_duplicates_detected_by_canonical_form():
+    monitor = make_monitor()
+    monitor.clipboard.copy(f"{TARGET}?id=1&utm_source=a {TARGET}?id=1&amp;utm_source=b")
+    monitor.check_clipboard()
+    monitor.clipboard.copy(f"{TARGET}?utm_medium=c&id=1")
+    monitor.check_clipboard()
+    assert monitor.send_queue.pending() == [f"{TARGET}?id=1&utm_source=a"]
@@ -0,0 +1,82 @@
+"""link_matcher模块的测试：字面前缀、包含、通配符、正则规则及其组合"""
+
+import pytest
+
+from link_matcher import AhoCorasick, LinkMatcher, parse_pattern
+
+TARGET = "https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto"
+
+
+def urls(matcher, text):
+    return [match.url for match in matcher.find_all(text)]
+
+
+def test_parse_pattern_kinds():
+    assert parse_pattern("https://a.com/") == ("prefix", "https://a.com/")
+    assert parse_pattern("*a.com*") == ("glob", "*a.com*")
+    assert parse_pattern("re:a+") == ("regex", "a+")
+    assert parse_pattern({"type": "contains", "pattern": "id="}) == ("contains", "id=")
+    with pytest.raises(ValueError):
+        parse_pattern({"type": "unknown", "pattern": "x"})
+    with pytest.raises(ValueError):
+        parse_pattern("re:")
+
+
+def test_aho_corasick_finds_overlapping_words():
+    automaton = AhoCorasick(["he", "she", "hers"])
+    assert sorted(automaton.iter_matches("ushers")) == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_prefix_rule_matches_only_at_url_start():
+    matcher = LinkMatcher([TARGET])
+    text = f"看这里 {TARGET}?id=1，还有 https://example.com/?next={TARGET}"
+    assert urls(matcher, text) == [f"{TARGET}?id=1"]
+    # 协议和域名不区分大小写
+    assert urls(matcher, TARGET.upper() + "?id=2") == [TARGET.upper() + "?id=2"]
+
+
+def test_contains_rule_is_case_sensitive():
+    matcher = LinkMatcher([{"type": "contains", "pattern": "token="}])
+    assert urls(matcher, "https://a.com/?token=1 https://b.com/?TOKEN=2") == ["https://a.com/?token=1"]
+
+
+def test_glob_rule():
+    matcher = LinkMatcher(["https://*.example.com/v/*"])
+    assert urls(matcher, "https://a.example.com/v/1 https://a.example.com/x/1") == ["https://a.example.com/v/1"]
+
+
+def test_regex_rules():
+    matcher = LinkMatcher([r"re:example\.com/v/\d+$", r"re:id=\d{3}"])
+    assert urls(matcher, "https://example.com/v/12 https://example.com/v/x https://a.com/?id=123") \
+        == ["https://example.com/v/12", "https://a.com/?id=123"]
+
+
+def test_mixed_rules_report_every_hit_in_config_order():
+    matcher = LinkMatcher([TARGET, "*aqscwlxy*", r"re:id=\d+"])
+    [match] = matcher.find_all(f"{TARGET}?id=7")
+    assert match.rules == (0, 1, 2)
+    assert [match.rules for match in matcher.find_all("https://x.aqscwlxy.com/ https://b.com/?id=1")] \
+        == [(1,), (2,)]
+
+
+def test_trailing_punctuation_is_not_part_of_url():
+    matcher = LinkMatcher([TARGET])
+    assert urls(matcher, f"({TARGET}?id=1).") == [f"{TARGET}?id=1"]
+
+
+def test_regex_with_inline_global_flags():
+    matcher = LinkMatcher([r"re:(?i)example\.com/v", r"re:other\.com"])
+    assert urls(matcher, "https://EXAMPLE.com/V/1 https://other.com/") == ["https://EXAMPLE.com/V/1", "https://other.com/"]
+
+
+def test_regexes_with_backreferences_keep_their_own_groups():
+    matcher = LinkMatcher([r"re:(a)\1", r"re:(b)\1"])
+    assert urls(matcher, "https://x.com/bb https://x.com/ab https://x.com/aa") == ["https://x.com/bb", "https://x.com/aa"]
+
+
+def test_scan_finds_urls_across_chunks():
+    matcher = LinkMatcher([TARGET])
+    text = "x" * 100 + f" {TARGET}?id=1 " + "y" * 100
+    assert [match.url for match in matcher.scan(text, chunk_size=110, overlap=64)] == [f"{TARGET}?id=1"]
+    assert matcher.scan(text, limit=50) == []
+    assert matcher.search(text).url == f"{TARGET}?id=1"
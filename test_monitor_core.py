@@ -0,0 +1,64 @@
+"""Monitor发送步骤的测试（假剪贴板和假窗口后端）"""
+
+import pytest
+
+from clipboard_watcher import FakeClipboard
+from monitor_core import Monitor
+from senders import SendAborted
+from window_backend import FakeWindowBackend
+
+TEXT = "https://example.com/a\nhttps://example.com/b"
+
+
+class FailingTypeBackend(FakeWindowBackend):
+    """输入完第一行后出错的后端"""
+
+    def type_text(self, text, chunk_size=200):
+        if self.typed:
+            raise RuntimeError("SendInput只输入了部分按键事件")
+        super().type_text(text, chunk_size)
+
+
+class NoTypeBackend(FakeWindowBackend):
+    can_type = False
+
+
+def make_monitor(backend):
+    return Monitor(config={"send_mode": "inject"}, clipboard=FakeClipboard(), window_backend=backend,
+                   log=lambda message: None)
+
+
+def test_inject_types_lines_and_presses_enter():
+    backend = FakeWindowBackend([(1, "文件传输助手")], foreground=1)
+    assert make_monitor(backend).paste_and_send(1, TEXT)
+    assert [text for _, text in backend.typed] == TEXT.split("\n")
+    assert [keys for _, keys in backend.keys] == [("shift", "enter"), ("enter",)]
+
+
+def test_partial_input_is_not_pasted_over():
+    backend = FailingTypeBackend([(1, "文件传输助手")], foreground=1)
+    monitor = make_monitor(backend)
+    with pytest.raises(SendAborted):
+        monitor.paste_and_send(1, TEXT)
+    # 没有在已输入的部分文字后面再粘贴一遍，也没有按回车
+    assert [keys for _, keys in backend.keys] == [("shift", "enter")]
+    assert monitor.clipboard.paste() != TEXT
+
+
+def test_partial_input_fails_the_send_without_trying_other_methods():
+    backend = FailingTypeBackend([(1, "文件传输助手"), (2, "微信")], foreground=1)
+    monitor = make_monitor(backend)
+    monitor.select_window(1, "文件传输助手")
+    assert not monitor.send_text(TEXT)
+    assert backend.activations == [1]
+    assert [keys for _, keys in backend.keys] == [("shift", "enter")]
+    assert monitor.send_strategy.get("selected").consecutive_failures == 1
+
+
+def test_backend_without_typing_falls_back_to_paste():
+    backend = NoTypeBackend([(1, "文件传输助手")], foreground=1)
+    monitor = make_monitor(backend)
+    assert monitor.paste_and_send(1, TEXT)
+    assert backend.typed == []
+    assert [keys for _, keys in backend.keys] == [("ctrl", "v"), ("enter",)]
+    assert monitor.clipboard.paste() == TEXT
@@ -0,0 +1,120 @@
+"""发送路由的测试（假剪贴板和假窗口后端）"""
+
+import pytest
+
+from clipboard_watcher import FakeClipboard
+from monitor_core import Monitor
+from router import LinkRouter, Route, parse_route
+from window_backend import FakeWindowBackend, WindowIndex
+
+TARGET = "https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto"
+
+
+class NoPidEnumBackend(FakeWindowBackend):
+    """枚举时不返回进程号、只能用get_pid()逐个查询的后端"""
+
+    def enum_windows(self):
+        return [window._replace(pid=None) for window in super().enum_windows()]
+
+
+def make_monitor(routes, backend):
+    return Monitor(config={"send_routes": routes, "send_methods": ["search"]},
+                   clipboard=FakeClipboard(), window_backend=backend, log=lambda message: None)
+
+
+def test_parse_route_requires_title_or_pid():
+    assert parse_route({"pattern": "https://a.com/", "pid": 7}) == ("https://a.com/", Route(None, 7, None))
+    with pytest.raises(ValueError):
+        parse_route({"pattern": "https://a.com/"})
+    with pytest.raises(ValueError):
+        parse_route({"pattern": "https://a.com/", "pid": -1})
+
+
+def test_router_dispatches_first_matching_route():
+    router = LinkRouter([TARGET], [{"pattern": "https://team.example.com/", "pid": 4242},
+                                   {"pattern": "*example.com*", "title": "其他"}])
+    routes = [route for _, route in router.find_all(f"{TARGET}?id=1 https://team.example.com/a")]
+    assert routes == [None, Route(None, 4242, None)]
+
+
+@pytest.mark.parametrize("backend_class", [FakeWindowBackend, NoPidEnumBackend])
+def test_find_by_pid(backend_class):
+    backend = backend_class([(1, "微信", 100), (2, "团队群", 4242), (3, "团队群", 5000)])
+    index = WindowIndex(backend)
+    assert index.find_by_pid(4242) == 2
+    assert index.find_by_pid(5000, "团队") == 3
+    assert index.find_by_pid(4242, "其他") is None
+    assert index.find_by_pid(9999) is None
+
+
+def test_find_by_pid_rescans_after_window_closed():
+    backend = FakeWindowBackend([(2, "团队群", 4242)])
+    index = WindowIndex(backend)
+    assert index.find_by_pid(4242) == 2
+    backend.close_window(2)
+    backend.add_window(7, "团队群", 4242)
+    assert index.find_by_pid(4242) == 7
+
+
+@pytest.mark.parametrize("backend_class", [FakeWindowBackend, NoPidEnumBackend])
+def test_pid_route_sends_to_process_window(backend_class):
+    backend = backend_class([(1, "文件传输助手", 100), (2, "团队群", 4242), (3, "团队群", 5000)], foreground=1)
+    monitor = make_monitor([{"pattern": "https://team.example.com/", "pid": 4242, "send_mode": "inject"}], backend)
+    monitor.clipboard.copy(f"https://team.example.com/a {TARGET}?id=1")
+    assert monitor.check_clipboard()
+    assert monitor.send_pending()
+    typed = dict(backend.typed)
+    assert typed[2] == "https://team.example.com/a"
+    assert 3 not in typed
+    assert 2 in backend.activations
+
+
+def test_pid_route_without_window_keeps_links_queued():
+    backend = FakeWindowBackend([(1, "文件传输助手", 100)], foreground=1)
+    monitor = make_monitor([{"pattern": "https://team.example.com/", "pid": 4242}], backend)
+    monitor.clipboard.copy("https://team.example.com/a")
+    assert monitor.check_clipboard()
+    assert not monitor.send_pending()
+    assert monitor.send_queue.pending() == ["https://team.example.com/a"]
+    assert backend.typed == []
+
+
+def test_monitors_keep_their_own_rules():
+    first = make_monitor([], FakeWindowBackend())
+    second = Monitor(config={"link_patterns": ["https://other.example.com/"]}, clipboard=FakeClipboard(),
+                     window_backend=FakeWindowBackend(), log=lambda message: None)
+    router = first.get_link_router()
+    for monitor, url in ((first, f"{TARGET}?id=1"), (second, "https://other.example.com/a")):
+        monitor.clipboard.copy(f"{TARGET}?id=2 https://other.example.com/b {url}")
+        monitor.check_clipboard()
+    assert first.get_link_router() is router
+    assert first.send_queue.pending() == [f"{TARGET}?id=2", f"{TARGET}?id=1"]
+    assert second.send_queue.pending() == ["https://other.example.com/b", "https://other.example.com/a"]
+
+    first.apply_config({"link_patterns": ["https://other.example.com/"]})
+    assert first.get_link_router() is not router
+    assert [match.url for match, _ in first.get_link_router().find_all(f"{TARGET} https://other.example.com/c")] \
+        == ["https://other.example.com/c"]
+
+
+def test_links_from_one_copy_are_batched_by_send_batch_size():
+    backend = FakeWindowBackend([(1, "文件传输助手", 100)], foreground=1)
+    sent = []
+    monitor = Monitor(config={"send_batch_size": 2}, clipboard=FakeClipboard(), window_backend=backend,
+                      sender=lambda text, items: sent.append(list(items)) or True, log=lambda message: None)
+    monitor.clipboard.copy(" ".join(f"{TARGET}?id={i}" for i in range(5)))
+    assert monitor.check_clipboard()
+    assert len(monitor.send_queue) == 5
+    assert monitor.send_pending()
+    assert [len(items) for items in sent] == [2, 2, 1]
+    assert monitor.send_queue.items_sent == 5
+
+
+def test_invalid_rules_leave_config_and_router_unchanged():
+    monitor = make_monitor([], FakeWindowBackend())
+    router = monitor.get_link_router()
+    with pytest.raises(ValueError):
+        monitor.apply_config({"link_patterns": ["re:("], "send_batch_size": 3})
+    assert monitor.config["link_patterns"] == []
+    assert monitor.config["send_batch_size"] == 10
+    assert monitor.get_link_router() is router
@@ -0,0 +1,251 @@
+"""TkBridge及其使用者（LogSink、NotificationManager）的测试
+（用假的Tk主窗口和控件，手动执行after_idle安排的处理，不需要图形界面）"""
+
+import threading
+import tkinter
+
+import pytest
+
+from log_sink import LogSink
+from notifier import NotificationManager
+from tk_bridge import TkBridge
+
+
+class FakeTk:
+    def __init__(self, threaded=True):
+        self.threaded = threaded
+
+    def eval(self, script):
+        return "1" if self.threaded else "0"
+
+
+class FakeRoot:
+    """记录after_idle/after安排的回调，由测试调用run_idle()执行"""
+
+    def __init__(self, threaded=True):
+        self.tk = FakeTk(threaded)
+        self.idle = []
+        self.timers = []
+
+    def after_idle(self, func):
+        self.idle.append(func)
+
+    def after(self, ms, func):
+        self.timers.append((ms, func))
+        return f"after#{len(self.timers)}"
+
+    def after_cancel(self, after_id):
+        pass
+
+    def winfo_screenwidth(self):
+        return 1920
+
+    def winfo_screenheight(self):
+        return 1080
+
+    def run_idle(self):
+        idle, self.idle = self.idle, []
+        for func in idle:
+            func()
+        return len(idle)
+
+
+class FakeText:
+    """只实现LogSink用到的几个Text控件方法"""
+
+    def __init__(self):
+        self.lines = []
+
+    def config(self, **kwargs):
+        pass
+
+    def insert(self, index, text):
+        self.lines.extend(text.split("\n")[:-1])
+
+    def index(self, index):
+        return f"{len(self.lines) + 1}.0"
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+class FakeWidget:
+    """接受任何控件方法调用的假控件，记录最后一次configure的参数"""
+
+    created = 0
+
+    def __init__(self):
+        FakeWidget.created += 1
+        self.options = {}
+
+    def configure(self, **kwargs):
+        self.options.update(kwargs)
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeNotificationManager(NotificationManager):
+    """用假控件代替Toplevel、Label和Button"""
+
+    def _build(self):
+        self.popup = FakeWidget()
+        self.message_label = FakeWidget()
+        self.action_button = FakeWidget()
+
+
+def test_calls_schedule_a_single_drain():
+    root = FakeRoot()
+    bridge = TkBridge(root)
+    assert root.run_idle() == 1
+    results = []
+    threads = [threading.Thread(target=bridge.call, args=(results.append, i)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(root.idle) == 1
+    root.run_idle()
+    assert sorted(results) == list(range(20))
+    assert root.timers == []
+
+
+def test_call_latest_runs_once_per_round():
+    root = FakeRoot()
+    bridge = TkBridge(root)
+    calls = []
+    callback = bridge.call_latest(lambda: calls.append(1))
+    for _ in range(5):
+        callback()
+    root.run_idle()
+    assert calls == [1]
+    assert root.run_idle() == 0
+
+
+def test_calls_made_while_draining_go_to_next_round():
+    root = FakeRoot()
+    bridge = TkBridge(root)
+    calls = []
+
+    def again():
+        calls.append(len(calls))
+        if len(calls) < 3:
+            wake()
+
+    wake = bridge.call_latest(again)
+    wake()
+    root.run_idle()
+    assert calls == [0]
+    root.run_idle()
+    root.run_idle()
+    assert calls == [0, 1, 2]
+    assert root.run_idle() == 0
+
+
+def test_closed_bridge_no_longer_schedules():
+    root = FakeRoot()
+    bridge = TkBridge(root)
+    root.run_idle()
+    bridge.close()
+    bridge.call(print, "不会执行")
+    assert root.idle == []
+
+
+def test_unthreaded_tcl_falls_back_to_polling():
+    root = FakeRoot(threaded=False)
+    bridge = TkBridge(root)
+    results = []
+    bridge.call(results.append, 1)
+    root.run_idle()
+    assert results == [1]
+    assert [ms for ms, _ in root.timers] == [bridge.poll_interval]
+
+
+def test_log_sink_writes_in_batches():
+    root = FakeRoot()
+    bridge = TkBridge(root)
+    root.run_idle()
+    sink = LogSink(max_lines=250, batch_size=200, stream=None)
+    widget = FakeText()
+    sink.attach(bridge, widget)
+    for i in range(300):
+        sink.emit(f"第{i}行")
+    root.run_idle()
+    assert len(widget.lines) == 200
+    root.run_idle()
+    assert widget.lines == [f"第{i}行" for i in range(50, 300)]
+    assert root.run_idle() == 0
+
+
+def test_notifications_from_many_threads_reuse_one_popup():
+    root = FakeRoot()
+    bridge = TkBridge(root)
+    root.run_idle()
+    FakeWidget.created = 0
+    manager = FakeNotificationManager(root, bridge, coalesce_window=60)
+    popup = manager.popup
+
+    def producer(index, count):
+        for i in range(count):
+            manager.post(f"检测到学习验证链接 {index}-{i}", "success", "立即发送", lambda: None)
+
+    for round_size in (250, 50):
+        threads = [threading.Thread(target=producer, args=(i, round_size)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 一轮中的所有通知只安排一次处理，只更新一次弹窗
+        assert root.run_idle() == 1
+        assert root.run_idle() == 0
+
+    assert manager.received == 1200
+    assert manager.shown == 2
+    assert manager.popup is popup
+    assert FakeWidget.created == 3
+    assert manager.message_label.options["text"].endswith("（1200条新通知）")
+
+
+def test_log_sink_fills_widget_with_earlier_lines():
+    root = FakeRoot()
+    bridge = TkBridge(root)
+    root.run_idle()
+    sink = LogSink(max_lines=3, stream=None)
+    for i in range(5):
+        sink.emit(f"启动{i}")
+    widget = FakeText()
+    sink.attach(bridge, widget)
+    sink.emit("界面已创建")
+    root.run_idle()
+    assert widget.lines == ["启动3", "启动4", "界面已创建"]
+    assert sink.snapshot()[-1] == "界面已创建"
+
+
+class BrokenText(FakeText):
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+    def insert(self, index, text):
+        raise self.error
+
+
+def test_log_sink_detaches_only_when_widget_is_destroyed():
+    root = FakeRoot()
+    bridge = TkBridge(root)
+    root.run_idle()
+    sink = LogSink(stream=None)
+    sink.attach(bridge, BrokenText(tkinter.TclError('invalid command name ".!text"')))
+    sink.emit("a")
+    root.run_idle()
+    assert sink._widget is None
+
+    sink = LogSink(stream=None)
+    sink.attach(bridge, BrokenText(ValueError("程序错误")))
+    sink.emit("b")
+    with pytest.raises(ValueError):
+        sink._drain_pending()
+    assert sink._widget is not None
@@ -0,0 +1,36 @@
+"""trace_replay模块的测试"""
+
+import copy
+
+from trace_replay import load_trace, replay_trace, save_trace, synthesize_trace, synthetic_prefix
+
+
+def test_save_and_load_trace(tmp_path):
+    events = synthesize_trace(10, burst=2, gap=0.01, idle=0.1)
+    path = str(tmp_path / "trace.jsonl")
+    save_trace(path, events, {"source": "test"})
+    header, loaded = load_trace(path)
+    assert header["source"] == "test"
+    assert loaded == events
+
+
+def test_synthetic_prefix_does_not_modify_config():
+    config = {"target_url": "https://a.com/verify", "link_patterns": ["re:b\\.com/\\d+"]}
+    original = copy.deepcopy(config)
+    prefix, patterns = synthetic_prefix(config)
+    assert prefix == "https://a.com/verify"
+    assert patterns == ["re:b\\.com/\\d+", "https://a.com/verify"]
+    assert config == original
+
+
+def test_replay_reports_detections_without_touching_config():
+    config = {"link_patterns": ["re:example\\.com/\\d+"]}
+    original = copy.deepcopy(config)
+    events = synthesize_trace(12, burst=3, gap=0.2, idle=0.5, link_ratio=1.0)
+    report = replay_trace(events, config=config, speed=10, send_delay=0)
+    assert config == original
+    assert report["expected"] == 12
+    assert report["missed"] == 0
+    assert report["duplicate_sends"] == 0
+    assert report["sent_links"] == 12
+    assert report["latency_ms"]["p50"] is not None
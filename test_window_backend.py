@@ -0,0 +1,121 @@
+"""X11窗口后端的测试：需要X服务器（例如 xvfb-run python -m pytest）和python-xlib，缺少时跳过
+
+Xvfb中没有窗口管理器时，测试自己充当一个最小的EWMH窗口管理器：
+维护根窗口的_NET_CLIENT_LIST，处理MapRequest和_NET_ACTIVE_WINDOW请求
+"""
+
+import os
+import select
+import threading
+
+import pytest
+
+from readiness import wait_until
+from window_backend import X11WindowBackend
+
+if not os.environ.get("DISPLAY"):
+    pytest.skip("没有X服务器（DISPLAY未设置）", allow_module_level=True)
+pytest.importorskip("Xlib")
+
+
+class Desktop:
+    """在X服务器上创建测试窗口；没有窗口管理器时在后台线程中模拟一个"""
+
+    def __init__(self):
+        from Xlib import X, Xatom, display as xdisplay
+
+        self._X = X
+        self._Xatom = Xatom
+        self.client = xdisplay.Display()
+        self.root = self.client.screen().root
+        atom = self.client.intern_atom
+        self._client_list = atom("_NET_CLIENT_LIST")
+        self._active = atom("_NET_ACTIVE_WINDOW")
+        self._wm_name = atom("_NET_WM_NAME")
+        self._wm_pid = atom("_NET_WM_PID")
+        self._utf8 = atom("UTF8_STRING")
+        self.windows = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.own_wm = self.root.get_full_property(self._client_list, X.AnyPropertyType) is None
+        if self.own_wm:
+            self.wm = xdisplay.Display()
+            self.wm.screen().root.change_attributes(
+                event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+            self.wm.sync()
+            self._update_client_list()
+            self._thread = threading.Thread(target=self._run_wm, daemon=True)
+            self._thread.start()
+
+    def _update_client_list(self):
+        self.root.change_property(self._client_list, self._Xatom.WINDOW, 32, [window.id for window in self.windows])
+        self.client.sync()
+
+    def _run_wm(self):
+        X = self._X
+        root = self.wm.screen().root
+        while not self._stop.is_set():
+            if not self.wm.pending_events():
+                select.select([self.wm.fileno()], [], [], 0.05)
+                continue
+            event = self.wm.next_event()
+            if event.type == X.MapRequest:
+                event.window.map()
+            elif event.type == X.ClientMessage and event.client_type == self._active:
+                root.change_property(self._active, self._Xatom.WINDOW, 32, [event.window.id])
+            self.wm.flush()
+
+    def create(self, title, pid):
+        window = self.root.create_window(0, 0, 200, 100, 0, self.client.screen().root_depth)
+        window.change_property(self._wm_name, self._utf8, 8, title.encode("utf-8"))
+        window.change_property(self._wm_pid, self._Xatom.CARDINAL, 32, [pid])
+        window.map()
+        self.windows.append(window)
+        if self.own_wm:
+            self._update_client_list()
+        self.client.sync()
+        return window.id
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self.wm.close()
+        for window in self.windows:
+            window.destroy()
+        self.windows = []
+        if self.own_wm:
+            self.root.delete_property(self._client_list)
+            self.root.delete_property(self._active)
+        self.client.close()
+
+
+@pytest.fixture
+def desktop():
+    desktop = Desktop()
+    yield desktop
+    desktop.close()
+
+
+def test_x11_backend_enumerates_activates_and_reports_foreground(desktop):
+    first = desktop.create("文件传输助手", 4242)
+    second = desktop.create("其他窗口", 5000)
+    backend = X11WindowBackend()
+    try:
+        # 真实的窗口管理器要过一会儿才把新窗口加入_NET_CLIENT_LIST
+        ok, _ = wait_until(lambda: {first, second} <= {window.hwnd for window in backend.enum_windows()}, timeout=2.0)
+        assert ok
+        windows = {window.hwnd: window for window in backend.enum_windows()}
+        assert windows[first].title == "文件传输助手"
+        assert windows[first].pid == 4242
+        assert windows[first].visible
+        assert backend.get_title(second) == "其他窗口"
+        assert backend.get_pid(second) == 5000
+        assert backend.is_window(first)
+
+        for hwnd in (first, second, first):
+            backend.activate(hwnd)
+            ok, _ = wait_until(lambda: backend.get_foreground() == hwnd, timeout=2.0)
+            assert ok, f"窗口{hwnd}没有切换到前台"
+    finally:
+        backend._display.close()
@@ -0,0 +1,92 @@
+"""
+界面线程桥接模块
+tkinter只能在界面线程中操作，监控引擎的事件循环、热键线程、日志和通知等通过TkBridge把调用交给界面线程：
+call()把调用放入线程安全的队列，队列中有新内容且尚未安排处理时用after_idle安排界面线程取出并依次执行，
+没有调用时界面线程不做任何定时检查。Tcl不支持多线程时其他线程不能调用after_idle，退回到定时检查队列
+"""
+
+import queue
+import threading
+
+
+class TkBridge:
+    """把其他线程中的调用转交给Tk界面线程执行（界面线程中唯一处理这类队列的地方）"""
+
+    def __init__(self, root, poll_interval=100):
+        self.root = root
+        self.poll_interval = poll_interval  # Tcl不支持多线程时检查队列的间隔，毫秒
+        self.drains = 0  # 处理队列的次数
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._threaded = tcl_threaded(root)
+        # 主循环开始后先处理一次；在此之前其他线程的调用只放入队列，不会等待主循环
+        self._scheduled = True
+        root.after_idle(self._drain)
+
+    def call(self, func, *args):
+        """在界面线程中调用func(*args)（可在任意线程调用，不等待执行）"""
+        self._queue.put((func, args))
+        self._schedule()
+
+    def call_latest(self, func):
+        """返回一个可在任意线程调用的回调：调用时把func()交给界面线程（同一轮中多次调用只执行一次）"""
+        def callback(*args):
+            self._queue.put((func, None))
+            self._schedule()
+        return callback
+
+    def close(self):
+        """不再安排处理（关闭窗口前调用，避免其他线程等待已经不处理事件的界面线程）"""
+        with self._lock:
+            self._closed = True
+
+    def _schedule(self):
+        if not self._threaded:
+            return
+        with self._lock:
+            if self._scheduled or self._closed:
+                return
+            self._scheduled = True
+        try:
+            self.root.after_idle(self._drain)
+        except Exception:
+            # 主窗口已经销毁
+            with self._lock:
+                self._scheduled = False
+
+    def _drain(self):
+        with self._lock:
+            self._scheduled = False
+        self.drains += 1
+        done = set()
+        # 只处理这一轮开始时已有的调用，处理过程中新加入的调用会安排到下一轮
+        for _ in range(self._queue.qsize()):
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if args is None:
+                # call_latest()的调用只需执行一次
+                if func in done:
+                    continue
+                done.add(func)
+                args = ()
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"界面更新出错: {e}")
+        if not self._threaded and not self._closed:
+            try:
+                self.root.after(self.poll_interval, self._drain)
+            except Exception:
+                # 主窗口已经销毁
+                pass
+
+
+def tcl_threaded(root):
+    """Tcl是否以多线程方式编译（此时其他线程可以调用after_idle，由tkinter转交给界面线程）"""
+    try:
+        return bool(int(root.tk.eval("set tcl_platform(threaded)")))
+    except Exception:
+        return False
@@ -0,0 +1,494 @@
+"""
+剪贴板事件记录与回放模块
+把剪贴板的每次变化（时间、长度、内容摘要，可选完整内容）记录到trace文件（每行一个JSON），
+再用假剪贴板和假发送方式把trace按原速或加速回放给Monitor，统计漏检的复制、重复发送、
+检测延迟和CPU占用，用于复现突发的复制操作、发现检测路径的性能退化（可在每晚的构建中运行）
+
+用法:
+    python trace_replay.py record trace.jsonl [--content]     记录本机剪贴板的变化，Ctrl+C结束
+    python trace_replay.py synth trace.jsonl --events 300      生成一段突发复制的trace
+    python trace_replay.py replay trace.jsonl --speed 10 --watcher poll --max-missed 0
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+
+from clipboard_watcher import (
+    ClipboardChangeTracker, FakeClipboard, PollingWatcher, content_digest, create_clipboard_watcher
+)
+from history import DETECT, SEND, HistoryStore
+from link_matcher import parse_pattern
+from metrics import percentile
+
+TRACE_VERSION = 1
+
+# 一次剪贴板变化：距trace开始的秒数、内容长度、内容摘要、其中命中规则的链接数、完整内容（未记录时为None）
+TraceEvent = namedtuple("TraceEvent", ["time", "size", "digest", "links", "text"])
+
+# 回放时按速度缩放的时间类配置（秒），缩放后的Monitor在加速回放时与原速的行为一致
+SCALED_CONFIG = ("check_interval", "poll_fast_interval", "poll_fast_window", "send_max_wait", "send_timeout",
+                 "dedup_ttl")
+
+# 生成内容时的填充文字
+FILLER = "剪贴板里的其他文字 lorem ipsum dolor sit amet, "
+
+
+# ---- trace文件 ----
+
+def load_trace(path):
+    """读取trace文件，返回 (文件头字典, [TraceEvent])，事件按时间排序"""
+    header = {}
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+                if "trace" in data:
+                    header = data
+                    continue
+                events.append(TraceEvent(
+                    float(data["t"]), int(data["size"]), data["digest"], int(data.get("links", 0)),
+                    data.get("text")
+                ))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"trace文件第{number}行格式错误: {e}")
+    events.sort(key=lambda event: event.time)
+    return header, events
+
+
+def event_line(event):
+    """把一个事件转换成trace文件中的一行"""
+    data = {"t": round(event.time, 6), "size": event.size, "digest": event.digest, "links": event.links}
+    if event.text is not None:
+        data["text"] = event.text
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+def save_trace(path, events, header=None):
+    """写入trace文件（先写临时文件再替换）"""
+    header = dict(header or {}, trace=TRACE_VERSION)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for event in events:
+            f.write(event_line(event))
+    os.replace(temp_path, path)
+
+
+class TraceRecorder:
+    """把剪贴板的变化逐条追加到trace文件（每条写入后立即flush，程序中途退出也不会丢失已记录的部分）
+
+    router: 用于统计每次内容中命中规则的链接数（router.LinkRouter）；
+    include_content为False时只记录长度和摘要，不保存剪贴板的内容
+    """
+
+    def __init__(self, path, router, include_content=False, limit=0, source=""):
+        self.router = router
+        self.include_content = include_content
+        self.limit = limit
+        self.count = 0
+        self._start = None
+        self._file = open(path, "w", encoding="utf-8")
+        header = {"trace": TRACE_VERSION, "created": time.time(), "source": source, "content": include_content}
+        self._file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def record(self, text, timestamp=None):
+        now = time.monotonic() if timestamp is None else timestamp
+        if self._start is None:
+            self._start = now
+        links = len({match.url for match, _ in self.router.scan(text, self.limit)})
+        event = TraceEvent(now - self._start, len(text), content_digest(text), links,
+                           text if self.include_content else None)
+        self._file.write(event_line(event))
+        self._file.flush()
+        self.count += 1
+        return event
+
+    def close(self):
+        self._file.close()
+
+
+def record_trace(recorder, clipboard, watcher, duration=0, stop=None, log=print):
+    """监听剪贴板并把每次变化交给recorder，到duration秒（0表示不限制）或stop被置位时返回
+
+    事件通知方式下每次写入剪贴板都记录（即使内容相同），轮询方式只能记录内容变化
+    """
+    tracker = ClipboardChangeTracker(watcher)
+    deadline = time.monotonic() + duration if duration else None
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        timeout = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+        if timeout <= 0:
+            break
+        if not watcher.wait_for_change(timeout):
+            continue
+        changed_at = time.monotonic()
+        if not tracker.token_changed():
+            continue
+        try:
+            text = clipboard.paste() or ""
+        except Exception as e:
+            log(f"读取剪贴板失败: {e}")
+            continue
+        if watcher.change_token() is None and not tracker.content_changed(text):
+            continue
+        event = recorder.record(text, changed_at)
+        log(f"{event.time:9.3f}s  {event.size}个字符  {event.links}个链接")
+
+
+def synthesize_trace(events=300, burst=3, gap=0.1, idle=2.0, link_ratio=0.5, size=200, seed=0):
+    """生成突发复制的trace：每burst次复制为一组，组内间隔gap秒、组间间隔idle秒，
+    link_ratio比例的复制含有一个链接；只有摘要，没有内容（回放时按摘要生成内容）"""
+    rng = random.Random(seed)
+    result = []
+    now = 0.0
+    for index in range(events):
+        if index:
+            now += gap if index % burst else idle
+        digest = hashlib.blake2b(f"{seed}-{index}".encode(), digest_size=16).hexdigest()
+        links = 1 if rng.random() < link_ratio else 0
+        result.append(TraceEvent(round(now, 6), size, digest, links, None))
+    return result
+
+
+# ---- 回放 ----
+
+class TraceClipboard(FakeClipboard):
+    """回放用的假剪贴板：记住当前内容属于trace中的第几个事件，以及Monitor最近一次读到的是哪个事件"""
+
+    def __init__(self):
+        super().__init__()
+        self.index = None
+        self.last_read = None
+
+    def copy(self, text, index=None):
+        with self._lock:
+            self._text = text
+            self.index = index
+            self.sequence += 1
+            watchers = list(self._watchers)
+        for watcher in watchers:
+            watcher.notify()
+
+    def paste(self):
+        with self._lock:
+            self.paste_count += 1
+            self.last_read = self.index
+            return self._text
+
+
+class ReplayHistory(HistoryStore):
+    """回放用的历史记录：记录放在内存中（不写数据库），同时记下时间和对应的trace事件"""
+
+    def __init__(self, clipboard):
+        super().__init__(":memory:")
+        self.clipboard = clipboard
+        self.records = []  # [(time.perf_counter(), 类型, 链接, 结果, 事件序号)]
+
+    def record(self, kind, url, source="", method="", outcome="", latency=None, timestamp=None):
+        # Monitor读取剪贴板和处理内容在同一次检查中依次完成，last_read就是正在处理的事件
+        self.records.append((time.perf_counter(), kind, url, outcome, self.clipboard.last_read))
+
+
+def synthetic_prefix(config):
+    """回放只有摘要的trace时生成链接用的URL前缀：链接规则中的第一条URL前缀，没有时使用target_url
+
+    返回 (前缀, 回放使用的链接规则)，不修改传入的配置
+    """
+    patterns = list(config["link_patterns"] or [config["target_url"]])
+    for spec in patterns:
+        kind, pattern = parse_pattern(spec)
+        if kind == "prefix" and pattern.startswith(("http://", "https://")):
+            return pattern, patterns
+    return config["target_url"], patterns + [config["target_url"]]
+
+
+def event_text(event, prefix):
+    """返回事件的剪贴板内容：记录了内容时使用原文，否则按摘要生成长度相同、含有相同数量链接的内容"""
+    if event.text is not None:
+        return event.text
+    separator = "&" if "?" in prefix else "?"
+    parts = [event.digest] + [f"{prefix}{separator}trace={event.digest[:16]}&n={i}" for i in range(event.links)]
+    text = " ".join(parts) + " "
+    if len(text) < event.size:
+        fill = event.size - len(text)
+        text += (FILLER * (fill // len(FILLER) + 1))[:fill]
+    return text
+
+
+def replay_trace(events, config=None, speed=1.0, watcher="fake", send_delay=0.0, failure_rate=0.0,
+                 settle=None, log=None):
+    """把trace回放给使用假后端的Monitor（自动发送），返回统计结果字典
+
+    watcher: fake（事件通知，相当于x11/win32）或poll（轮询，按Monitor的自适应间隔）；
+    speed: 回放速度倍数，时间类配置和发送耗时按同样的倍数缩短，延迟换算回trace中的时间；
+    send_delay: 模拟每批发送的耗时（trace中的秒数），failure_rate: 模拟发送失败的概率
+    """
+    from monitor_core import DEFAULT_CONFIG, Monitor
+    from senders import RecordingSender
+    from window_backend import FakeWindowBackend
+
+    def quiet(message):
+        pass
+
+    if speed <= 0:
+        raise ValueError("回放速度应大于0")
+    if watcher not in ("fake", "poll"):
+        raise ValueError(f"未知的剪贴板监听方式: {watcher}")
+    config = dict(DEFAULT_CONFIG, **(config or {}), auto_send=True, adaptive_send=False)
+    for key in SCALED_CONFIG:
+        config[key] = config[key] / speed
+    prefix = None
+    if any(event.text is None for event in events):
+        prefix, config["link_patterns"] = synthetic_prefix(config)
+    clipboard = TraceClipboard()
+    history = ReplayHistory(clipboard)
+    sender = RecordingSender("replay", activation_delay=send_delay / speed, failure_rate=failure_rate, seed=0)
+    monitor = Monitor(config=config, clipboard=clipboard, window_backend=FakeWindowBackend(), senders=[sender],
+                      log=log or quiet, history=history)
+    if watcher == "poll":
+        # 与真实的轮询方式相同：按Monitor的自适应间隔轮询，没有序列号，只能比较内容
+        polling = PollingWatcher(config["check_interval"], monitor.poll_scheduler)
+        monitor.clipboard_watcher = monitor.clipboard_tracker.watcher = polling
+
+    # 事先生成全部内容，判断哪些事件应该被检测到（含有链接，且与上一次复制的内容不同）
+    texts = [event_text(event, prefix) for event in events]
+    expected = []
+    previous = None
+    for index, text in enumerate(texts):
+        digest = content_digest(text)
+        if text and digest != previous and monitor.extract_links(text):
+            expected.append(index)
+        previous = digest
+
+    if settle is None:
+        settle = max(1.0, 2 * (monitor.config["check_interval"] + monitor.config["send_max_wait"]))
+    copied = {}
+    origin = events[0].time if events else 0.0
+    monitor.start()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for index, (event, text) in enumerate(zip(events, texts)):
+        delay = start + (event.time - origin) / speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        copied[index] = time.perf_counter()
+        clipboard.copy(text, index)
+
+    # 等待最后的复制被检测到（漏检的复制不会再被检测到，最多等一个检测间隔上限）、队列中的链接发送完
+    last_copy = time.perf_counter()
+    deadline = last_copy + settle
+    expected_set = set(expected)
+    while time.perf_counter() < deadline:
+        detected = {record[4] for record in history.records if record[1] == DETECT}
+        settled = expected_set <= detected or time.perf_counter() > last_copy + config["check_interval"] * 1.5
+        if settled and not monitor.processed_url_ready and not len(monitor.send_queue):
+            break
+        time.sleep(0.005)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - start
+    monitor.stop()
+
+    detected_at = {}
+    sent = Counter()
+    for when, kind, url, outcome, index in list(history.records):
+        if kind == DETECT and index is not None:
+            detected_at.setdefault(index, when)
+        elif kind == SEND and outcome == "sent":
+            sent[url] += 1
+    missed = [index for index in expected if index not in detected_at]
+    latencies = sorted((detected_at[index] - copied[index]) * speed
+                       for index in expected if index in detected_at)
+    duplicates = {url: count for url, count in sent.items() if count > 1}
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "watcher": watcher,
+        "speed": speed,
+        "events": len(events),
+        "expected": len(expected),
+        "detected": len(expected) - len(missed),
+        "missed": len(missed),
+        "missed_times": [round(events[index].time, 3) for index in missed],
+        "sent_links": sum(sent.values()),
+        "duplicate_sends": sum(count - 1 for count in duplicates.values()),
+        "duplicate_links": sorted(duplicates),
+        "pending": len(monitor.send_queue),
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 0.5, None)),
+            "p95": ms(percentile(latencies, 0.95, None)),
+            "p99": ms(percentile(latencies, 0.99, None)),
+            "max": ms(latencies[-1] if latencies else None),
+        },
+        "cpu_seconds": round(cpu, 4),
+        "cpu_per_event_us": round(cpu / len(events) * 1e6, 1) if events else 0.0,
+        "wall_seconds": round(wall, 3),
+    }
+
+
+def format_report(report):
+    """把回放结果格式化成几行文字"""
+    latency = report["latency_ms"]
+
+    def ms(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    lines = [
+        f"监听方式 {report['watcher']}, {report['speed']:g}倍速, {report['events']}次复制"
+        f"（应检测{report['expected']}次）",
+        f"漏检 {report['missed']}次, 重复发送 {report['duplicate_sends']}次, 已发送 {report['sent_links']}条链接"
+        + (f", 未发送 {report['pending']}批" if report["pending"] else ""),
+        f"检测延迟 p50 {ms(latency['p50'])} ms, p95 {ms(latency['p95'])} ms, p99 {ms(latency['p99'])} ms, "
+        f"最大 {ms(latency['max'])} ms",
+        f"CPU {report['cpu_seconds'] * 1000:.1f} ms（每次复制 {report['cpu_per_event_us']:.0f} us），"
+        f"回放耗时 {report['wall_seconds']:.2f} s",
+    ]
+    if report["missed_times"]:
+        shown = ", ".join(f"{t:g}s" for t in report["missed_times"][:10])
+        more = " ..." if len(report["missed_times"]) > 10 else ""
+        lines.append(f"漏检的复制（trace中的时间）: {shown}{more}")
+    if report["duplicate_links"]:
+        lines.append(f"重复发送的链接: {', '.join(report['duplicate_links'][:5])}")
+    return lines
+
+
+def check_report(report, max_missed=None, max_duplicates=None, max_p95_ms=None, max_cpu_ms=None):
+    """按阈值检查回放结果，返回超出阈值的说明列表（为空表示通过）"""
+    failures = []
+    if max_missed is not None and report["missed"] > max_missed:
+        failures.append(f"漏检{report['missed']}次，超过{max_missed}次")
+    if max_duplicates is not None and report["duplicate_sends"] > max_duplicates:
+        failures.append(f"重复发送{report['duplicate_sends']}次，超过{max_duplicates}次")
+    p95 = report["latency_ms"]["p95"]
+    if max_p95_ms is not None and p95 is not None and p95 > max_p95_ms:
+        failures.append(f"检测延迟p95 {p95:.1f} ms，超过{max_p95_ms:g} ms")
+    cpu_ms = report["cpu_seconds"] * 1000
+    if max_cpu_ms is not None and cpu_ms > max_cpu_ms:
+        failures.append(f"CPU {cpu_ms:.1f} ms，超过{max_cpu_ms:g} ms")
+    return failures
+
+
+# ---- 命令行 ----
+
+def load_config(path):
+    """读取配置文件（经过校验），未指定时返回None（使用默认配置）"""
+    if not path:
+        return None
+    from config_store import ConfigStore
+
+    return ConfigStore(path, log=lambda message: None).load().to_dict()
+
+
+def command_record(args):
+    from monitor_core import DEFAULT_CONFIG
+    from router import LinkRouter
+    import pyperclip
+
+    config = dict(DEFAULT_CONFIG, **(load_config(args.config) or {}))
+    router = LinkRouter(config["link_patterns"] or [config["target_url"]], config["send_routes"])
+    watcher = create_clipboard_watcher(args.backend, interval=args.interval, log=print)
+    if watcher.name == "poll":
+        print(f"使用轮询方式记录（间隔{args.interval}秒），间隔内的多次复制只能记录最后一次")
+    recorder = TraceRecorder(args.trace, router, include_content=args.content, limit=config["max_scan_chars"],
+                             source=watcher.name)
+    print(f"正在记录剪贴板变化到 {args.trace}，按Ctrl+C结束")
+    try:
+        record_trace(recorder, pyperclip, watcher, duration=args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        recorder.close()
+    print(f"共记录{recorder.count}次变化")
+    return 0
+
+
+def command_synth(args):
+    events = synthesize_trace(args.events, args.burst, args.gap, args.idle, args.link_ratio, args.size, args.seed)
+    save_trace(args.trace, events, {"created": time.time(), "source": "synth"})
+    print(f"已生成{len(events)}次复制，共{events[-1].time if events else 0:.1f}秒: {args.trace}")
+    return 0
+
+
+def command_replay(args):
+    header, events = load_trace(args.trace)
+    if not events:
+        print("trace中没有事件")
+        return 1
+    failed = False
+    reports = []
+    for watcher in args.watcher:
+        report = replay_trace(events, load_config(args.config), speed=args.speed, watcher=watcher,
+                              send_delay=args.send_delay, failure_rate=args.failure_rate)
+        report["failures"] = check_report(report, args.max_missed, args.max_duplicates, args.max_p95_ms,
+                                          args.max_cpu_ms)
+        reports.append(report)
+        if not args.json:
+            print("\n".join(format_report(report)))
+            for failure in report["failures"]:
+                print(f"未通过: {failure}")
+            print()
+        failed = failed or bool(report["failures"])
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="剪贴板事件记录与回放")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="记录本机剪贴板的变化")
+    record.add_argument("trace", help="trace文件")
+    record.add_argument("--content", action="store_true", help="同时记录剪贴板内容（默认只记录长度和摘要）")
+    record.add_argument("--duration", type=float, default=0, help="记录多少秒，0表示直到Ctrl+C")
+    record.add_argument("--backend", default="auto", help="剪贴板监听方式: auto/x11/win32/poll")
+    record.add_argument("--interval", type=float, default=0.05, help="轮询方式的间隔，秒")
+    record.add_argument("--config", help="配置文件，使用其中的链接规则统计链接数")
+    record.set_defaults(func=command_record)
+
+    synth = commands.add_parser("synth", help="生成突发复制的trace")
+    synth.add_argument("trace", help="trace文件")
+    synth.add_argument("--events", type=int, default=300, help="复制次数")
+    synth.add_argument("--burst", type=int, default=3, help="每组连续复制的次数")
+    synth.add_argument("--gap", type=float, default=0.1, help="组内复制的间隔，秒")
+    synth.add_argument("--idle", type=float, default=2.0, help="组之间的间隔，秒")
+    synth.add_argument("--link-ratio", type=float, default=0.5, help="含有链接的复制所占的比例")
+    synth.add_argument("--size", type=int, default=200, help="每次复制的字符数")
+    synth.add_argument("--seed", type=int, default=0, help="随机数种子")
+    synth.set_defaults(func=command_synth)
+
+    replay = commands.add_parser("replay", help="回放trace并统计漏检、重复发送、检测延迟和CPU占用")
+    replay.add_argument("trace", help="trace文件")
+    replay.add_argument("--speed", type=float, default=1.0, help="回放速度倍数")
+    replay.add_argument("--watcher", nargs="+", choices=["fake", "poll"], default=["fake", "poll"],
+                        help="剪贴板监听方式：fake(事件通知)/poll(轮询)，可指定多个")
+    replay.add_argument("--config", help="配置文件，默认使用默认配置")
+    replay.add_argument("--send-delay", type=float, default=0.05, help="模拟每批发送的耗时，秒")
+    replay.add_argument("--failure-rate", type=float, default=0.0, help="模拟发送失败的概率")
+    replay.add_argument("--max-missed", type=int, help="漏检次数超过该值时返回非0")
+    replay.add_argument("--max-duplicates", type=int, help="重复发送次数超过该值时返回非0")
+    replay.add_argument("--max-p95-ms", type=float, help="检测延迟p95超过该值（毫秒）时返回非0")
+    replay.add_argument("--max-cpu-ms", type=float, help="CPU时间超过该值（毫秒）时返回非0")
+    replay.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    replay.set_defaults(func=command_replay)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
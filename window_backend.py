@@ -0,0 +1,681 @@
+"""
+窗口操作平台抽象模块
+把枚举窗口、获取标题、激活窗口、模拟按键等操作封装成可替换的后端（Windows、Linux/X11、假后端），
+并提供窗口索引：一次枚举建立快照，按标题和微信关键字查找窗口，缓存句柄并在复用前廉价校验
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# 微信窗口标题中的关键字
+WECHAT_KEYWORDS = ("微信", "WeChat", "文件传输助手")
+
+# 枚举得到的窗口信息
+WindowInfo = namedtuple("WindowInfo", ["hwnd", "title", "pid", "visible"])
+
+
+class WindowBackend:
+    """窗口操作后端基类（当前平台不支持窗口操作时使用）"""
+
+    name = "none"
+    can_type = False  # 是否实现了type_text()
+
+    def enum_windows(self):
+        """枚举所有顶层窗口，返回WindowInfo列表"""
+        return []
+
+    def get_title(self, hwnd):
+        """返回窗口标题，获取失败时返回None"""
+        return None
+
+    def get_pid(self, hwnd):
+        return None
+
+    def is_window(self, hwnd):
+        """廉价判断句柄是否仍然有效"""
+        return False
+
+    def get_foreground(self):
+        """返回前台窗口句柄，不支持时返回None"""
+        return None
+
+    def activate(self, hwnd):
+        """恢复并激活窗口"""
+        raise RuntimeError("当前平台不支持窗口操作")
+
+    def is_idle(self, hwnd):
+        """窗口已处理完之前的输入时返回True，不支持时返回None"""
+        return None
+
+    def hotkey(self, *keys):
+        """向前台窗口发送组合键，键名与pyautogui一致（默认使用pyautogui实现）"""
+        import pyautogui
+        pyautogui.hotkey(*keys)
+
+    def type_text(self, text, chunk_size=200):
+        """把一行文本作为Unicode按键事件直接输入前台窗口（不经过剪贴板）"""
+        raise RuntimeError("当前平台不支持直接输入文本")
+
+    def type_lines(self, text, newline_keys=("shift", "enter"), chunk_size=200):
+        """输入可能包含多行的文本，换行用newline_keys组合键（微信中单独的回车会直接发送）"""
+        lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        for index, line in enumerate(lines):
+            if index:
+                self.hotkey(*newline_keys)
+            if line:
+                self.type_text(line, chunk_size)
+
+
+def send_unicode_input(text, chunk_size=200):
+    """通过SendInput的KEYEVENTF_UNICODE把文本按UTF-16编码单元逐个输入前台窗口"""
+    import ctypes
+    from ctypes import wintypes
+
+    ULONG_PTR = ctypes.c_size_t
+
+    class KEYBDINPUT(ctypes.Structure):
+        _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                    ("time", wintypes.DWORD), ("dwExtraInfo", ULONG_PTR)]
+
+    class MOUSEINPUT(ctypes.Structure):
+        _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                    ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ULONG_PTR)]
+
+    class HARDWAREINPUT(ctypes.Structure):
+        _fields_ = [("uMsg", wintypes.DWORD), ("wParamL", wintypes.WORD), ("wParamH", wintypes.WORD)]
+
+    class INPUTUNION(ctypes.Union):
+        _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT), ("hi", HARDWAREINPUT)]
+
+    class INPUT(ctypes.Structure):
+        _fields_ = [("type", wintypes.DWORD), ("union", INPUTUNION)]
+
+    INPUT_KEYBOARD = 1
+    KEYEVENTF_KEYUP = 0x0002
+    KEYEVENTF_UNICODE = 0x0004
+
+    data = text.encode("utf-16-le")
+    units = [int.from_bytes(data[i:i + 2], "little") for i in range(0, len(data), 2)]
+    send_input = ctypes.windll.user32.SendInput
+    for start in range(0, len(units), chunk_size):
+        chunk = units[start:start + chunk_size]
+        inputs = (INPUT * (len(chunk) * 2))()
+        for i, unit in enumerate(chunk):
+            for j, flags in enumerate((KEYEVENTF_UNICODE, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP)):
+                item = inputs[i * 2 + j]
+                item.type = INPUT_KEYBOARD
+                item.union.ki = KEYBDINPUT(0, unit, flags, 0, 0)
+        sent = send_input(len(inputs), inputs, ctypes.sizeof(INPUT))
+        if sent != len(inputs):
+            raise RuntimeError(f"SendInput只输入了{sent}/{len(inputs)}个按键事件")
+
+
+class Win32WindowBackend(WindowBackend):
+    """通过ctypes调用user32实现（不依赖pywin32）"""
+
+    name = "win32"
+    can_type = True
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        self._ctypes = ctypes
+        self._user32 = ctypes.windll.user32
+        self._enum_proc_type = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+
+    def enum_windows(self):
+        ctypes = self._ctypes
+        user32 = self._user32
+        windows = []
+
+        def callback(hwnd, lparam):
+            length = user32.GetWindowTextLengthW(hwnd)
+            title = ""
+            if length > 0:
+                buffer = ctypes.create_unicode_buffer(length + 1)
+                user32.GetWindowTextW(hwnd, buffer, length + 1)
+                title = buffer.value
+            pid = ctypes.c_ulong()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            windows.append(WindowInfo(hwnd, title, pid.value or None, bool(user32.IsWindowVisible(hwnd))))
+            return True
+
+        user32.EnumWindows(self._enum_proc_type(callback), 0)
+        return windows
+
+    def get_title(self, hwnd):
+        try:
+            length = self._user32.GetWindowTextLengthW(hwnd) + 1
+            buffer = self._ctypes.create_unicode_buffer(length)
+            self._user32.GetWindowTextW(hwnd, buffer, length)
+            return buffer.value
+        except Exception:
+            return None
+
+    def get_pid(self, hwnd):
+        pid = self._ctypes.c_ulong()
+        self._user32.GetWindowThreadProcessId(hwnd, self._ctypes.byref(pid))
+        return pid.value or None
+
+    def is_window(self, hwnd):
+        return bool(hwnd) and bool(self._user32.IsWindow(hwnd))
+
+    def get_foreground(self):
+        return self._user32.GetForegroundWindow()
+
+    def activate(self, hwnd):
+        SW_RESTORE = 9  # 恢复窗口
+        self._user32.ShowWindow(hwnd, SW_RESTORE)
+        self._user32.SetForegroundWindow(hwnd)
+
+    def is_idle(self, hwnd, timeout_ms=50):
+        # 向窗口发送WM_NULL消息，窗口线程处理完之前的消息后才会返回
+        result = self._ctypes.c_size_t()
+        WM_NULL = 0x0000
+        SMTO_ABORTIFHUNG = 0x0002
+        return bool(self._user32.SendMessageTimeoutW(
+            hwnd, WM_NULL, 0, 0, SMTO_ABORTIFHUNG, timeout_ms, self._ctypes.byref(result)
+        ))
+
+    def type_text(self, text, chunk_size=200):
+        send_unicode_input(text, chunk_size)
+
+
+class PyWin32WindowBackend(WindowBackend):
+    """通过pywin32（win32gui）实现，作为ctypes不可用时的备选"""
+
+    name = "pywin32"
+    can_type = True
+
+    def __init__(self):
+        import win32con
+        import win32gui
+        import win32process
+
+        self._win32gui = win32gui
+        self._win32con = win32con
+        self._win32process = win32process
+
+    def enum_windows(self):
+        win32gui = self._win32gui
+        win32process = self._win32process
+        windows = []
+
+        def callback(hwnd, results):
+            results.append(WindowInfo(
+                hwnd, win32gui.GetWindowText(hwnd), win32process.GetWindowThreadProcessId(hwnd)[1] or None,
+                bool(win32gui.IsWindowVisible(hwnd))
+            ))
+            return True
+
+        win32gui.EnumWindows(callback, windows)
+        return windows
+
+    def get_title(self, hwnd):
+        try:
+            return self._win32gui.GetWindowText(hwnd)
+        except Exception:
+            return None
+
+    def get_pid(self, hwnd):
+        return self._win32process.GetWindowThreadProcessId(hwnd)[1] or None
+
+    def is_window(self, hwnd):
+        return bool(hwnd) and bool(self._win32gui.IsWindow(hwnd))
+
+    def get_foreground(self):
+        return self._win32gui.GetForegroundWindow()
+
+    def activate(self, hwnd):
+        self._win32gui.ShowWindow(hwnd, self._win32con.SW_RESTORE)
+        self._win32gui.SetForegroundWindow(hwnd)
+
+    def type_text(self, text, chunk_size=200):
+        send_unicode_input(text, chunk_size)
+
+
+class X11WindowBackend(WindowBackend):
+    """Linux/X11实现：通过EWMH枚举和激活窗口，通过XTest扩展模拟按键（需要python-xlib）"""
+
+    name = "x11"
+    can_type = True
+
+    # pyautogui键名 -> X11 keysym名
+    KEYSYM_NAMES = {
+        "ctrl": "Control_L", "alt": "Alt_L", "shift": "Shift_L", "win": "Super_L",
+        "enter": "Return", "return": "Return", "tab": "Tab", "esc": "Escape",
+        "backspace": "BackSpace", "space": "space",
+    }
+
+    def __init__(self):
+        from Xlib import X, XK, Xatom, display as xdisplay
+        from Xlib.ext import xtest
+        from Xlib.protocol import event as xevent
+
+        self._X = X
+        self._XK = XK
+        self._Xatom = Xatom
+        self._xtest = xtest
+        self._xevent = xevent
+        self._display = xdisplay.Display()
+        self._root = self._display.screen().root
+        self._lock = threading.RLock()
+
+        atom = self._display.intern_atom
+        self._NET_CLIENT_LIST = atom("_NET_CLIENT_LIST")
+        self._NET_ACTIVE_WINDOW = atom("_NET_ACTIVE_WINDOW")
+        self._NET_WM_NAME = atom("_NET_WM_NAME")
+        self._NET_WM_PID = atom("_NET_WM_PID")
+        self._NET_WM_STATE = atom("_NET_WM_STATE")
+        self._NET_WM_STATE_HIDDEN = atom("_NET_WM_STATE_HIDDEN")
+        self._UTF8_STRING = atom("UTF8_STRING")
+
+        if self._root.get_full_property(self._NET_CLIENT_LIST, X.AnyPropertyType) is None:
+            self._display.close()
+            raise RuntimeError("窗口管理器不支持EWMH (_NET_CLIENT_LIST)")
+        if not self._display.has_extension("XTEST"):
+            self._display.close()
+            raise RuntimeError("X服务器不支持XTEST扩展")
+
+    def _window(self, hwnd):
+        return self._display.create_resource_object("window", hwnd)
+
+    def _title(self, window):
+        prop = window.get_full_property(self._NET_WM_NAME, self._UTF8_STRING)
+        if prop is not None and prop.value:
+            value = prop.value
+            return value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+        name = window.get_wm_name()
+        if isinstance(name, bytes):
+            name = name.decode("latin-1")
+        return name or ""
+
+    def enum_windows(self):
+        with self._lock:
+            prop = self._root.get_full_property(self._NET_CLIENT_LIST, self._X.AnyPropertyType)
+            windows = []
+            for hwnd in (prop.value if prop is not None else []):
+                try:
+                    window = self._window(hwnd)
+                    state = window.get_full_property(self._NET_WM_STATE, self._Xatom.ATOM)
+                    hidden = state is not None and self._NET_WM_STATE_HIDDEN in state.value
+                    windows.append(WindowInfo(hwnd, self._title(window), self._pid(window), not hidden))
+                except Exception:
+                    # 枚举过程中窗口可能已经关闭
+                    continue
+            return windows
+
+    def _pid(self, window):
+        prop = window.get_full_property(self._NET_WM_PID, self._Xatom.CARDINAL)
+        return prop.value[0] if prop is not None and len(prop.value) else None
+
+    def get_title(self, hwnd):
+        try:
+            with self._lock:
+                return self._title(self._window(hwnd))
+        except Exception:
+            return None
+
+    def get_pid(self, hwnd):
+        try:
+            with self._lock:
+                return self._pid(self._window(hwnd))
+        except Exception:
+            return None
+
+    def is_window(self, hwnd):
+        if not hwnd:
+            return False
+        try:
+            with self._lock:
+                self._window(hwnd).get_attributes()
+            return True
+        except Exception:
+            return False
+
+    def get_foreground(self):
+        with self._lock:
+            prop = self._root.get_full_property(self._NET_ACTIVE_WINDOW, self._X.AnyPropertyType)
+        if prop is None or not len(prop.value):
+            return None
+        return prop.value[0] or None
+
+    def activate(self, hwnd):
+        # 按EWMH规范向根窗口发送_NET_ACTIVE_WINDOW请求（来源2表示由任务栏/工具发起）
+        X = self._X
+        with self._lock:
+            message = self._xevent.ClientMessage(
+                window=self._window(hwnd),
+                client_type=self._NET_ACTIVE_WINDOW,
+                data=(32, [2, X.CurrentTime, 0, 0, 0]),
+            )
+            self._root.send_event(
+                message, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask
+            )
+            self._display.flush()
+
+    def is_idle(self, hwnd):
+        # XSync返回时X服务器已处理完之前的全部请求（包括模拟的按键）
+        with self._lock:
+            self._display.sync()
+        return True
+
+    def _keycode(self, key):
+        name = self.KEYSYM_NAMES.get(key.lower(), key)
+        keysym = self._XK.string_to_keysym(name)
+        keycode = self._display.keysym_to_keycode(keysym) if keysym else 0
+        if not keycode:
+            raise ValueError(f"无法识别的按键: {key}")
+        return keycode
+
+    def hotkey(self, *keys):
+        X = self._X
+        with self._lock:
+            keycodes = [self._keycode(key) for key in keys]
+            for keycode in keycodes:
+                self._xtest.fake_input(self._display, X.KeyPress, keycode)
+            for keycode in reversed(keycodes):
+                self._xtest.fake_input(self._display, X.KeyRelease, keycode)
+            self._display.sync()
+
+    def _scratch_keycode(self):
+        """找一个没有映射任何keysym的键码，临时映射要输入的字符"""
+        min_keycode = self._display.display.info.min_keycode
+        max_keycode = self._display.display.info.max_keycode
+        mapping = self._display.get_keyboard_mapping(min_keycode, max_keycode - min_keycode + 1)
+        for offset, keysyms in enumerate(mapping):
+            if not any(keysyms):
+                return min_keycode + offset
+        # 没有空闲键码时借用最后一个键码
+        return max_keycode
+
+    def type_text(self, text, chunk_size=200):
+        # 与xdotool相同的做法：把每个字符的keysym临时映射到空闲键码上再按下，
+        # 这样不需要考虑Shift状态和当前键盘布局，任何Unicode字符都能输入
+        X = self._X
+        with self._lock:
+            keycode = self._scratch_keycode()
+            original = self._display.get_keyboard_mapping(keycode, 1)[0]
+            try:
+                for start in range(0, len(text), chunk_size):
+                    for ch in text[start:start + chunk_size]:
+                        code = ord(ch)
+                        keysym = code if code < 0x100 else 0x01000000 | code
+                        self._display.change_keyboard_mapping(keycode, [(keysym, keysym)])
+                        self._display.sync()
+                        self._xtest.fake_input(self._display, X.KeyPress, keycode)
+                        self._xtest.fake_input(self._display, X.KeyRelease, keycode)
+                    # 每输入一段同步一次，避免一次性堆积过多事件
+                    self._display.sync()
+            finally:
+                self._display.change_keyboard_mapping(keycode, [tuple(original)])
+                self._display.sync()
+
+
+class FakeWindowBackend(WindowBackend):
+    """内存中的假窗口后端，供测试和基准测试使用，可在Linux上运行"""
+
+    name = "fake"
+    can_type = True
+
+    def __init__(self, windows=(), foreground=None, activation_delay=0.0, key_delay=0.0, char_delay=0.0):
+        # windows: [(句柄, 标题)] 或 [(句柄, 标题, 进程号)]
+        self.windows = {}
+        for window in windows:
+            hwnd, title = window[0], window[1]
+            pid = window[2] if len(window) > 2 else None
+            self.windows[hwnd] = WindowInfo(hwnd, title, pid, True)
+        self.foreground = foreground
+        self.activation_delay = activation_delay
+        self.key_delay = key_delay     # 每个组合键的模拟耗时
+        self.char_delay = char_delay   # 直接输入时每个字符的模拟耗时
+        self.typed = []       # [(前台窗口, 文本)]
+        self.enum_calls = 0
+        self.activations = []
+        self.keys = []        # [(前台窗口, 组合键)]
+        self.failing = set()  # 激活时会失败的窗口
+        self.ignored = set()  # 激活时不报错、但不会切换到前台的窗口（模拟Windows的前台锁定）
+        self._lock = threading.Lock()
+
+    def add_window(self, hwnd, title, pid=None, visible=True):
+        with self._lock:
+            self.windows[hwnd] = WindowInfo(hwnd, title, pid, visible)
+
+    def close_window(self, hwnd):
+        with self._lock:
+            self.windows.pop(hwnd, None)
+            if self.foreground == hwnd:
+                self.foreground = None
+
+    def enum_windows(self):
+        with self._lock:
+            self.enum_calls += 1
+            return list(self.windows.values())
+
+    def get_title(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window.title if window else None
+
+    def get_pid(self, hwnd):
+        window = self.windows.get(hwnd)
+        return window.pid if window else None
+
+    def is_window(self, hwnd):
+        return hwnd in self.windows
+
+    def get_foreground(self):
+        return self.foreground
+
+    def activate(self, hwnd):
+        if hwnd not in self.windows or hwnd in self.failing:
+            raise RuntimeError(f"无法激活窗口: {hwnd}")
+        if self.activation_delay:
+            time.sleep(self.activation_delay)
+        with self._lock:
+            if hwnd not in self.ignored:
+                self.foreground = hwnd
+            self.activations.append(hwnd)
+
+    def is_idle(self, hwnd):
+        return hwnd in self.windows
+
+    def hotkey(self, *keys):
+        if self.key_delay:
+            time.sleep(self.key_delay)
+        with self._lock:
+            self.keys.append((self.foreground, keys))
+
+    def type_text(self, text, chunk_size=200):
+        if self.char_delay:
+            time.sleep(self.char_delay * len(text))
+        with self._lock:
+            self.typed.append((self.foreground, text))
+
+
+def create_window_backend(backend="auto", log=None):
+    """根据平台创建窗口操作后端，都不可用时返回不支持任何操作的基础后端"""
+    if backend == "auto":
+        if sys.platform.startswith("win"):
+            candidates = ["win32", "pywin32"]
+        elif os.environ.get("DISPLAY"):
+            candidates = ["x11"]
+        else:
+            candidates = []
+    elif backend == "none":
+        candidates = []
+    else:
+        candidates = [backend]
+
+    factories = {
+        "win32": Win32WindowBackend,
+        "pywin32": PyWin32WindowBackend,
+        "x11": X11WindowBackend,
+    }
+
+    for name in candidates:
+        factory = factories.get(name)
+        if factory is None:
+            if log:
+                log(f"未知的窗口操作方式: {name}")
+            continue
+        try:
+            return factory()
+        except Exception as e:
+            if log:
+                log(f"无法使用{name}窗口操作: {e}")
+
+    return WindowBackend()
+
+
+def is_wechat_title(title, keywords=WECHAT_KEYWORDS):
+    return any(keyword in title for keyword in keywords)
+
+
+class WindowIndex:
+    """窗口索引
+
+    一次枚举建立所有窗口的快照，同时解析要查找的标题和微信窗口；
+    查到的句柄会缓存下来，再次使用前只做一次廉价校验（句柄有效且标题仍匹配），
+    校验失败时才重新枚举
+    """
+
+    def __init__(self, backend, keywords=WECHAT_KEYWORDS, histogram=None):
+        self.backend = backend
+        self.keywords = tuple(keywords)
+        self.histogram = histogram  # 可选的指标直方图，按查找方式记录每次查找的耗时
+        self.windows = []         # 最近一次枚举的快照
+        self.scans = 0            # 枚举次数
+        self.last_scan_time = 0.0  # 最近一次枚举耗时（秒）
+        self._title_cache = {}    # 查询的标题 -> 句柄
+        self._pid_cache = {}      # (进程号, 标题) -> 句柄
+        self._wechat = []         # 快照中的微信窗口
+        self._lock = threading.Lock()
+
+    def refresh(self, titles=()):
+        """重新枚举一次窗口，并在同一遍中解析titles和微信窗口"""
+        start = time.perf_counter()
+        windows = self.backend.enum_windows()
+        pending = [title for title in titles if title]
+        resolved = {}
+        wechat = []
+        for window in windows:
+            if not window.title:
+                continue
+            if is_wechat_title(window.title, self.keywords):
+                wechat.append(window)
+            if pending:
+                for title in pending:
+                    if title not in resolved and title in window.title and window.visible:
+                        resolved[title] = window.hwnd
+        with self._lock:
+            self.windows = windows
+            self._wechat = wechat
+            self._title_cache = resolved
+            self.scans += 1
+            self.last_scan_time = time.perf_counter() - start
+        return windows
+
+    def validate(self, hwnd, title=None):
+        """廉价校验缓存的句柄是否还能使用"""
+        if not hwnd or not self.backend.is_window(hwnd):
+            return False
+        if title is None:
+            return True
+        current = self.backend.get_title(hwnd)
+        return current is not None and title in current
+
+    def _lookup(self, title):
+        hwnd = self._title_cache.get(title)
+        if hwnd is None:
+            # 查询快照（不重新枚举）
+            for window in self.windows:
+                if window.visible and window.title and title in window.title:
+                    hwnd = window.hwnd
+                    self._title_cache[title] = hwnd
+                    break
+        return hwnd
+
+    def find_by_title(self, title):
+        """按标题（包含关系）查找窗口句柄"""
+        return self.find_first([title])[1] if title else None
+
+    def find_by_pid(self, pid, title=None):
+        """按进程号查找可见窗口（指定title时标题还要包含title），缓存失效时最多只枚举一次"""
+        start = time.perf_counter()
+        try:
+            key = (pid, title)
+            hwnd = self._pid_cache.get(key)
+            if hwnd and self.validate(hwnd, title) and self.backend.get_pid(hwnd) == pid:
+                return hwnd
+            for refresh in (False, True):
+                if refresh:
+                    self.refresh()
+                with self._lock:
+                    for window in self.windows:
+                        if not (window.visible and window.title and (title is None or title in window.title)):
+                            continue
+                        # 枚举时没有取得进程号的后端逐个查询
+                        window_pid = window.pid if window.pid is not None else self.backend.get_pid(window.hwnd)
+                        if window_pid == pid and self.validate(window.hwnd):
+                            self._pid_cache[key] = window.hwnd
+                            return window.hwnd
+            return None
+        finally:
+            self._observe("pid", start)
+
+    def _observe(self, kind, start):
+        if self.histogram is not None:
+            self.histogram.observe(time.perf_counter() - start, kind)
+
+    def find_first(self, titles):
+        """按顺序查找第一个存在的窗口，返回 (标题, 句柄)，最多只枚举一次"""
+        start = time.perf_counter()
+        try:
+            return self._find_first(titles)
+        finally:
+            self._observe("title", start)
+
+    def _find_first(self, titles):
+        titles = [title for title in titles if title]
+        if not titles:
+            return None, None
+        with self._lock:
+            for title in titles:
+                hwnd = self._lookup(title)
+                if hwnd and self.validate(hwnd, title):
+                    return title, hwnd
+        self.refresh(titles)
+        with self._lock:
+            for title in titles:
+                hwnd = self._title_cache.get(title)
+                if hwnd:
+                    return title, hwnd
+        return None, None
+
+    def wechat_windows(self):
+        """返回微信窗口列表，缓存的窗口都失效时重新枚举"""
+        start = time.perf_counter()
+        try:
+            return self._wechat_windows()
+        finally:
+            self._observe("wechat", start)
+
+    def _wechat_windows(self):
+        with self._lock:
+            cached = [window for window in self._wechat if self.validate(window.hwnd)]
+        if cached and len(cached) == len(self._wechat):
+            return cached
+        self.refresh()
+        with self._lock:
+            return list(self._wechat)
+
+    def visible_windows(self, refresh=True):
+        """返回所有有标题的可见窗口"""
+        if refresh or not self.windows:
+            self.refresh()
+        with self._lock:
+            return [window for window in self.windows if window.visible and window.title.strip()]
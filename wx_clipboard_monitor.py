@@ -4,11 +4,14 @@
 """
 
 import sys
-import subprocess
 import importlib.util
 import os
 import json
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
+
+# 进程开始运行本模块的时间，用于统计启动耗时
+STARTUP_BEGIN = time.perf_counter()
 
 # 检测是否是从命令行直接运行（而不是被导入）
 is_main_run = __name__ == "__main__"
@@ -18,21 +21,16 @@ CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".wx_clipboard_monitor")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
 DEPENDENCIES_CHECK_FILE = os.path.join(CONFIG_DIR, "dependencies_check.json")
 FIRST_RUN_FLAG_FILE = os.path.join(CONFIG_DIR, "first_run_completed")
+PROCESSED_LINKS_FILE = os.path.join(CONFIG_DIR, "processed_links.json")
+METRICS_FILE = os.path.join(CONFIG_DIR, "metrics.json")
+SEND_STATS_FILE = os.path.join(CONFIG_DIR, "send_stats.json")
+HISTORY_FILE = os.path.join(CONFIG_DIR, "history.db")
 
-# 确保配置目录存在
-if not os.path.exists(CONFIG_DIR):
-    os.makedirs(CONFIG_DIR)
-
-# 检测是否首次运行
-is_first_run = not os.path.exists(FIRST_RUN_FLAG_FILE)
+# 启动耗时目标：从开始运行到主窗口显示，毫秒
+STARTUP_TARGET_MS = 1500
 
-# 如果是第一次运行且从命令行启动，显示欢迎信息
-if is_first_run and is_main_run:
-    print("\n" + "="*70)
-    print(" "*10 + "欢迎使用微信文件传输助手剪贴板监控工具" + " "*10)
-    print("="*70)
-    print("首次启动将自动检查并安装必要的依赖库，这可能需要一点时间...")
-    print("\n如果您希望手动安装依赖，可以运行 install_dependencies.py 脚本\n")
+# 是否首次运行（在initialize()中检测）
+is_first_run = False
 
 # 检查必要的依赖
 required_packages = {
@@ -43,28 +41,53 @@ required_packages = {
 
 # 可选依赖（如果可用则使用，不可用则使用替代方案）
 optional_packages = {
-    'pywin32': 'win32gui'
+    'pywin32': 'win32gui',
+    'python-xlib': 'Xlib'
 }
 
+def dependency_probe_key():
+    """依赖检查结果的缓存键：解释器路径和各site-packages目录的修改时间
+    
+    安装、升级或卸载包都会改变site-packages目录的修改时间，键不变时上次的检查结果仍然有效
+    """
+    import site
+    
+    paths = []
+    try:
+        paths.extend(site.getsitepackages())
+    except AttributeError:
+        # 部分虚拟环境中的site模块没有getsitepackages
+        paths.extend(path for path in sys.path if path.endswith("site-packages"))
+    try:
+        paths.append(site.getusersitepackages())
+    except AttributeError:
+        pass
+    
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            mtimes[path] = None
+    return {
+        'executable': sys.executable,
+        'version': sys.version,
+        'site_packages': mtimes
+    }
+
 def check_and_install_dependencies(force_check=False):
     """检查并安装必要的依赖库，带智能检测功能"""
-    # 检查上次检测时间，如果在24小时内已检测过，且不是强制检测或首次运行，则跳过
-    skip_check = False
+    # 解释器和已安装的包都没有变化时直接使用上次的检查结果，不再逐个查找包
+    probe_key = dependency_probe_key()
     if not force_check and not is_first_run and os.path.exists(DEPENDENCIES_CHECK_FILE):
         try:
             with open(DEPENDENCIES_CHECK_FILE, 'r') as f:
                 check_data = json.load(f)
-                last_check = datetime.fromisoformat(check_data.get('last_check', ''))
-                if datetime.now() - last_check < timedelta(hours=24):
-                    if is_main_run:
-                        print("距离上次依赖检查不到24小时，跳过检查")
-                    skip_check = True
+            if check_data.get('probe_key') == probe_key and not check_data.get('missing_required'):
+                return True
         except:
             pass
     
-    if skip_check:
-        return True
-    
     missing_packages = []
     
     # 检查必需包
@@ -84,6 +107,7 @@ def check_and_install_dependencies(force_check=False):
             print(f"\n检测到缺少以下必要依赖: {', '.join(missing_packages)}")
             print("开始自动安装...\n")
         
+        import subprocess
         try:
             for package in missing_packages:
                 if is_main_run:
@@ -122,11 +146,15 @@ def check_and_install_dependencies(force_check=False):
         for package in optional_missing:
             print(f"  pip install {package}")
     
-    # 记录此次检查时间
+    # 记录此次检查结果（安装过包时site-packages已经变化，重新计算缓存键）
+    if missing_packages:
+        probe_key = dependency_probe_key()
     try:
         with open(DEPENDENCIES_CHECK_FILE, 'w') as f:
             json.dump({
                 'last_check': datetime.now().isoformat(),
+                'probe_key': probe_key,
+                'missing_required': [],
                 'missing_optional': optional_missing
             }, f)
     except:
@@ -147,361 +175,181 @@ def check_and_install_dependencies(force_check=False):
     
     return True
 
-# 检查依赖
-dependencies_ok = check_and_install_dependencies()
-if not dependencies_ok:
-    sys.exit(1)
+# tkinter在用到时才导入（见import_gui_modules()），pyperclip由Monitor创建时导入，
+# keyboard在register_hotkeys()中导入，导入本模块本身不会加载它们
+tk = None
+messagebox = None
 
-# 导入必要的库
-import pyperclip
-import pyautogui
-import time
-import keyboard
-import threading
-import re
-import tkinter as tk
-from tkinter import messagebox
+from config_store import ConfigStore
+from log_sink import LogSink
+from monitor_core import Monitor
+from window_backend import is_wechat_title
 
-# 用户配置和窗口设置
-USER_SETTINGS = {
-    "target_url": "https://gd.aqscwlxy.com/h5/pages/pc/pcPhoto",  # 要监测的URL
-    "check_interval": 1.0,  # 检测间隔，秒
-    "toggle_hotkey": "ctrl+shift+m",  # 切换监控状态的热键
-    "send_hotkey": "ctrl+alt+s",      # 发送到微信的热键 (按此键自动粘贴发送)
-    "saved_windows": []               # 保存的窗口标题列表
-}
+# 用户配置（经过校验的只读Settings，配置项及说明见monitor_core.DEFAULT_CONFIG和config_store）：
+# initialize()中加载，之后配置文件被修改时自动重新加载并立即生效，修改配置使用config_store.update()
+config_store = ConfigStore(CONFIG_FILE)
 
-# 加载用户设置
-def load_user_settings():
-    """从配置文件加载用户设置"""
-    global USER_SETTINGS
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                saved_settings = json.load(f)
-                for key, value in saved_settings.items():
-                    USER_SETTINGS[key] = value
-            print(f"已加载用户配置: {CONFIG_FILE}")
-        except Exception as e:
-            print(f"加载配置文件失败: {e}")
-
-# 保存用户设置
-def save_user_settings():
-    """保存用户设置到配置文件"""
-    try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(USER_SETTINGS, f, ensure_ascii=False, indent=2)
-        print(f"已保存用户配置: {CONFIG_FILE}")
-    except Exception as e:
-        print(f"保存配置文件失败: {e}")
-
-# 加载用户设置
-load_user_settings()
-
-# 配置参数
-CONFIG = {
-    "target_url": USER_SETTINGS["target_url"],
-    "check_interval": USER_SETTINGS["check_interval"],
-    "toggle_hotkey": USER_SETTINGS["toggle_hotkey"],
-    "send_hotkey": USER_SETTINGS["send_hotkey"],
-}
+# 修改后需要额外处理的配置项
+HOTKEY_KEYS = {"toggle_hotkey", "send_hotkey"}
+INFO_KEYS = HOTKEY_KEYS | {"target_url", "link_patterns"}
+METRICS_KEYS = {"metrics_port", "metrics_json", "metrics_flush_interval"}
 
 # 全局变量
-last_clipboard_content = ""
-last_processed_content = ""
-is_monitoring = True
-processed_url_ready = False  # 标记是否有处理好的链接等待发送
-selected_wechat_window = None  # 存储用户选择的微信窗口
-selected_window_title = ""     # 存储选中窗口的标题
+monitor = None   # 监控核心（initialize()中创建），界面和热键都通过它操作
+headless_mode = False  # 无界面模式下不显示任何窗口
+metrics_exporters = []  # 已启动的指标导出（HTTP服务、JSON文件）
+history_store = None  # 检测和发送的历史记录（history_enabled时在initialize()中创建）
+hotkey_handles = []  # 已注册的全局热键
 root = None
 status_label = None
 status_indicator = None
 log_text = None
+notifier = None  # 通知弹窗管理器（GUI创建后初始化）
+tk_bridge = None  # 把监控引擎和热键线程中的界面更新交给界面线程（GUI创建后初始化）
+url_label = None
+toggle_hotkey_label = None
+send_hotkey_label = None
+send_order_label = None
+log_sink = LogSink(max_lines=config_store.settings.log_max_lines)  # 日志输出（任意线程写入，界面线程批量刷新）
 
-def log_message(message):
-    """记录日志消息"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    log_msg = f"[{timestamp}] {message}"
-    print(log_msg)
-    
-    # 如果GUI已初始化，也更新GUI日志
-    if log_text:
-        log_text.config(state=tk.NORMAL)
-        log_text.insert(tk.END, log_msg + "\n")
-        log_text.see(tk.END)
-        log_text.config(state=tk.DISABLED)
-
-def process_text(text):
-    """处理文本，不再删除HTML转义字符"""
-    # 不再进行任何处理，直接返回原始文本
-    log_message("检测到剪贴板内容变化，无需处理HTML转义字符")
-    return text
-
-def send_message():
-    """发送当前处理好的消息"""
-    global processed_url_ready, last_processed_content, selected_wechat_window
-    
-    if not processed_url_ready or not last_processed_content:
-        log_message("没有待发送的链接")
-        show_notification("没有待发送的链接", "warning")
+def initialize(**monitor_options):
+    """启动准备：创建配置目录、检查依赖、加载用户设置并创建各组件
+    
+    导入本模块时不做这些事，由main()在启动时调用一次；依赖不满足时返回False。
+    monitor_options用于替换Monitor的回调（例如无界面模式的log/notify/on_detect）
+    """
+    global is_first_run, monitor, history_store
+    
+    # 确保配置目录存在
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    
+    # 检测是否首次运行
+    is_first_run = not os.path.exists(FIRST_RUN_FLAG_FILE)
+    
+    # 如果是第一次运行且从命令行启动，显示欢迎信息
+    if is_first_run and is_main_run:
+        print("\n" + "="*70)
+        print(" "*10 + "欢迎使用微信文件传输助手剪贴板监控工具" + " "*10)
+        print("="*70)
+        print("首次启动将自动检查并安装必要的依赖库，这可能需要一点时间...")
+        print("\n如果您希望手动安装依赖，可以运行 install_dependencies.py 脚本\n")
+    
+    # 检查依赖
+    if not check_and_install_dependencies():
         return False
     
+    # 加载用户设置
+    settings = config_store.load()
+    log_sink.max_lines = settings.log_max_lines
+    
+    options = {
+        "log": log_message,
+        "notify": show_notification,
+        "on_detect": lambda text, links: play_alert_sound(),
+    }
+    options.update(monitor_options)
+    if settings.history_enabled:
+        from history import HistoryStore
+        history_store = HistoryStore(HISTORY_FILE)
+        history_store.start()
+    monitor = Monitor(
+        config=settings,
+        dedup_path=PROCESSED_LINKS_FILE if settings.dedup_persist else None,
+        send_stats_path=SEND_STATS_FILE,
+        history=history_store,
+        **options
+    )
+    
+    # 配置文件被修改时立即生效
+    config_store.log = monitor.log
+    config_store.subscribe(apply_config_changes)
+    config_store.watch()
+    return True
+
+def apply_config_changes(settings, changed):
+    """配置修改后立即生效：更新监控引擎、重新绑定热键、刷新界面和指标导出"""
+    monitor.apply_config(settings)
+    log_sink.max_lines = settings.log_max_lines
+    if changed & HOTKEY_KEYS and hotkey_handles:
+        register_hotkeys()
+    if changed & INFO_KEYS and tk_bridge:
+        tk_bridge.call(update_info_labels)
+    if changed & METRICS_KEYS and monitor.running:
+        stop_metrics_exporters()
+        start_metrics_exporters()
+
+def import_gui_modules():
+    """导入tkinter（只有创建界面时才需要）"""
+    global tk, messagebox
+    if tk is None:
+        import tkinter
+        from tkinter import messagebox as tk_messagebox
+        tk = tkinter
+        messagebox = tk_messagebox
+
+def register_hotkeys():
+    """注册全局热键（keyboard库在这里才导入，不拖慢主窗口的显示）；热键配置修改后再次调用会重新绑定"""
+    settings = config_store.settings
     try:
-        log_message(f"准备发送文本: {last_processed_content[:50]}..." if len(last_processed_content) > 50 else f"准备发送文本: {last_processed_content}")
-        
-        # 确保最新处理的内容在剪贴板中
-        pyperclip.copy(last_processed_content)
-        time.sleep(0.5)  # 增加延迟
-        
-        # 尝试多种方法发送消息
-        method_success = False
-        
-        # 方法0：如果用户已选择窗口，优先使用该窗口（使用ctypes实现，不依赖win32gui）
-        if selected_wechat_window:
-            try:
-                log_message(f"方法0: 使用用户选择的窗口 (hwnd: {selected_wechat_window})")
-                
-                # 使用ctypes激活窗口
-                try:
-                    import ctypes
-                    user32 = ctypes.windll.user32
-                    
-                    # 尝试获取窗口标题
-                    try:
-                        title_length = user32.GetWindowTextLengthW(selected_wechat_window) + 1
-                        title_buffer = ctypes.create_unicode_buffer(title_length)
-                        user32.GetWindowTextW(selected_wechat_window, title_buffer, title_length)
-                        window_title = title_buffer.value
-                        log_message(f"已找到选择的窗口: {window_title}")
-                    except:
-                        log_message("无法获取窗口标题，但将继续尝试激活窗口")
-                    
-                    # 激活窗口
-                    SW_RESTORE = 9  # 恢复窗口
-                    user32.ShowWindow(selected_wechat_window, SW_RESTORE)
-                    user32.SetForegroundWindow(selected_wechat_window)
-                    time.sleep(0.5)
-                    
-                    # 粘贴并发送
-                    log_message("执行粘贴操作")
-                    pyautogui.hotkey('ctrl', 'v')
-                    time.sleep(0.7)
-                    
-                    log_message("执行发送操作")
-                    pyautogui.press('enter')
-                    time.sleep(0.5)
-                    
-                    method_success = True
-                    log_message("方法0成功：通过用户选择的窗口发送消息")
-                except Exception as e:
-                    log_message(f"使用ctypes激活窗口失败: {e}")
-                    
-                    # 尝试使用win32gui作为备选方案
-                    try:
-                        import win32gui
-                        import win32con
-                        
-                        log_message("尝试使用win32gui激活窗口")
-                        win32gui.ShowWindow(selected_wechat_window, win32con.SW_RESTORE)
-                        win32gui.SetForegroundWindow(selected_wechat_window)
-                        time.sleep(0.5)
-                        
-                        # 粘贴并发送
-                        log_message("执行粘贴操作")
-                        pyautogui.hotkey('ctrl', 'v')
-                        time.sleep(0.7)
-                        
-                        log_message("执行发送操作")
-                        pyautogui.press('enter')
-                        time.sleep(0.5)
-                        
-                        method_success = True
-                        log_message("方法0成功：通过win32gui激活窗口发送消息")
-                    except Exception as e:
-                        log_message(f"使用win32gui激活窗口也失败了: {e}")
-            except Exception as e:
-                log_message(f"方法0失败: {e}")
-        
-        # 如果方法0失败，尝试方法1：使用win32gui查找微信窗口
-        if not method_success:
-            try:
-                log_message("方法1: 尝试查找并激活微信窗口")
-                import win32gui
-                import win32con
-                
-                # 尝试查找微信窗口
-                def find_wechat_window(hwnd, results):
-                    window_text = win32gui.GetWindowText(hwnd)
-                    if '微信' in window_text or 'WeChat' in window_text or '文件传输助手' in window_text:
-                        log_message(f"找到可能的微信窗口: {window_text}")
-                        results.append(hwnd)
-                    return True
-                
-                wechat_windows = []
-                win32gui.EnumWindows(find_wechat_window, wechat_windows)
-                
-                if wechat_windows:
-                    for hwnd in wechat_windows:
-                        try:
-                            log_message(f"尝试激活窗口: {win32gui.GetWindowText(hwnd)}")
-                            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                            win32gui.SetForegroundWindow(hwnd)
-                            time.sleep(0.5)
-                            
-                            # 粘贴并发送
-                            log_message("执行粘贴操作")
-                            pyautogui.hotkey('ctrl', 'v')
-                            time.sleep(0.7)
-                            
-                            log_message("执行发送操作")
-                            pyautogui.press('enter')
-                            time.sleep(0.5)
-                            
-                            method_success = True
-                            log_message("方法1成功：通过激活微信窗口发送消息")
-                            break
-                        except Exception as e:
-                            log_message(f"激活窗口失败: {e}")
-                            continue
-                else:
-                    log_message("未找到微信窗口")
-            except Exception as e:
-                log_message(f"方法1失败: {e}")
-        
-        # 方法2：如果前面的方法失败，尝试使用pyautogui模拟Alt+Tab操作
-        if not method_success:
-            try:
-                log_message("方法2: 尝试使用Alt+Tab切换窗口")
-                # 模拟Alt+Tab切换到之前的窗口，希望是微信
-                pyautogui.keyDown('alt')
-                pyautogui.press('tab')
-                pyautogui.keyUp('alt')
-                time.sleep(0.5)
-                
-                # 确认当前剪贴板内容
-                current_clip = pyperclip.paste()
-                if current_clip != last_processed_content:
-                    log_message("警告：剪贴板内容可能已被更改，重新复制")
-                    pyperclip.copy(last_processed_content)
-                    time.sleep(0.3)
-                
-                # 粘贴并发送
-                log_message("执行粘贴操作")
-                pyautogui.hotkey('ctrl', 'v')
-                time.sleep(0.7)
-                
-                log_message("执行发送操作")
-                pyautogui.press('enter')
-                time.sleep(0.5)
-                
-                method_success = True
-                log_message("方法2成功：通过Alt+Tab切换窗口发送消息")
-            except Exception as e:
-                log_message(f"方法2失败: {e}")
-        
-        # 方法3：如果前面的方法都失败，尝试打开微信文件传输助手网页版
-        if not method_success:
-            try:
-                log_message("方法3: 尝试打开微信文件传输助手网页版")
-                import webbrowser
-                
-                # 打开微信文件传输助手网页版
-                webbrowser.open("https://filehelper.weixin.qq.com/")
-                time.sleep(3)  # 等待网页加载
-                
-                # 尝试定位输入框并粘贴发送
-                pyautogui.hotkey('ctrl', 'v')
-                time.sleep(0.7)
-                
-                # 查找并点击发送按钮
-                # 由于网页版界面可能会变化，这里使用Enter键尝试发送
-                pyautogui.press('enter')
-                time.sleep(0.5)
-                
-                method_success = True
-                log_message("方法3成功：通过网页版文件传输助手发送消息")
-            except Exception as e:
-                log_message(f"方法3失败: {e}")
-        
-        if method_success:
-            log_message("消息已成功发送")
-            show_notification("链接已成功发送到微信", "success")
-            processed_url_ready = False
-            play_alert_sound()
-            return True
-        else:
-            log_message("所有发送方法都失败，请手动发送")
-            show_notification("自动发送失败，请手动将剪贴板内容发送到微信", "error")
-            return False
-            
+        import keyboard
+        while hotkey_handles:
+            keyboard.remove_hotkey(hotkey_handles.pop())
+        hotkey_handles.append(keyboard.add_hotkey(settings.toggle_hotkey, toggle_monitoring))
+        hotkey_handles.append(keyboard.add_hotkey(settings.send_hotkey, lambda: send_message("hotkey")))
     except Exception as e:
-        log_message(f"发送消息出错: {e}")
-        show_notification(f"发送失败: {e}", "error")
-        return False
+        log_message(f"注册热键失败: {e}")
 
-def check_clipboard():
-    """检查剪贴板内容"""
-    global last_clipboard_content, last_processed_content, processed_url_ready
+def start_metrics_exporters():
+    """按配置启动指标导出：只监听本机的HTTP端口，和/或定期写入配置目录下的JSON文件"""
+    from metrics import JsonFlusher, MetricsServer
     
-    if not is_monitoring:
-        return
+    settings = config_store.settings
+    if settings.metrics_port:
+        server = MetricsServer(monitor.metrics, settings.metrics_port)
+        try:
+            server.start()
+            metrics_exporters.append(server)
+            log_message(f"指标导出: http://127.0.0.1:{server.port}/metrics")
+        except OSError as e:
+            log_message(f"无法启动指标导出: {e}")
+    if settings.metrics_json:
+        flusher = JsonFlusher(monitor.metrics, METRICS_FILE, settings.metrics_flush_interval)
+        flusher.start()
+        metrics_exporters.append(flusher)
+
+def stop_metrics_exporters():
+    """停止指标导出（JSON文件会在停止时再写一次）"""
+    while metrics_exporters:
+        metrics_exporters.pop().stop()
+
+def log_message(message):
+    """记录日志消息"""
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    log_msg = f"[{timestamp}] {message}"
     
-    try:
-        # 读取剪贴板内容
-        text = pyperclip.paste()
-        
-        # 如果内容为空或与上次相同，不处理
-        if not text or text == last_clipboard_content:
-            return
-        
-        # 更新上次检测到的内容
-        last_clipboard_content = text
-        
-        # 处理文本
-        processed_text = process_text(text)
-        
-        # 检查处理后的文本是否包含目标URL
-        if CONFIG["target_url"] in processed_text:
-            log_message("检测到目标URL!")
-            
-            # 如果和上次处理过的内容不同，才进行处理
-            if processed_text != last_processed_content:
-                # 记录这次处理的内容
-                last_processed_content = processed_text
-                processed_url_ready = True
-                
-                # 自动复制处理后的内容到剪贴板
-                pyperclip.copy(processed_text)
-                
-                # 显示通知
-                show_notification(
-                    f"检测到学习验证链接！\n请切换到微信文件传输助手，然后按 {CONFIG['send_hotkey']} 发送", 
-                    "success"
-                )
-                play_alert_sound()
-            else:
-                log_message("该链接已处理过，跳过")
-    except Exception as e:
-        log_message(f"检查剪贴板时出错: {e}")
+    # 只放入队列，GUI已初始化时由界面线程批量写入日志区域
+    log_sink.emit(log_msg)
+
+def send_message(source="button"):
+    """请求发送队列中所有待发送的链接（发送按钮和发送热键），不等待发送完成，返回Future"""
+    future = monitor.request_send(source)
+    future.add_done_callback(on_send_done)
+    return future
+
+def on_send_done(future):
+    """发送结束（在监控引擎的线程中调用）"""
+    if not future.cancelled() and future.exception() is None and future.result():
+        play_alert_sound()
 
 def toggle_monitoring():
-    """切换监控状态"""
-    global is_monitoring
-    is_monitoring = not is_monitoring
-    update_status_indicator()
-    
-    show_notification(
-        "剪贴板监控已启动" if is_monitoring else "剪贴板监控已暂停",
-        "success" if is_monitoring else "warning"
-    )
-    
-    log_message("监测已启动" if is_monitoring else "监测已暂停")
+    """切换监控状态（状态指示器由on_state_change更新）"""
+    monitor.toggle()
 
 def play_alert_sound():
     """播放提示音"""
     try:
         import winsound
-        winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS)
+        winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS | winsound.SND_ASYNC)
     except Exception as e:
         log_message(f"播放提示音失败: {e}")
 
@@ -509,63 +357,16 @@ def show_notification(message, type="info"):
     """显示通知"""
     log_message(message)
     
-    # 如果GUI已初始化，使用GUI显示通知
-    if root:
-        # 创建通知颜色
-        if type == "success":
-            bg_color = "#4CAF50"
-        elif type == "error":
-            bg_color = "#F44336"
-        elif type == "warning":
-            bg_color = "#FF9800"
-        else:
-            bg_color = "#2196F3"
-        
-        # 创建通知窗口
-        notification = tk.Toplevel(root)
-        notification.overrideredirect(True)
-        notification.attributes('-topmost', True)
-        
-        # 设置通知位置（屏幕右下角）
-        screen_width = root.winfo_screenwidth()
-        screen_height = root.winfo_screenheight()
-        notification.geometry(f"300x100+{screen_width-320}+{screen_height-120}")
-        
-        # 设置通知内容
-        notification.configure(bg=bg_color)
-        
-        # 消息标签
-        message_label = tk.Label(
-            notification, 
-            text=message, 
-            bg=bg_color, 
-            fg="white", 
-            font=("Arial", 12, "bold"),
-            wraplength=280,
-            padx=10, 
-            pady=10
-        )
-        message_label.pack(fill=tk.BOTH, expand=True)
-        
+    # 如果GUI已初始化，使用复用的通知弹窗显示（由界面线程显示，连续的通知会合并）
+    if notifier:
         # 如果是检测到链接的通知，添加发送按钮
         if "检测到学习验证链接" in message:
-            send_button = tk.Button(
-                notification,
-                text="立即发送",
-                bg="#FFFFFF",
-                fg=bg_color,
-                relief=tk.FLAT,
-                padx=10,
-                pady=5,
-                font=("Arial", 10, "bold"),
-                command=lambda: [send_message(), notification.destroy()]
-            )
-            send_button.pack(pady=(0, 10))
-        
-        # 5秒后关闭
-        notification.after(5000, notification.destroy)
-    else:
+            notifier.post(message, type, "立即发送", lambda: send_message("notification"))
+        else:
+            notifier.post(message, type)
+    elif not headless_mode:
         # 如果GUI未初始化，使用messagebox
+        import_gui_modules()
         if type == "error":
             messagebox.showerror("错误", message)
         elif type == "warning":
@@ -573,15 +374,34 @@ def show_notification(message, type="info"):
         else:
             messagebox.showinfo("提示", message)
 
+def update_info_labels():
+    """更新主窗口中显示的监控规则和热键"""
+    settings = config_store.settings
+    if url_label:
+        link_patterns = monitor.get_link_patterns()
+        if len(link_patterns) > 1:
+            url_label.configure(text=f"监控URL: {link_patterns[0]} 等{len(link_patterns)}条规则")
+        else:
+            url_label.configure(text=f"监控URL: {link_patterns[0]}")
+    if toggle_hotkey_label:
+        toggle_hotkey_label.configure(text=f"开/关监控: {settings.toggle_hotkey}")
+    if send_hotkey_label:
+        send_hotkey_label.configure(text=f"发送快捷键: {settings.send_hotkey}")
+
 def update_status_indicator():
     """更新状态指示器"""
     if status_indicator and status_label:
-        status_indicator.configure(bg="#4CAF50" if is_monitoring else "#F44336")
-        status_label.configure(text="监控已启动" if is_monitoring else "监控已暂停")
+        status_indicator.configure(bg="#4CAF50" if monitor.is_monitoring else "#F44336")
+        status_label.configure(text="监控已启动" if monitor.is_monitoring else "监控已暂停")
 
 def create_gui():
     """创建GUI界面"""
-    global root, status_label, status_indicator, log_text
+    global root, status_label, status_indicator, log_text, notifier, tk_bridge
+    global url_label, toggle_hotkey_label, send_hotkey_label, send_order_label
+    
+    import_gui_modules()
+    from notifier import NotificationManager
+    from tk_bridge import TkBridge
     
     # 创建主窗口
     root = tk.Tk()
@@ -589,6 +409,10 @@ def create_gui():
     root.geometry("500x400")
     root.resizable(True, True)
     
+    # 预先创建通知弹窗
+    tk_bridge = TkBridge(root)
+    notifier = NotificationManager(root, tk_bridge)
+    
     # 创建顶部状态栏
     status_frame = tk.Frame(root, padx=10, pady=5)
     status_frame.pack(fill=tk.X)
@@ -611,9 +435,15 @@ def create_gui():
     info_frame = tk.Frame(root, padx=10, pady=5)
     info_frame.pack(fill=tk.X)
     
-    tk.Label(info_frame, text=f"监控URL: {CONFIG['target_url']}").pack(anchor=tk.W)
-    tk.Label(info_frame, text=f"开/关监控: {CONFIG['toggle_hotkey']}").pack(anchor=tk.W)
-    tk.Label(info_frame, text=f"发送快捷键: {CONFIG['send_hotkey']}").pack(anchor=tk.W)
+    url_label = tk.Label(info_frame)
+    url_label.pack(anchor=tk.W)
+    toggle_hotkey_label = tk.Label(info_frame)
+    toggle_hotkey_label.pack(anchor=tk.W)
+    send_hotkey_label = tk.Label(info_frame)
+    send_hotkey_label.pack(anchor=tk.W)
+    send_order_label = tk.Label(info_frame, fg="#757575", wraplength=480, justify=tk.LEFT)
+    send_order_label.pack(anchor=tk.W)
+    update_info_labels()
     
     # 分隔线
     tk.Frame(root, height=1, bg="#E0E0E0").pack(fill=tk.X, padx=10, pady=5)
@@ -624,7 +454,7 @@ def create_gui():
     
     toggle_button = tk.Button(
         button_frame1, 
-        text="暂停监控" if is_monitoring else "启动监控", 
+        text="暂停监控" if monitor.is_monitoring else "启动监控", 
         command=toggle_monitoring,
         bg="#2196F3",
         fg="white",
@@ -647,10 +477,19 @@ def create_gui():
     clear_log_button = tk.Button(
         button_frame1,
         text="清空日志",
-        command=lambda: log_text.delete(1.0, tk.END) if log_text else None,
+        command=log_sink.clear,
         padx=10
     )
-    clear_log_button.pack(side=tk.LEFT)
+    clear_log_button.pack(side=tk.LEFT, padx=(0, 10))
+    
+    # 历史记录按钮
+    history_button = tk.Button(
+        button_frame1,
+        text="历史记录",
+        command=show_history_window,
+        padx=10
+    )
+    history_button.pack(side=tk.LEFT)
     
     # 窗口选择按钮 - 第二行
     button_frame2 = tk.Frame(root, padx=10, pady=0)
@@ -694,6 +533,9 @@ def create_gui():
     log_text.config(yscrollcommand=scrollbar.set)
     scrollbar.config(command=log_text.yview)
     
+    # 有新日志时由界面线程批量写入
+    log_sink.attach(tk_bridge, log_text)
+    
     # 底部状态栏
     footer_frame = tk.Frame(root, padx=10, pady=5, bg="#F5F5F5")
     footer_frame.pack(fill=tk.X, side=tk.BOTTOM)
@@ -710,28 +552,12 @@ def create_gui():
     
     # 更新窗口状态显示
     def update_window_status():
-        global selected_wechat_window
-        if selected_wechat_window:
-            try:
-                # 尝试使用ctypes获取窗口标题
-                import ctypes
-                user32 = ctypes.windll.user32
-                
-                # 获取窗口标题的长度
-                title_length = user32.GetWindowTextLengthW(selected_wechat_window) + 1
-                title_buffer = ctypes.create_unicode_buffer(title_length)
-                user32.GetWindowTextW(selected_wechat_window, title_buffer, title_length)
-                window_title = title_buffer.value
-                
+        if monitor.selected_wechat_window:
+            window_title = monitor.get_window_title(monitor.selected_wechat_window)
+            if window_title is not None:
                 window_status_var.set(f"已选择窗口: {window_title[:20]}..." if len(window_title) > 20 else f"已选择窗口: {window_title}")
-            except:
-                try:
-                    # 备用方法：使用win32gui
-                    import win32gui
-                    window_title = win32gui.GetWindowText(selected_wechat_window)
-                    window_status_var.set(f"已选择窗口: {window_title[:20]}..." if len(window_title) > 20 else f"已选择窗口: {window_title}")
-                except:
-                    window_status_var.set("已选择窗口(未知标题)")
+            else:
+                window_status_var.set("已选择窗口(未知标题)")
         else:
             window_status_var.set("未选择窗口")
         
@@ -749,63 +575,164 @@ def create_gui():
     # 保持窗口响应
     root.protocol("WM_DELETE_WINDOW", on_closing)
     
-    # 更新后续控制逻辑
-    def update_button_state():
-        send_button.config(state=tk.NORMAL if processed_url_ready else tk.DISABLED)
-        root.after(1000, update_button_state)
+    # 监控状态或待发送状态变化时（在监控引擎的线程中通知）由界面线程更新指示器和发送按钮
+    def update_controls():
+        update_status_indicator()
+        send_button.config(state=tk.NORMAL if monitor.processed_url_ready else tk.DISABLED)
+        send_order_label.configure(text=f"发送顺序: {monitor.send_order_summary()}")
     
-    update_button_state()
+    monitor.on_state_change = tk_bridge.call_latest(update_controls)
+    update_controls()
     
     return root
 
 def on_closing():
     """窗口关闭事件处理"""
     if messagebox.askokcancel("确认", "是否关闭监控程序?"):
+        # 关闭期间界面线程不再处理其他线程的调用，之后的日志直接输出
+        tk_bridge.close()
+        log_sink.detach()
+        # 停止监控引擎和指标导出，写入尚未保存的配置
+        monitor.stop()
+        stop_metrics_exporters()
+        config_store.stop()
+        if history_store:
+            history_store.stop()
         root.destroy()
-        # 停止线程
-        if monitor_thread and monitor_thread.is_alive():
-            global is_monitoring
-            is_monitoring = False  # 这会让线程循环退出
 
-def monitor_clipboard_thread():
-    """剪贴板监控线程"""
-    while True:
-        try:
-            if not is_monitoring:
-                time.sleep(1)
-                continue
-                
-            check_clipboard()
-            time.sleep(CONFIG["check_interval"])
-        except Exception as e:
-            log_message(f"监控线程出错: {e}")
-            time.sleep(CONFIG["check_interval"])
+def report_startup_time(gui, on_visible=None):
+    """主窗口第一次显示时记录启动耗时，超过STARTUP_TARGET_MS时给出提示"""
+    def on_map(event):
+        if event.widget is not gui:
+            return
+        gui.unbind("<Map>", bind_id)
+        elapsed_ms = (time.perf_counter() - STARTUP_BEGIN) * 1000
+        if elapsed_ms > STARTUP_TARGET_MS:
+            log_message(f"启动耗时 {elapsed_ms:.0f} ms，超过目标 {STARTUP_TARGET_MS} ms")
+        else:
+            log_message(f"启动耗时 {elapsed_ms:.0f} ms")
+        if on_visible:
+            on_visible(elapsed_ms)
+    
+    bind_id = gui.bind("<Map>", on_map, add="+")
 
-def main():
-    """主函数"""
-    global monitor_thread
+def measure_startup():
+    """只测量启动耗时：完成启动准备并显示主窗口后立即退出（供benchmark.py调用）"""
+    if not initialize():
+        return 1
+    gui = create_gui()
     
-    # 注册热键
-    keyboard.add_hotkey(CONFIG["toggle_hotkey"], toggle_monitoring)
-    keyboard.add_hotkey(CONFIG["send_hotkey"], send_message)
+    def on_visible(elapsed_ms):
+        print(f"STARTUP_MS={elapsed_ms:.1f}", flush=True)
+        gui.after(0, gui.destroy)
+    
+    report_startup_time(gui, on_visible)
+    gui.mainloop()
+    return 0
+
+def run_headless(log_file=None, quiet=False, on_detect_command=None, hotkeys=True):
+    """无界面模式：不导入tkinter，日志以JSON行输出，检测到链接时写detect事件并运行可选的外部命令"""
+    global headless_mode
+    from headless import HeadlessRunner, StructuredLog, command_hook
+    
+    headless_mode = True
+    log = StructuredLog(stream=None if quiet else sys.stdout, path=log_file)
+    hook = command_hook(on_detect_command, log) if on_detect_command else None
+    
+    def on_detect(text, links):
+        log.write("detect", links=links, pending=len(monitor.send_queue))
+        if hook:
+            hook(text, links)
+    
+    if not initialize(log=log.log, notify=log.notify, on_detect=on_detect):
+        return 1
+    runner = HeadlessRunner(monitor, log, hotkeys=hotkeys, saved_windows=config_store.settings.saved_windows)
+    
+    def rebind_hotkeys(settings, changed):
+        if changed & HOTKEY_KEYS and hotkeys:
+            runner.register_hotkeys()
+    
+    config_store.subscribe(rebind_hotkeys)
+    start_metrics_exporters()
+    try:
+        return runner.run()
+    finally:
+        stop_metrics_exporters()
+        config_store.stop()
+        if history_store:
+            history_store.stop()
+
+def print_history(query="", limit=50):
+    """命令行查询历史记录（不启动监控）"""
+    from history import HistoryStore, format_record
+    
+    if not os.path.exists(HISTORY_FILE):
+        print("暂无历史记录")
+        return 0
+    store = HistoryStore(HISTORY_FILE)
+    records = store.search(query, limit=limit)
+    for record in reversed(records):
+        print(format_record(record))
+    print(f"共{len(records)}条（历史记录总数{store.count()}条）")
+    return 0
+
+def parse_args(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="微信文件传输助手剪贴板监控工具")
+    parser.add_argument("--headless", action="store_true",
+                        help="无界面运行（不加载tkinter），日志以JSON行输出")
+    parser.add_argument("--log-file", help="无界面模式下同时把日志写入该文件")
+    parser.add_argument("--quiet", action="store_true", help="无界面模式下不向标准输出写日志")
+    parser.add_argument("--on-detect", metavar="COMMAND",
+                        help="无界面模式下检测到链接时运行的命令（链接在环境变量WX_LINKS中，每行一条，完整文本从标准输入传入）")
+    parser.add_argument("--no-hotkeys", action="store_true", help="无界面模式下不注册全局热键")
+    parser.add_argument("--history", nargs="?", const="", metavar="QUERY",
+                        help="查询检测和发送的历史记录后退出（QUERY为链接中包含的文字，以http开头时按前缀查询）")
+    parser.add_argument("--history-limit", type=int, default=50, metavar="N",
+                        help="--history最多显示的记录数（默认50）")
+    parser.add_argument("--startup-time", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    if args.startup_time:
+        sys.exit(measure_startup())
+    if args.history is not None:
+        sys.exit(print_history(args.history, args.history_limit))
+    if args.headless:
+        sys.exit(run_headless(args.log_file, args.quiet, args.on_detect, not args.no_hotkeys))
+    
+    # 启动准备（检查依赖、加载配置、创建各组件）
+    if not initialize():
+        sys.exit(1)
     
     # 创建GUI
     gui = create_gui()
+    report_startup_time(gui)
+    
+    # 主窗口显示后再注册热键
+    gui.after_idle(register_hotkeys)
     
     # 尝试恢复上次选择的窗口
     if restore_saved_window():
-        log_message(f"已自动恢复上次选择的窗口: {selected_window_title}")
+        log_message(f"已自动恢复上次选择的窗口: {monitor.selected_window_title}")
     
-    # 启动监控线程
-    monitor_thread = threading.Thread(target=monitor_clipboard_thread, daemon=True)
-    monitor_thread.start()
+    # 启动监控线程和自动发送（仅在配置了auto_send时自动发送）
+    monitor.start()
+    start_metrics_exporters()
     
     # 显示初始通知
     show_notification("剪贴板监控已启动", "success")
     log_message("=== 微信文件传输助手剪贴板监控工具已启动 ===")
-    log_message(f"正在监测URL: {CONFIG['target_url']}")
-    log_message(f"按 {CONFIG['toggle_hotkey']} 可切换监测状态")
-    log_message(f"按 {CONFIG['send_hotkey']} 可发送已处理的链接")
+    for pattern in monitor.get_link_patterns():
+        log_message(f"正在监测URL: {pattern}")
+    if config_store.settings.send_routes:
+        log_message(f"发送路由: {len(config_store.settings.send_routes)}条规则")
+    log_message(f"按 {config_store.settings.toggle_hotkey} 可切换监测状态")
+    log_message(f"按 {config_store.settings.send_hotkey} 可发送已处理的链接")
+    log_message(f"发送方法尝试顺序: {monitor.send_order_summary()}")
     log_message("=== 使用说明 ===")
     log_message("1. 当检测到学习验证链接时，会自动提示")
     log_message("2. 点击「手动选择窗口」按钮，然后点击微信或文件传输助手窗口")
@@ -816,31 +743,68 @@ def main():
     # 启动GUI主循环
     gui.mainloop()
 
+def show_history_window():
+    """历史记录窗口：按链接查询最近的检测和发送记录"""
+    if history_store is None:
+        show_notification("历史记录未开启（配置项history_enabled）", "warning")
+        return
+    from history import format_record
+    
+    history_window = tk.Toplevel(root)
+    history_window.title("历史记录")
+    history_window.geometry("760x420")
+    
+    search_frame = tk.Frame(history_window)
+    search_frame.pack(fill=tk.X, padx=10, pady=10)
+    tk.Label(search_frame, text="链接包含:").pack(side=tk.LEFT)
+    query_entry = tk.Entry(search_frame)
+    query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+    
+    listbox_frame = tk.Frame(history_window)
+    listbox_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 5))
+    scrollbar = tk.Scrollbar(listbox_frame)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    listbox = tk.Listbox(listbox_frame, font=("Courier New", 9), yscrollcommand=scrollbar.set)
+    listbox.pack(fill=tk.BOTH, expand=True)
+    scrollbar.config(command=listbox.yview)
+    
+    count_label = tk.Label(history_window, anchor=tk.W)
+    count_label.pack(fill=tk.X, padx=10, pady=(0, 10))
+    
+    def refresh(event=None):
+        # 由写入线程先写入队列中的记录再查询，刚检测到的链接也能查到；界面线程不等待，结果交回界面线程显示
+        history_store.query(lambda records, error: tk_bridge.call(show_records, records, error),
+                            query_entry.get().strip(), limit=500)
+    
+    def show_records(records, error):
+        if error is not None:
+            log_message(f"查询历史记录失败: {error}")
+            return
+        if not history_window.winfo_exists():
+            return
+        listbox.delete(0, tk.END)
+        for record in records:
+            listbox.insert(tk.END, format_record(record))
+        count_label.config(text=f"显示最近{len(records)}条")
+    
+    tk.Button(search_frame, text="查询", command=refresh, padx=10).pack(side=tk.LEFT)
+    query_entry.bind("<Return>", refresh)
+    query_entry.focus_set()
+    refresh()
+
 # 新增函数：列出所有窗口并让用户选择微信窗口
 def select_wechat_window():
     """列出所有可能的微信窗口并让用户选择"""
-    global selected_wechat_window
-    
     try:
-        import win32gui
-        
-        # 获取所有窗口
-        def enum_windows_callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd):
-                window_text = win32gui.GetWindowText(hwnd)
-                if window_text and len(window_text.strip()) > 0:
-                    windows.append((hwnd, window_text))
-            return True
-        
-        windows = []
-        win32gui.EnumWindows(enum_windows_callback, windows)
+        # 获取所有有标题的可见窗口（一次枚举）
+        windows = [(window.hwnd, window.title) for window in monitor.window_index.visible_windows()]
         
         # 过滤可能的微信窗口
         wechat_windows = []
         other_windows = []
         
         for hwnd, title in windows:
-            if '微信' in title or 'WeChat' in title or '文件传输助手' in title:
+            if is_wechat_title(title):
                 wechat_windows.append((hwnd, title))
             elif title.strip():  # 其他非空标题窗口
                 other_windows.append((hwnd, title))
@@ -894,7 +858,7 @@ def select_wechat_window():
                     other_idx = idx - len(wechat_windows) - 2  # 减2是因为有两个标题行
                     selected_hwnd, title = other_windows[other_idx]
                 
-                selected_wechat_window = selected_hwnd
+                monitor.select_window(selected_hwnd, title)
                 log_message(f"已选择窗口: {title} (hwnd: {selected_hwnd})")
                 show_notification(f"已选择窗口: {title}", "success")
                 select_window.destroy()
@@ -930,8 +894,6 @@ def select_wechat_window():
 # 新增函数：手动选择窗口（无需win32gui）
 def manual_select_window():
     """手动选择窗口，不依赖win32gui"""
-    global selected_wechat_window, selected_window_title
-    
     # 创建一个简单的指示窗口
     guide_window = tk.Toplevel(root)
     guide_window.title("手动选择窗口")
@@ -975,9 +937,9 @@ def manual_select_window():
         
         try:
             # 尝试获取当前活动窗口
-            import ctypes
-            user32 = ctypes.windll.user32
-            last_active_window = user32.GetForegroundWindow()
+            last_active_window = monitor.window_backend.get_foreground()
+            if last_active_window is None:
+                raise RuntimeError("当前平台不支持获取活动窗口")
             
             # 开始倒计时
             for i in range(5, 0, -1):
@@ -986,7 +948,7 @@ def manual_select_window():
                 time.sleep(1)
             
             # 获取用户点击后的窗口
-            new_active_window = user32.GetForegroundWindow()
+            new_active_window = monitor.window_backend.get_foreground()
             
             # 如果用户没有切换窗口，提示错误
             if new_active_window == guide_window.winfo_id() or new_active_window == last_active_window:
@@ -994,28 +956,23 @@ def manual_select_window():
                 return
             
             # 记录选中的窗口
-            global selected_wechat_window
-            selected_wechat_window = new_active_window
+            monitor.select_window(new_active_window)
             
             # 尝试获取窗口标题并保存
             window_title = ""
             try:
-                # 获取窗口标题的长度
-                title_length = user32.GetWindowTextLengthW(new_active_window) + 1
-                title_buffer = ctypes.create_unicode_buffer(title_length)
-                user32.GetWindowTextW(new_active_window, title_buffer, title_length)
-                window_title = title_buffer.value
+                window_title = monitor.window_backend.get_title(new_active_window)
+                if window_title is None:
+                    raise RuntimeError("无法获取窗口标题")
                 
                 # 保存窗口标题供下次使用
-                global selected_window_title
-                selected_window_title = window_title
+                monitor.select_window(new_active_window, window_title)
                 
-                # 保存到用户设置
-                if window_title and window_title not in USER_SETTINGS["saved_windows"]:
-                    USER_SETTINGS["saved_windows"].insert(0, window_title)
+                # 保存到用户设置（短时间内的多次修改合并后写入配置文件）
+                saved_windows = config_store.settings.saved_windows
+                if window_title and window_title not in saved_windows:
                     # 只保留最近的5个窗口
-                    USER_SETTINGS["saved_windows"] = USER_SETTINGS["saved_windows"][:5]
-                    save_user_settings()
+                    config_store.update(saved_windows=([window_title] + saved_windows)[:5])
                 
                 log_message(f"已手动选择窗口: {window_title} (hwnd: {new_active_window})")
                 show_notification(f"已选择窗口: {window_title}", "success")
@@ -1082,75 +1039,12 @@ def find_window_by_title(title):
     if not title:
         return None
         
-    # 尝试使用ctypes查找窗口
-    try:
-        import ctypes
-        user32 = ctypes.windll.user32
-        
-        # 定义回调函数类型
-        WNDENUMPROC = ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.c_int, ctypes.POINTER(ctypes.c_int))
-        
-        # 存储找到的窗口句柄
-        found_hwnd = [None]
-        
-        # 定义回调函数
-        def enum_windows_callback(hwnd, lParam):
-            # 获取窗口标题
-            length = user32.GetWindowTextLengthW(hwnd)
-            if length > 0:
-                buffer = ctypes.create_unicode_buffer(length + 1)
-                user32.GetWindowTextW(hwnd, buffer, length + 1)
-                window_title = buffer.value
-                
-                # 检查是否匹配目标标题
-                if title in window_title:
-                    found_hwnd[0] = hwnd
-                    return False  # 停止枚举
-            return True  # 继续枚举
-        
-        # 枚举所有窗口
-        user32.EnumWindows(WNDENUMPROC(enum_windows_callback), 0)
-        
-        return found_hwnd[0]
-    except:
-        # 尝试使用win32gui查找窗口
-        try:
-            import win32gui
-            
-            def callback(hwnd, param):
-                if win32gui.IsWindowVisible(hwnd):
-                    window_title = win32gui.GetWindowText(hwnd)
-                    if title in window_title:
-                        param.append(hwnd)
-                return True
-            
-            found = []
-            win32gui.EnumWindows(callback, found)
-            
-            return found[0] if found else None
-        except:
-            return None
+    return monitor.find_window_by_title(title)
 
 # 恢复上次选择的窗口
 def restore_saved_window():
     """尝试恢复上次保存的窗口"""
-    global selected_wechat_window, selected_window_title
-    
-    if not USER_SETTINGS["saved_windows"]:
-        return False
-    
-    # 遍历保存的窗口标题，尝试查找匹配的窗口
-    for window_title in USER_SETTINGS["saved_windows"]:
-        hwnd = find_window_by_title(window_title)
-        if hwnd:
-            selected_wechat_window = hwnd
-            selected_window_title = window_title
-            log_message(f"已恢复上次选择的窗口: {window_title}")
-            return True
-    
-    return False
+    return monitor.restore_window(config_store.settings.saved_windows)
 
 if __name__ == "__main__":
-    # 全局线程变量
-    monitor_thread = None
     main() 
\ No newline at end of file